@@ -0,0 +1,139 @@
+import itertools
+import numpy as np
+from scipy import sparse
+from typing import Optional, List, Tuple, Iterable
+
+class RandomProjectionLSH:
+    """Approximate cosine nearest neighbours with multi-table random-projection LSH (pure NumPy)
+
+    Recall/speed knobs:
+    - n_tables: more tables -> higher recall, more candidates to rerank
+    - n_bits: more bits per table -> smaller buckets, fewer candidates, lower recall
+    - probe_radius: also probe buckets within this Hamming distance (0, 1 or 2)
+
+    TF-IDF and rating vectors are non-negative, so they all sit in one orthant and
+    random hyperplanes split them poorly; hashing is done on mean-centered vectors.
+    """
+
+    def __init__(self, n_tables: int = 16, n_bits: int = 8, probe_radius: int = 1, seed: int = 42):
+        if n_bits > 32:
+            raise ValueError("n_bits must be at most 32")
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.probe_radius = probe_radius
+        self.seed = seed
+        self.planes: Optional[np.ndarray] = None
+        # Projection of the fit-time mean vector, subtracted so hashing sees centered data
+        self._offsets: Optional[np.ndarray] = None
+        self.n_rows = 0
+        # Per table: bucket codes sorted ascending, and the row ids in that order
+        self._sorted_codes: List[np.ndarray] = []
+        self._sorted_rows: List[np.ndarray] = []
+        self._probe_masks = self._build_probe_masks()
+
+    def _build_probe_masks(self) -> np.ndarray:
+        masks = [0]
+        for radius in range(1, self.probe_radius + 1):
+            for bits in itertools.combinations(range(self.n_bits), radius):
+                masks.append(sum(1 << b for b in bits))
+        return np.asarray(masks, dtype=np.uint32)
+
+    def _hash(self, vectors) -> np.ndarray:
+        """Bucket codes of shape (n_tables, n_rows)"""
+        # Columns added after fit (e.g. newly rated movies) are ignored for bucketing
+        dim = self.planes.shape[1]
+        if vectors.shape[1] > dim:
+            vectors = vectors[:, :dim]
+        n_rows = vectors.shape[0]
+        weights = (1 << np.arange(self.n_bits, dtype=np.uint64)).astype(np.uint32)
+        codes = np.empty((self.n_tables, n_rows), dtype=np.uint32)
+        for table in range(self.n_tables):
+            projected = vectors @ self.planes[table]
+            projected = np.asarray(projected.todense() if sparse.issparse(projected) else projected)
+            codes[table] = (projected > self._offsets[table]).astype(np.uint32) @ weights
+        return codes
+
+    def fit(self, vectors) -> 'RandomProjectionLSH':
+        """Hash every row of a (sparse or dense) matrix into each table"""
+        rng = np.random.default_rng(self.seed)
+        self.planes = rng.standard_normal((self.n_tables, vectors.shape[1], self.n_bits)).astype(np.float32)
+        mean = np.asarray(vectors.mean(axis=0)).ravel().astype(np.float32)
+        self._offsets = np.stack([mean @ self.planes[table] for table in range(self.n_tables)])
+        codes = self._hash(vectors)
+
+        self.n_rows = vectors.shape[0]
+        self._sorted_codes, self._sorted_rows = [], []
+        for table in range(self.n_tables):
+            order = np.argsort(codes[table], kind='stable')
+            self._sorted_codes.append(codes[table][order])
+            self._sorted_rows.append(order.astype(np.int64))
+        return self
+
+    def add(self, vectors):
+        """Hash rows appended after fit (row ids continue from the current size)"""
+        if self.planes is None:
+            self.fit(vectors)
+            return
+
+        codes = self._hash(vectors)
+        new_rows = np.arange(self.n_rows, self.n_rows + vectors.shape[0], dtype=np.int64)
+        for table in range(self.n_tables):
+            all_codes = np.concatenate([self._sorted_codes[table], codes[table]])
+            all_rows = np.concatenate([self._sorted_rows[table], new_rows])
+            order = np.argsort(all_codes, kind='stable')
+            self._sorted_codes[table] = all_codes[order]
+            self._sorted_rows[table] = all_rows[order]
+        self.n_rows += vectors.shape[0]
+
+    def candidates(self, query) -> np.ndarray:
+        """Row ids sharing a (probed) bucket with the query in any table"""
+        if self.planes is None:
+            return np.zeros(0, dtype=np.int64)
+
+        codes = self._hash(query.reshape(1, -1) if not sparse.issparse(query) else query)[:, 0]
+        found = []
+        for table in range(self.n_tables):
+            probes = codes[table] ^ self._probe_masks
+            left = np.searchsorted(self._sorted_codes[table], probes, side='left')
+            right = np.searchsorted(self._sorted_codes[table], probes, side='right')
+            for lo, hi in zip(left, right):
+                if hi > lo:
+                    found.append(self._sorted_rows[table][lo:hi])
+
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def search(self, query, vectors, k: int, exclude_rows: Iterable[int] = (), extra_rows: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Exact cosine rerank of the LSH candidates (plus any extra rows) against `vectors`"""
+        rows = self.candidates(query)
+        extra = np.fromiter(extra_rows, dtype=np.int64)
+        if len(extra):
+            rows = np.union1d(rows, extra)
+        excluded = np.fromiter(exclude_rows, dtype=np.int64)
+        if len(excluded):
+            rows = np.setdiff1d(rows, excluded, assume_unique=False)
+        rows = rows[rows < vectors.shape[0]]
+        if len(rows) == 0:
+            return []
+
+        subset = vectors[rows]
+        if sparse.issparse(subset):
+            dots = np.asarray((subset @ query.T).todense()).ravel()
+            norms = np.sqrt(np.asarray(subset.multiply(subset).sum(axis=1)).ravel())
+            query_norm = np.sqrt(query.multiply(query).sum())
+        else:
+            query = np.asarray(query).ravel()
+            dots = subset @ query
+            norms = np.linalg.norm(subset, axis=1)
+            query_norm = np.linalg.norm(query)
+
+        if query_norm == 0:
+            return []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarities = np.where(norms > 0, dots / (norms * query_norm), 0.0)
+
+        k = min(k, len(rows))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return [(int(rows[i]), float(similarities[i])) for i in top]
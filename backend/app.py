@@ -2,13 +2,34 @@ import os
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from flask import Flask, request, redirect, session, jsonify
+from flask import Flask, request, redirect, session, jsonify, Response, stream_with_context
+import json
+import hashlib
 from flask_cors import CORS
 from dotenv import load_dotenv
 from tmdb_client import TMDBClient
 from user_system import UserSystem
+from content_index import ContentIndex
+from neighbor_table import NeighborTable
+from background import PeriodicTask
+from ann_index import RandomProjectionLSH
+from cache import LRUTTLCache
+from response_cache import ResponseCache
+from movie_catalog import MovieCatalog
+from catalog_journal import CatalogJournal
+from catalog_snapshot import CatalogSnapshot
+from catalog_search import CatalogSearchIndex
+from title_index import TitlePrefixIndex
+from rating_pool import RatingCandidatePool
+from hybrid import combine_recommendations, enrich_recommendations, recommend_batch
+import fast_json
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
 import time
+import atexit
+import signal
+import sys
+import random
+import threading
 
 # Load .env file
 load_dotenv('../.env')
@@ -26,14 +47,122 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)  # Session expires
 # Enable CORS for React frontend
 CORS(app, supports_credentials=True, origins=['http://localhost:3000', 'http://frontend:3000'])
 
-# Init TMDB client
-tmdb_client = TMDBClient()
+# Init TMDB client; the genre map is cached for TMDB_GENRE_TTL seconds and persisted beside cached_movies.json
+TMDB_GENRE_TTL = float(os.getenv('TMDB_GENRE_TTL', '86400'))
+TMDB_GENRE_CACHE_PATH = os.getenv('TMDB_GENRE_CACHE_PATH', 'cached_genres.json')
 
-# Init user system
-user_system = UserSystem("cinemate.db")
+# Search and movie-details responses are cached in memory and in a SQLite file; empty results for TMDB_NEGATIVE_CACHE_TTL
+TMDB_CACHE_PATH = os.getenv('TMDB_CACHE_PATH', 'tmdb_cache.db')
+TMDB_CACHE_MEMORY_ENTRIES = int(os.getenv('TMDB_CACHE_MEMORY_ENTRIES', '2048'))
+TMDB_SEARCH_CACHE_TTL = float(os.getenv('TMDB_SEARCH_CACHE_TTL', '3600'))
+TMDB_DETAILS_CACHE_TTL = float(os.getenv('TMDB_DETAILS_CACHE_TTL', '86400'))
+TMDB_NEGATIVE_CACHE_TTL = float(os.getenv('TMDB_NEGATIVE_CACHE_TTL', '300'))
 
-# Global var to store movies
-movies_df = None
+tmdb_client = TMDBClient(
+    genre_ttl=TMDB_GENRE_TTL,
+    genre_cache_path=TMDB_GENRE_CACHE_PATH,
+    response_cache=ResponseCache(TMDB_CACHE_PATH, TMDB_CACHE_MEMORY_ENTRIES),
+    search_ttl=TMDB_SEARCH_CACHE_TTL,
+    details_ttl=TMDB_DETAILS_CACHE_TTL,
+    negative_ttl=TMDB_NEGATIVE_CACHE_TTL
+)
+
+# The catalog stores image paths only and rebuilds these URLs from them on demand
+CATALOG_URL_BUILDERS = {
+    'poster_url': ('poster_path', tmdb_client.get_poster_url),
+    'backdrop_url': ('backdrop_path', tmdb_client.get_backdrop_url)
+}
+
+# Movie fields returned by /api/rating-history next to each rating
+RATING_HISTORY_FIELDS = ('movie_id', 'title', 'overview', 'genre', 'poster_url', 'backdrop_url', 'vote_average', 'release_date')
+
+# Results per page for /api/search-movies when answered from the local index (TMDb also returns 20)
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '20'))
+
+# Cold start without cached_movies.json: TMDb pages fetched, concurrent requests, and the overall time budget
+TMDB_BOOTSTRAP_PAGES = int(os.getenv('TMDB_BOOTSTRAP_PAGES', '50'))
+TMDB_BOOTSTRAP_WORKERS = int(os.getenv('TMDB_BOOTSTRAP_WORKERS', '8'))
+TMDB_BOOTSTRAP_DEADLINE = float(os.getenv('TMDB_BOOTSTRAP_DEADLINE', '60'))
+
+# Init user system (SQLITE_POOL_SIZE pooled WAL-mode connections shared by request threads)
+user_system = UserSystem("cinemate.db", pool_size=int(os.getenv('SQLITE_POOL_SIZE', '8')))
+
+# Global var to store movies, indexed by movie_id
+movie_catalog = None
+
+# Local full-text (FTS5/BM25) index over the catalog; /api/search-movies falls back to TMDb on a miss
+catalog_search = None
+
+# Title prefix index for /api/autocomplete, keeping the AUTOCOMPLETE_K best-ranked movies per short prefix
+title_index = None
+AUTOCOMPLETE_K = int(os.getenv('AUTOCOMPLETE_K', '10'))
+
+# Candidates for /api/rate-movies: the first RATE_POOL_SIZE movies, shuffled RATE_PERMUTATIONS ways once per catalog version
+rating_pool = None
+rating_pool_lock = threading.Lock()
+RATE_POOL_SIZE = int(os.getenv('RATE_POOL_SIZE', '400'))
+RATE_PAGE_SIZE = int(os.getenv('RATE_PAGE_SIZE', '20'))
+RATE_PERMUTATIONS = int(os.getenv('RATE_PERMUTATIONS', '16'))
+
+# Memory-mapped columnar copy of the catalog, converted from cached_movies.json on first start
+CATALOG_SNAPSHOT_PATH = os.getenv('CATALOG_SNAPSHOT_PATH', 'catalog_snapshot')
+CATALOG_JSON_PATH = os.getenv('CATALOG_JSON_PATH', 'cached_movies.json')
+
+# Movies added at runtime are appended to a journal and folded into cached_movies.json and the snapshot periodically
+catalog_journal = CatalogJournal(os.getenv('CATALOG_JOURNAL_PATH', 'cached_movies.journal.ndjson'))
+CATALOG_COMPACT_ENTRIES = int(os.getenv('CATALOG_COMPACT_ENTRIES', '200'))
+CATALOG_COMPACT_SECONDS = float(os.getenv('CATALOG_COMPACT_SECONDS', '600'))
+
+# Fit-once TF-IDF index over the catalog, rebuilt whenever the catalog is (re)loaded
+content_index = None
+CONTENT_INDEX_PATH = os.getenv('CONTENT_INDEX_PATH', 'content_index')
+
+# Precomputed top-K similar movies per movie, derived from content_index
+neighbor_table = None
+NEIGHBOR_TABLE_PATH = os.getenv('NEIGHBOR_TABLE_PATH', 'neighbor_table')
+NEIGHBOR_TABLE_K = int(os.getenv('NEIGHBOR_TABLE_K', '20'))
+
+# Approximate nearest-neighbour index over content_index rows (only when CONTENT_BACKEND=lsh)
+content_ann = None
+
+# Collaborative filtering mode: 'user' (user-user neighbours), 'item' (precomputed item-item
+# similarities) or 'mf' (matrix factorization trained in the background)
+COLLABORATIVE_MODE = os.getenv('COLLABORATIVE_MODE', 'user')
+ITEM_SIMILARITY_REFRESH_SECONDS = float(os.getenv('ITEM_SIMILARITY_REFRESH_SECONDS', '60'))
+FACTOR_MODEL_TRAIN_SECONDS = float(os.getenv('FACTOR_MODEL_TRAIN_SECONDS', '900'))
+
+# Candidates for content recommendations: 'neighbors' (precomputed neighbor table) or 'lsh'
+# (approximate nearest neighbours of the user profile); either falls back to an exact scan
+CONTENT_BACKEND = os.getenv('CONTENT_BACKEND', 'neighbors')
+
+# Optional approximate nearest-neighbour backend for user vectors ('' = exact, 'lsh'); the ANN_* sizes apply to both
+ANN_BACKEND = os.getenv('ANN_BACKEND', '')
+ANN_TABLES = int(os.getenv('ANN_TABLES', '16'))
+ANN_BITS = int(os.getenv('ANN_BITS', '8'))
+ANN_PROBE_RADIUS = int(os.getenv('ANN_PROBE_RADIUS', '1'))
+ANN_REBUILD_SECONDS = float(os.getenv('ANN_REBUILD_SECONDS', '300'))
+
+# Per-user recommendation cache, keyed by user and checked against the user's ratings version
+RECOMMENDATION_CACHE_SIZE = int(os.getenv('RECOMMENDATION_CACHE_SIZE', '10000'))
+RECOMMENDATION_CACHE_TTL = float(os.getenv('RECOMMENDATION_CACHE_TTL', '600'))
+
+# /api/popular-movies shows a fixed sample per POPULAR_BUCKET_SECONDS window (and user), encoded once per window
+POPULAR_BUCKET_SECONDS = int(os.getenv('POPULAR_BUCKET_SECONDS', '300'))
+POPULAR_CACHE_SIZE = int(os.getenv('POPULAR_CACHE_SIZE', '10000'))
+
+# Browser cache lifetime for /api/movie-details; a movie's record never changes while the catalog is loaded
+MOVIE_DETAILS_MAX_AGE = int(os.getenv('MOVIE_DETAILS_MAX_AGE', '3600'))
+
+# Batch recommendations: users scored per block, and the shared token required by the batch endpoint
+BATCH_BLOCK_SIZE = int(os.getenv('BATCH_BLOCK_SIZE', '128'))
+BATCH_MAX_USERS = int(os.getenv('BATCH_MAX_USERS', '10000'))
+BATCH_API_TOKEN = os.getenv('BATCH_API_TOKEN', '')
+
+# Optional write-behind for rating changes: queued and group-committed every RATING_FLUSH_MS or RATING_FLUSH_ROWS changes.
+# Requests return before the write reaches SQLite, so a crash can lose the last RATING_FLUSH_MS of ratings.
+RATING_WRITE_BEHIND = os.getenv('RATING_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+RATING_FLUSH_MS = float(os.getenv('RATING_FLUSH_MS', '50'))
+RATING_FLUSH_ROWS = int(os.getenv('RATING_FLUSH_ROWS', '500'))
 
 # Prometheus metrics
 REQUEST_COUNT = Counter('cinemate_requests_total', 'Total requests', ['method', 'endpoint', 'status'])
@@ -43,8 +172,60 @@ RECOMMENDATION_COUNT = Counter('cinemate_recommendations_total', 'Total recommen
 USER_RATINGS_COUNT = Counter('cinemate_user_ratings_total', 'Total user ratings submitted')
 ACTIVE_USERS = Gauge('cinemate_active_users', 'Number of active users')
 MOVIE_SEARCH_COUNT = Counter('cinemate_movie_searches_total', 'Total movie searches')
+MOVIE_SEARCH_SOURCE = Counter('cinemate_movie_search_source_total', 'Movie searches answered by the local index or by TMDb', ['source'])
 DATABASE_OPERATIONS = Counter('cinemate_database_operations_total', 'Database operations', ['operation'])
 ML_OPERATION_DURATION = Histogram('cinemate_ml_operation_duration_seconds', 'ML operation duration', ['operation'])
+FACTOR_MODEL_TRAINING_DURATION = Histogram('cinemate_factor_model_training_duration_seconds', 'Matrix factorization training duration', buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+FACTOR_MODEL_AGE = Gauge('cinemate_factor_model_age_seconds', 'Seconds since the matrix factorization model was trained')
+FACTOR_MODEL_AGE.set_function(lambda: user_system.factor_model.age_seconds())
+# Every fit is timed: the background trainer's, and the inline one the first mf request triggers
+user_system.factor_model.on_fit = FACTOR_MODEL_TRAINING_DURATION.observe
+RATING_BATCH_SIZE = Histogram('cinemate_rating_batch_size', 'Ratings per submit-ratings request', buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+CATALOG_BATCH_SIZE = Histogram('cinemate_catalog_batch_size', 'Movies added to the catalog per batch', buckets=(1, 2, 5, 10, 20, 50, 100))
+TMDB_REQUESTS = Counter('cinemate_tmdb_requests_total', 'Upstream TMDb API calls', ['endpoint'])
+tmdb_client.on_request = lambda endpoint: TMDB_REQUESTS.labels(endpoint=endpoint).inc()
+TMDB_CACHE_LOOKUPS = Counter('cinemate_tmdb_cache_lookups_total', 'TMDb response cache lookups', ['namespace', 'result'])
+TMDB_CACHE_SAVED_SECONDS = Counter('cinemate_tmdb_cache_saved_seconds_total', 'Upstream TMDb latency avoided by response cache hits', ['namespace'])
+RECOMMENDATION_CACHE_EVENTS = Counter('cinemate_recommendation_cache_events_total', 'Recommendation cache hits, misses, evictions, expirations and invalidations', ['event'])
+
+recommendation_cache = LRUTTLCache(
+    RECOMMENDATION_CACHE_SIZE,
+    RECOMMENDATION_CACHE_TTL,
+    on_event=lambda event: RECOMMENDATION_CACHE_EVENTS.labels(event=event).inc()
+)
+user_system.add_ratings_listener(recommendation_cache.invalidate)
+
+# (catalog version, bucket, user_id) -> (etag, encoded sample)
+popular_cache = LRUTTLCache(POPULAR_CACHE_SIZE, POPULAR_BUCKET_SECONDS)
+
+DB_POOL_WAIT = Histogram('cinemate_db_pool_wait_seconds', 'Time spent waiting for a pooled SQLite connection', buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+user_system.db.on_wait = DB_POOL_WAIT.observe
+
+def observe_tmdb_cache_lookup(namespace, result, saved_seconds):
+    TMDB_CACHE_LOOKUPS.labels(namespace=namespace, result=result).inc()
+    if saved_seconds:
+        TMDB_CACHE_SAVED_SECONDS.labels(namespace=namespace).inc(saved_seconds)
+
+tmdb_client.response_cache.on_lookup = observe_tmdb_cache_lookup
+
+RATING_QUEUE_DEPTH = Gauge('cinemate_rating_queue_depth', 'Rating changes waiting in the write-behind queue')
+RATING_QUEUE_DEPTH.set_function(lambda: len(user_system.write_queue) if user_system.write_queue is not None else 0)
+RATING_FLUSH_DURATION = Histogram('cinemate_rating_flush_duration_seconds', 'Write-behind group commit duration', buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+RATING_FLUSH_SIZE = Histogram('cinemate_rating_flush_size', 'Rating changes per write-behind group commit', buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+
+RATING_DEAD_LETTERS = Counter('cinemate_rating_dead_letters_total', 'Queued rating changes dropped after failing to commit')
+
+def observe_rating_flush(n_changes, seconds):
+    RATING_FLUSH_SIZE.observe(n_changes)
+    RATING_FLUSH_DURATION.observe(seconds)
+
+if RATING_WRITE_BEHIND:
+    user_system.enable_write_behind(
+        RATING_FLUSH_MS / 1000.0, RATING_FLUSH_ROWS, on_flush=observe_rating_flush,
+        on_dead_letter=lambda op, error: RATING_DEAD_LETTERS.inc()
+    )
+    # Commit whatever is still queued when the process exits
+    atexit.register(user_system.write_queue.stop)
 
 @app.route('/health')
 def health_check():
@@ -61,6 +242,28 @@ def metrics():
     """Prometheus metrics endpoint"""
     return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
+def json_bytes_response(body: bytes, status: int = 200) -> Response:
+    """Response for a body already encoded as JSON (see fast_json)"""
+    return Response(body, status=status, mimetype='application/json')
+
+def make_etag(*parts) -> str:
+    """Strong ETag (unquoted) derived from the inputs that determine a response"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+def conditional_json_response(etag: str, max_age: int, build_body, private: bool = False) -> Response:
+    """JSON response carrying a strong ETag; answers a matching If-None-Match (weak comparison, per RFC 9110) with 304 without building the body"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = json_bytes_response(build_body())
+    response.set_etag(etag)
+    response.cache_control.max_age = max(0, int(max_age))
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    return response
+
 def track_request_metrics(f):
     """Decorator to track request metrics"""
     def decorated_function(*args, **kwargs):
@@ -85,36 +288,91 @@ def track_request_metrics(f):
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def build_content_index():
+    """Load the persisted content index and neighbor table for the current catalog or build new ones"""
+    global content_index, neighbor_table, content_ann
+    
+    content_ann = None
+    if movie_catalog is None or movie_catalog.empty:
+        content_index = None
+        neighbor_table = None
+        return
+    
+    start_time = time.time()
+    try:
+        # A snapshot carries its catalog fingerprint, so a matching index loads without decoding the catalog text
+        fingerprint = movie_catalog.snapshot_fingerprint
+        content_index = ContentIndex.load(CONTENT_INDEX_PATH) if fingerprint else None
+        if content_index is None or content_index.fingerprint != fingerprint:
+            content_index = ContentIndex.load_or_build(movie_catalog.df, CONTENT_INDEX_PATH)
+    except Exception as e:
+        content_index = None
+    ML_OPERATION_DURATION.labels(operation='content_index_build').observe(time.time() - start_time)
+    
+    if content_index is None:
+        neighbor_table = None
+        return
+    
+    start_time = time.time()
+    try:
+        neighbor_table = NeighborTable.load_or_build(content_index, NEIGHBOR_TABLE_PATH, NEIGHBOR_TABLE_K)
+    except Exception as e:
+        neighbor_table = None
+    ML_OPERATION_DURATION.labels(operation='neighbor_table_build').observe(time.time() - start_time)
+    
+    if CONTENT_BACKEND == 'lsh':
+        start_time = time.time()
+        content_ann = RandomProjectionLSH(ANN_TABLES, ANN_BITS, ANN_PROBE_RADIUS).fit(content_index.matrix)
+        ML_OPERATION_DURATION.labels(operation='content_ann_build').observe(time.time() - start_time)
+
 def load_movie_data():
     """Load movie data from TMDb API or fallback to sample data"""
-    global movies_df
+    global movie_catalog
     import json
     import os
     
     # Check if we have cached movies
-    cache_file = "cached_movies.json"
+    cache_file = CATALOG_JSON_PATH
+
+    # Memory-map the binary snapshot if we have one that is not older than the JSON catalog
+    # (a newer cached_movies.json, e.g. from a checkout, is reconverted)
+    if catalog_snapshot_is_current():
+        try:
+            movie_catalog = MovieCatalog(snapshot=CatalogSnapshot.load(CATALOG_SNAPSHOT_PATH, CATALOG_URL_BUILDERS))
+            replay_catalog_journal()
+            build_content_index()
+            return
+        except Exception as e:
+            app.logger.warning("Could not load catalog snapshot %s, falling back to %s: %s", CATALOG_SNAPSHOT_PATH, cache_file, e)
+    
     if os.path.exists(cache_file):
         try:
             with open(cache_file, 'r') as f:
                 cached_data = json.load(f)
-            movies_df = pd.DataFrame(cached_data)
+            movie_catalog = MovieCatalog(pd.DataFrame(cached_data), url_builders=CATALOG_URL_BUILDERS)
+            fingerprint_catalog()
+            try:
+                save_catalog_snapshot()
+            except Exception as e:
+                app.logger.warning("Could not write catalog snapshot %s: %s", CATALOG_SNAPSHOT_PATH, e)
+            replay_catalog_journal()
+            build_content_index()
             return
         except Exception as e:
-            pass
+            app.logger.warning("Could not load %s, fetching the catalog again: %s", cache_file, e)
     
     # Set a fixed seed for consistent results
     import random
     random.seed(42)  # Fixed seed for consistent movie selection
     
     # Try to get popular movies from TMDb (fetch many more pages for larger dataset)
-    movies = []
-    # Fetch 50 pages = up to 1000 movies - configuranble
-    for page in range(1, 51):
-        page_movies = tmdb_client.get_popular_movies(page=page, limit=20)
-        if page_movies:
-            movies.extend(page_movies)
-        else:
-            break
+    # 50 pages = up to 1000 movies, fetched concurrently over one keep-alive session
+    movies = tmdb_client.get_popular_movies_pages(
+        range(1, TMDB_BOOTSTRAP_PAGES + 1),
+        limit=20,
+        max_workers=TMDB_BOOTSTRAP_WORKERS,
+        deadline=TMDB_BOOTSTRAP_DEADLINE
+    )
     
     if movies:
         movies_df = pd.DataFrame(movies)
@@ -168,13 +426,130 @@ def load_movie_data():
             movies_df.to_json(cache_file, orient='records')
         except Exception as e:
             pass
+    
+    movie_catalog = MovieCatalog(movies_df, url_builders=CATALOG_URL_BUILDERS)
+    fingerprint_catalog()
+    try:
+        save_catalog_snapshot()
+    except Exception as e:
+        app.logger.warning("Could not write catalog snapshot %s: %s", CATALOG_SNAPSHOT_PATH, e)
+    replay_catalog_journal()
+    build_content_index()
+
+def fingerprint_catalog():
+    """Give a catalog built from a DataFrame the fingerprint its snapshot would carry, so its version depends only on the movies"""
+    movie_catalog.snapshot.fingerprint = ContentIndex.catalog_fingerprint(movie_catalog.df)
+
+def save_catalog_snapshot():
+    """Write the current catalog as a binary snapshot so later starts can memory-map it"""
+    snapshot = CatalogSnapshot.from_frame(movie_catalog.df, url_builders=CATALOG_URL_BUILDERS)
+    # Fingerprint what later starts will see after decoding (the loaded one still does if nothing was appended)
+    snapshot.fingerprint = movie_catalog.snapshot_fingerprint or ContentIndex.catalog_fingerprint(snapshot.to_frame())
+    snapshot.save(CATALOG_SNAPSHOT_PATH)
+
+def catalog_snapshot_is_current() -> bool:
+    """True if a snapshot exists and was written no earlier than cached_movies.json"""
+    manifest = os.path.join(CATALOG_SNAPSHOT_PATH, 'manifest.json')
+    if not os.path.exists(manifest):
+        return False
+    return not os.path.exists(CATALOG_JSON_PATH) or os.path.getmtime(manifest) >= os.path.getmtime(CATALOG_JSON_PATH)
+
+def save_catalog():
+    """Write the whole catalog to cached_movies.json (the durable copy) and then to the snapshot"""
+    movie_catalog.to_json(CATALOG_JSON_PATH)
+    save_catalog_snapshot()
+
+def replay_catalog_journal():
+    """Apply movies journaled since the last snapshot was written"""
+    movie_catalog.add_many(catalog_journal.replay())
+
+def build_search_index():
+    """(Re)build the local full-text search and title prefix indexes, and pre-encode movie JSON, over the catalog"""
+    global catalog_search, title_index
+    start_time = time.time()
+    try:
+        catalog_search = CatalogSearchIndex.build(movie_catalog) if movie_catalog is not None else None
+    except Exception as e:
+        catalog_search = None
+    ML_OPERATION_DURATION.labels(operation='search_index_build').observe(time.time() - start_time)
+    
+    start_time = time.time()
+    try:
+        title_index = TitlePrefixIndex.build(movie_catalog, AUTOCOMPLETE_K) if movie_catalog is not None else None
+    except Exception as e:
+        title_index = None
+    ML_OPERATION_DURATION.labels(operation='title_index_build').observe(time.time() - start_time)
+    
+    # List endpoints concatenate these fragments instead of re-encoding records per request
+    start_time = time.time()
+    if movie_catalog is not None:
+        movie_catalog.fragments()
+    ML_OPERATION_DURATION.labels(operation='movie_json_encode').observe(time.time() - start_time)
+
+def get_rating_pool():
+    """Rating candidate pool for the current catalog, rebuilt when movies have been added since it was built"""
+    global rating_pool
+    pool = rating_pool
+    if pool is not None and pool.catalog_size == len(movie_catalog):
+        return pool
+    with rating_pool_lock:
+        if rating_pool is None or rating_pool.catalog_size != len(movie_catalog):
+            start_time = time.time()
+            rating_pool = RatingCandidatePool(movie_catalog, RATE_POOL_SIZE, RATE_PERMUTATIONS)
+            ML_OPERATION_DURATION.labels(operation='rating_pool_build').observe(time.time() - start_time)
+        return rating_pool
 
 # Load movie data on startup
 load_movie_data()
+build_search_index()
 
-def get_recommendations_for_user(user_id, n_recommendations=10):
+def compact_catalog_journal():
+    """Background job: fold journaled movies into cached_movies.json and the catalog snapshot"""
+    if movie_catalog is None or len(catalog_journal) == 0:
+        return
+    start_time = time.time()
+    catalog_journal.compact(save_catalog)
+    ML_OPERATION_DURATION.labels(operation='catalog_compaction').observe(time.time() - start_time)
+
+catalog_compaction_task = PeriodicTask('catalog-compaction', CATALOG_COMPACT_SECONDS, compact_catalog_journal).start()
+
+# Refresh the genre map halfway through its TTL so request threads never wait for it to be re-fetched
+genre_refresh_task = PeriodicTask('tmdb-genre-refresh', TMDB_GENRE_TTL / 2, tmdb_client.refresh_genres, run_immediately=False)
+if tmdb_client.api_key:
+    genre_refresh_task.start()
+
+def rebuild_user_ann():
+    """Background job: rebuild the ANN index over user rating vectors"""
+    start_time = time.time()
+    user_system.rebuild_user_ann(ANN_TABLES, ANN_BITS, ANN_PROBE_RADIUS)
+    ML_OPERATION_DURATION.labels(operation='user_ann_build').observe(time.time() - start_time)
+
+user_ann_task = PeriodicTask('user-ann-rebuild', ANN_REBUILD_SECONDS, rebuild_user_ann)
+if ANN_BACKEND == 'lsh':
+    user_ann_task.start()
+
+def refresh_item_similarity():
+    """Background job: refit item-item similarities when ratings have changed"""
+    start_time = time.time()
+    if user_system.refresh_item_similarity():
+        ML_OPERATION_DURATION.labels(operation='item_similarity_fit').observe(time.time() - start_time)
+
+item_similarity_task = PeriodicTask('item-similarity-refresh', ITEM_SIMILARITY_REFRESH_SECONDS, refresh_item_similarity)
+if COLLABORATIVE_MODE == 'item':
+    item_similarity_task.start()
+
+def train_factor_model():
+    """Background job: retrain the matrix-factorization model when ratings have changed (timed through on_fit)"""
+    user_system.refresh_factor_model()
+
+factor_model_task = PeriodicTask('factor-model-trainer', FACTOR_MODEL_TRAIN_SECONDS, train_factor_model)
+if COLLABORATIVE_MODE == 'mf':
+    factor_model_task.start()
+
+def get_recommendations_for_user(user_id, n_recommendations=10, collaborative_mode=None):
     """Get personalized recommendations using machine learning"""
     start_time = time.time()
+    collaborative_mode = collaborative_mode or COLLABORATIVE_MODE
     try:
         # Get user's ratings
         user_ratings = user_system.get_user_ratings(user_id)
@@ -183,7 +558,7 @@ def get_recommendations_for_user(user_id, n_recommendations=10):
             return []
         
         # Get available movie IDs from the db
-        available_movie_ids = movies_df['movie_id'].tolist() if movies_df is not None else []
+        available_movie_ids = movie_catalog.ids() if movie_catalog is not None else []
         
         # Filter out already rated
         rated_movie_ids = set(user_ratings.keys())
@@ -195,7 +570,7 @@ def get_recommendations_for_user(user_id, n_recommendations=10):
         
         # Get content-based recommendations
         content_start = time.time()
-        content_recommendations = user_system.get_content_based_recommendations(user_id, n_recommendations, available_movie_ids, movies_df)
+        content_recommendations = user_system.get_content_based_recommendations(user_id, n_recommendations, available_movie_ids, movie_catalog, content_index, neighbor_table, content_ann)
         content_duration = time.time() - content_start
         RECOMMENDATION_DURATION.labels(algorithm='content-based').observe(content_duration)
         RECOMMENDATION_COUNT.labels(algorithm='content-based').inc(len(content_recommendations))
@@ -203,100 +578,103 @@ def get_recommendations_for_user(user_id, n_recommendations=10):
         # Try collaborative filtering too
         try:
             collab_start = time.time()
-            collaborative_recommendations = user_system.get_collaborative_recommendations(user_id, n_recommendations, available_movie_ids)
+            collaborative_recommendations = user_system.get_collaborative_recommendations(user_id, n_recommendations, available_movie_ids, collaborative_mode)
             collab_duration = time.time() - collab_start
-            RECOMMENDATION_DURATION.labels(algorithm='collaborative').observe(collab_duration)
-            RECOMMENDATION_COUNT.labels(algorithm='collaborative').inc(len(collaborative_recommendations))
+            collab_algorithm = 'collaborative' if collaborative_mode == 'user' else f'collaborative-{collaborative_mode}'
+            RECOMMENDATION_DURATION.labels(algorithm=collab_algorithm).observe(collab_duration)
+            RECOMMENDATION_COUNT.labels(algorithm=collab_algorithm).inc(len(collaborative_recommendations))
         except Exception as e:
             collaborative_recommendations = []
         
-        # Combine recommendations (60% content-based, 40% collaborative)
-        recommendations = []
-        
-        # Add content-based recommendations
-        content_count = min(len(content_recommendations), int(n_recommendations * 0.6))
-        recommendations.extend(content_recommendations[:content_count])
-        
-        # Add collaborative recommendations
-        collab_count = min(len(collaborative_recommendations), n_recommendations - len(recommendations))
-        recommendations.extend(collaborative_recommendations[:collab_count])
-        
-        # If we still don't have enough, add more from whichever has more
-        if len(recommendations) < n_recommendations:
-            remaining = n_recommendations - len(recommendations)
-            if len(content_recommendations) > content_count:
-                recommendations.extend(content_recommendations[content_count:content_count + remaining])
-            elif len(collaborative_recommendations) > collab_count:
-                recommendations.extend(collaborative_recommendations[collab_count:collab_count + remaining])
-        
-        # Enrich recommendations with full movie data
-        enriched_recommendations = []
-        for rec in recommendations[:n_recommendations]:
-            movie_id = rec['movie_id']
-            
-            # Double-check that this movie hasn't been rated
-            if movie_id in rated_movie_ids:
-                continue
-            
-            # Find the movie in our movies_df
-            movie_data = movies_df[movies_df['movie_id'] == movie_id]
-            
-            if not movie_data.empty:
-                movie_info = movie_data.iloc[0].to_dict()
-                
-                # Create enriched recommendation
-                enriched_rec = {
-                    'movie_id': movie_id,
-                    'title': movie_info.get('title', f'Movie {movie_id}'),
-                    'overview': movie_info.get('overview', ''),
-                    'genre': movie_info.get('genre', ''),
-                    'poster_url': movie_info.get('poster_url', ''),
-                    'backdrop_url': movie_info.get('backdrop_url', ''),
-                    'vote_average': movie_info.get('vote_average', 0),
-                    'release_date': movie_info.get('release_date', ''),
-                    'score': rec.get('score', 0),
-                    'type': rec.get('type', 'content-based')
-                }
-                enriched_recommendations.append(enriched_rec)
-        
-        return enriched_recommendations
+        recommendations = combine_recommendations(content_recommendations, collaborative_recommendations, n_recommendations)
+        return enrich_recommendations(recommendations, rated_movie_ids, movie_catalog)
     
     except Exception as e:
         return []
 
+def observe_recommendation_duration(algorithm, seconds):
+    RECOMMENDATION_DURATION.labels(algorithm=algorithm).observe(seconds)
+
+def observe_recommendation_count(algorithm, count):
+    RECOMMENDATION_COUNT.labels(algorithm=algorithm).inc(count)
+
+def get_recommendations_for_users(user_ids, n_recommendations=10, collaborative_mode=None, block_size=BATCH_BLOCK_SIZE):
+    """Yield (user_id, recommendations) for many users, scoring each block of users with matrix-matrix products"""
+    return recommend_batch(
+        user_system, user_ids, n_recommendations, collaborative_mode or COLLABORATIVE_MODE,
+        movie_catalog, content_index, neighbor_table, content_ann, block_size,
+        on_duration=observe_recommendation_duration, on_count=observe_recommendation_count
+    )
+
+def get_cached_recommendations_for_user(user_id, n_recommendations=10, collaborative_mode=None):
+    """Serve recommendations from the per-user cache or the precomputed table, recomputing only after the user's ratings change"""
+    collaborative_mode = collaborative_mode or COLLABORATIVE_MODE
+    version = user_system.get_ratings_version(user_id)
+    params = (n_recommendations, collaborative_mode)
+    
+    cached = recommendation_cache.get(user_id)
+    if cached is not None and cached[0] == version and cached[1] == params:
+        return cached[2]
+    
+    # Rows written by the offline precompute job are served as-is unless the user has rated since
+    recommendations = user_system.get_precomputed_recommendations(user_id, n_recommendations, collaborative_mode)
+    if recommendations is None:
+        recommendations = get_recommendations_for_user(user_id, n_recommendations, collaborative_mode)
+    
+    # Empty results are cheap to recompute and may come from a transient error
+    if recommendations:
+        recommendation_cache.set(user_id, (version, params, recommendations))
+    return recommendations
+
 def save_movie_to_local_db(movie_id: int, movie_data: dict):
     """Save movie details to local database if it doesn't exist"""
-    global movies_df
-    
-    if movies_df is None:
+    save_movies_to_local_db({movie_id: movie_data})
+
+def save_movies_to_local_db(movie_details: dict):
+    """Save {movie_id: details} for movies not yet in the local database, as one batch"""
+    if movie_catalog is None:
         return
     
-    # Check if movie already exists in our database
-    if movie_id in movies_df['movie_id'].values:
+    # Create new movie entries for the ones we don't have yet
+    new_movies = [
+        {
+            'movie_id': movie_id,
+            'title': movie_data.get('title', ''),
+            'overview': movie_data.get('overview', ''),
+            'genre': movie_data.get('genre', ''),
+            'poster_path': movie_data.get('poster_path'),
+            'backdrop_path': movie_data.get('backdrop_path'),
+            'vote_average': movie_data.get('vote_average', 0),
+            'release_date': movie_data.get('release_date', ''),
+            'popularity': movie_data.get('popularity'),
+            'poster_url': movie_data.get('poster_url'),
+            'backdrop_url': movie_data.get('backdrop_url')
+        }
+        for movie_id, movie_data in movie_details.items()
+        if movie_id not in movie_catalog
+    ]
+    if not new_movies:
         return
     
-    # Create new movie entry
-    new_movie = {
-        'movie_id': movie_id,
-        'title': movie_data.get('title', ''),
-        'overview': movie_data.get('overview', ''),
-        'genre': movie_data.get('genre', ''),
-        'poster_path': movie_data.get('poster_path'),
-        'backdrop_path': movie_data.get('backdrop_path'),
-        'vote_average': movie_data.get('vote_average', 0),
-        'release_date': movie_data.get('release_date', ''),
-        'poster_url': movie_data.get('poster_url'),
-        'backdrop_url': movie_data.get('backdrop_url')
-    }
+    # Add to the catalog
+    added = movie_catalog.add_many(new_movies)
+    if not added:
+        return
+    CATALOG_BATCH_SIZE.observe(len(added))
     
-    # Add to movies_df
-    new_movie_df = pd.DataFrame([new_movie])
-    movies_df = pd.concat([movies_df, new_movie_df], ignore_index=True)
+    # Vectorize the new movies with the already-fitted vocabulary, one sparse vstack per batch
+    if content_index is not None:
+        content_index.add_movies(pd.DataFrame(added))
+    if catalog_search is not None:
+        catalog_search.add_movies(added)
+    if title_index is not None:
+        title_index.add_movies(added)
     
-    # Save to cache file
+    # Journal them (one write); cached_movies.json and the snapshot are rewritten by the compaction job
     try:
-        # Save to current directory
-        movies_df.to_json("cached_movies.json", orient='records')
+        catalog_journal.append_many(added)
+        if len(catalog_journal) >= CATALOG_COMPACT_ENTRIES:
+            catalog_compaction_task.trigger()
     except Exception as e:
         pass
 
@@ -306,38 +684,56 @@ def save_movie_to_local_db(movie_id: int, movie_data: dict):
 def api_popular_movies():
     """API endpoint to get popular movies for homepage"""
     try:
-        # Get a random sample of 12 movies for variety
-        # Use session-based randomization
-        import random
-        import time
-        
-        # Create a seed based on current time and session (if available)
-        seed_base = int(time.time()) // 300
-        if 'user_id' in session:
-            seed_base += session['user_id']
-        
-        if len(movies_df) > 12:
-            popular_movies = movies_df.sample(n=12, random_state=seed_base).to_dict('records')
-        else:
-            popular_movies = movies_df.to_dict('records')
-        
-        # Clean NaN values from the response
-        import math
-        for movie in popular_movies:
-            for key, value in movie.items():
-                if isinstance(value, float) and math.isnan(value):
-                    movie[key] = None
-                elif isinstance(value, str) and value.lower() == 'nan':
-                    movie[key] = None
-        
-        response = jsonify(popular_movies)
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
+        # A reproducible sample of 12 movies per time bucket, varied per user
+        now = time.time()
+        bucket = int(now) // POPULAR_BUCKET_SECONDS
+        user_id = session.get('user_id')
+        seed_base = bucket + (user_id or 0)
+        expires_in = (bucket + 1) * POPULAR_BUCKET_SECONDS - now
+        
+        key = (movie_catalog.version, bucket, user_id)
+        cached = popular_cache.get(key)
+        if cached is None:
+            # Pre-encoded catalog records, concatenated once per bucket
+            body = fast_json.array(movie_catalog.fragments(movie_catalog.sample_rows(12, seed_base)))
+            cached = (make_etag(*key), body)
+            popular_cache.set(key, cached, ttl=expires_in)
+        etag, body = cached
+        
+        # The sample depends on the session, so only the browser may cache it, until the bucket ends
+        response = conditional_json_response(etag, expires_in, lambda: body, private=True)
+        response.vary.add('Cookie')
         return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/movies/<int:movie_id>/similar')
+@track_request_metrics
+def api_similar_movies(movie_id):
+    """API endpoint to get the movies most similar to a given movie"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        limit = max(1, min(limit, NEIGHBOR_TABLE_K))
+        
+        if neighbor_table is None or movie_id not in neighbor_table:
+            return jsonify({'error': 'Movie not found'}), 404
+        
+        similar_movies = []
+        for similar_id, similarity in neighbor_table.neighbors(movie_id, limit):
+            movie_info = movie_catalog.get(similar_id)
+            if movie_info is None:
+                continue
+            
+            movie_info['similarity'] = round(similarity, 4)
+            similar_movies.append(movie_info)
+        
+        return jsonify({
+            'movie_id': movie_id,
+            'similar_movies': similar_movies
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/search-movies')
 @track_request_metrics
 def api_search_movies():
@@ -352,11 +748,34 @@ def api_search_movies():
         # Track movie searches
         MOVIE_SEARCH_COUNT.inc()
         
-        # Search using TMDb API
-        search_data = tmdb_client.search_movies(query, page)
+        # Answer from the local catalog first, including its partly filled last page;
+        # TMDb is only asked when nothing matches locally or for pages past the local results
+        local_pages, local_total = 0, 0
+        if catalog_search is not None:
+            movie_ids, local_total = catalog_search.search(query, page, SEARCH_PAGE_SIZE)
+            local_pages = -(-local_total // SEARCH_PAGE_SIZE)
+            if page <= local_pages:
+                MOVIE_SEARCH_SOURCE.labels(source='local').inc()
+                return jsonify({
+                    'movies': movie_catalog.get_many(movie_ids),
+                    'page': page,
+                    # TMDb's total is not known without asking it, so just announce one more page
+                    'total_pages': local_pages + 1 if tmdb_client.api_key else local_pages,
+                    'total_results': local_total,
+                    'query': query
+                })
+        
+        # Search using TMDb API (no local match, or a page past the local results); its pages follow the local ones
+        MOVIE_SEARCH_SOURCE.labels(source='tmdb').inc()
+        search_data = tmdb_client.search_movies(query, page - local_pages)
         search_results = search_data.get('movies', [])
-        total_pages = search_data.get('total_pages', 0)
-        total_results = search_data.get('total_results', 0)
+        total_pages = search_data.get('total_pages', 0) + local_pages
+        total_results = search_data.get('total_results', 0) + local_total
+        
+        # Skip movies already listed on the local pages
+        if local_total and search_results:
+            shown = set(catalog_search.search(query, 1, local_total)[0])
+            search_results = [movie for movie in search_results if movie.get('movie_id') not in shown]
         
         # Add poster URLs to movies
         for movie in search_results:
@@ -380,70 +799,75 @@ def api_search_movies():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/autocomplete')
+@track_request_metrics
+def api_autocomplete():
+    """API endpoint for search-box typeahead, answered from the in-memory title index"""
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', AUTOCOMPLETE_K, type=int)
+        limit = max(1, min(limit, AUTOCOMPLETE_K))
+        
+        if title_index is None or not query.strip():
+            return jsonify({'query': query, 'results': []})
+        
+        results = [
+            {
+                'movie_id': movie['movie_id'],
+                'title': movie.get('title'),
+                'release_date': movie.get('release_date'),
+                'poster_url': movie.get('poster_url')
+            }
+            for movie in movie_catalog.get_many(title_index.complete(query, limit))
+        ]
+        return jsonify({'query': query, 'results': results})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/rate-movies')
 def api_rate_movies():
-    """API endpoint to get movies for rating with pagination"""
+    """API endpoint to get movies for rating, by page number or by the opaque cursor of the previous page
+
+    With exclude_rated=true, movies the signed-in user has already rated are skipped.
+    """
     try:
-        # Get page parameter from query string
-        page = request.args.get('page', 1, type=int)
-        movies_per_page = 20
-        total_pages = 20
-        total_movies_needed = movies_per_page * total_pages
-        
-        # Ensure page is within valid range
-        if page < 1:
-            page = 1
-        elif page > total_pages:
-            page = total_pages
-        
-        total_available_movies = len(movies_df)
-        
-        # If we don't have enough movies, adjust the number of pages
-        if total_available_movies < total_movies_needed:
-            total_pages = total_available_movies // movies_per_page
-            total_movies_needed = total_pages * movies_per_page
-            if page > total_pages:
-                page = total_pages
-        
-        # Sort by movie_id to ensure consistent order, then shuffle for variety
-        sorted_movies = movies_df.sort_values('movie_id').reset_index(drop=True)
-        
-        if total_available_movies >= total_movies_needed:
-            sampled_movies = sorted_movies.head(total_movies_needed)
-        else:
-            sampled_movies = sorted_movies
-        
-        # Shuffle the movies for variety while keeping the same set
-        # Use a different random seed for each page to ensure variety
-        import random
-        page_seed = random.randint(1, 1000) + (page * 100)  # Different seed per page
-        sampled_movies = sampled_movies.sample(frac=1, random_state=page_seed).reset_index(drop=True)
-        
-        start_idx = (page - 1) * movies_per_page
-        end_idx = start_idx + movies_per_page
+        pool = get_rating_pool()
+        movies_per_page = RATE_PAGE_SIZE
+        
+        exclude_ids = ()
+        if 'user_id' in session and request.args.get('exclude_rated', 'false').lower() in ('1', 'true', 'yes'):
+            exclude_ids = user_system.get_user_ratings(session['user_id']).keys()
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            position = pool.decode_cursor(cursor)
+            if position is None:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            permutation, offset = position
+            page_movies, next_offset = pool.page_after(permutation, offset, movies_per_page, exclude_ids)
+            return json_bytes_response(fast_json.object_with_arrays({
+                'next_cursor': pool.encode_cursor(permutation, next_offset) if next_offset is not None else None,
+                'movies_per_page': movies_per_page
+            }, {'movies': page_movies}))
+        
+        # Numbered pages follow one shuffle per session, so consecutive pages never repeat a movie
+        permutation = session.get('rate_permutation')
+        if not isinstance(permutation, int) or not 0 <= permutation < len(pool.permutations):
+            permutation = session['rate_permutation'] = random.randrange(len(pool.permutations))
         
-        # Get movies page
-        if start_idx < len(sampled_movies):
-            page_movies = sampled_movies.iloc[start_idx:end_idx].to_dict('records')
-        else:
-            page_movies = []
+        page = request.args.get('page', 1, type=int)
+        total_pages = max(1, -(-pool.available(exclude_ids) // movies_per_page))
+        page = max(1, min(page, total_pages))
         
-        # Clean NaN values from the response
-        import math
-        for movie in page_movies:
-            for key, value in movie.items():
-                if isinstance(value, float) and math.isnan(value):
-                    movie[key] = None
-                elif isinstance(value, str) and value.lower() == 'nan':
-                    movie[key] = None
+        page_movies, total_available, next_offset = pool.page(permutation, page, movies_per_page, exclude_ids)
         
-        return jsonify({
-            'movies': page_movies,
+        return json_bytes_response(fast_json.object_with_arrays({
             'page': page,
             'total_pages': total_pages,
             'movies_per_page': movies_per_page,
-            'total_movies': len(sampled_movies)
-        })
+            'total_movies': total_available,
+            'next_cursor': pool.encode_cursor(permutation, next_offset) if next_offset is not None else None
+        }, {'movies': page_movies}))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -461,20 +885,30 @@ def api_submit_ratings():
         
         user_id = session['user_id']
         
-        for key, value in ratings.items():
-            if key.startswith('rating_'):
-                movie_id = int(key.replace('rating_', ''))
-                rating_value = int(value)
-                
-                if movie_details and str(movie_id) in movie_details:
-                    save_movie_to_local_db(movie_id, movie_details[str(movie_id)])
-                
-                try:
-                    user_system.add_rating(user_id, movie_id, rating_value)
-                    USER_RATINGS_COUNT.inc()
-                    DATABASE_OPERATIONS.labels(operation='add_rating').inc()
-                except Exception as e:
-                    return jsonify({'error': f'Failed to save rating: {str(e)}'}), 500
+        # Validate the whole payload before writing anything
+        try:
+            new_ratings = user_system.validate_ratings({
+                key.replace('rating_', ''): value
+                for key, value in ratings.items() if key.startswith('rating_')
+            })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if movie_details:
+            save_movies_to_local_db({
+                movie_id: movie_details[str(movie_id)]
+                for movie_id in new_ratings if str(movie_id) in movie_details
+            })
+        
+        # One executemany + one commit for the whole page of ratings
+        try:
+            saved = user_system.add_ratings_bulk(user_id, new_ratings)
+            if saved:
+                RATING_BATCH_SIZE.observe(saved)
+                USER_RATINGS_COUNT.inc(saved)
+                DATABASE_OPERATIONS.labels(operation='add_ratings_bulk').inc()
+        except Exception as e:
+            return jsonify({'error': f'Failed to save ratings: {str(e)}'}), 500
         
         return jsonify({'message': 'Ratings submitted successfully'})
     except Exception as e:
@@ -520,7 +954,7 @@ def api_recommendations():
         ACTIVE_USERS.inc()
         
         # Get recommendations
-        recommendations = get_recommendations_for_user(user_id, 12)
+        recommendations = get_cached_recommendations_for_user(user_id, 12)
         
         # Get user's ratings for display
         user_ratings = user_system.get_user_ratings(user_id)
@@ -532,6 +966,41 @@ def api_recommendations():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/recommendations/batch', methods=['POST'])
+@track_request_metrics
+def api_recommendations_batch():
+    """API endpoint to stream recommendations for many users as newline-delimited JSON"""
+    try:
+        # Internal jobs only (email digests, pre-rendering): disabled unless a token is configured
+        if not BATCH_API_TOKEN or request.headers.get('X-Batch-Token') != BATCH_API_TOKEN:
+            return jsonify({'error': 'Not authorized'}), 403
+        
+        data = request.get_json() or {}
+        user_ids = data.get('user_ids', [])
+        n_recommendations = data.get('n', 12)
+        collaborative_mode = data.get('collaborative_mode')
+        
+        if not isinstance(user_ids, list) or not user_ids:
+            return jsonify({'error': 'user_ids must be a non-empty list'}), 400
+        if len(user_ids) > BATCH_MAX_USERS:
+            return jsonify({'error': f'At most {BATCH_MAX_USERS} users per batch'}), 400
+        if collaborative_mode not in (None, 'user', 'item', 'mf'):
+            return jsonify({'error': 'Invalid collaborative mode'}), 400
+        
+        try:
+            user_ids = [int(user_id) for user_id in user_ids]
+            n_recommendations = max(1, min(int(n_recommendations), 100))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid user ID format'}), 400
+        
+        def generate():
+            for user_id, recommendations in get_recommendations_for_users(user_ids, n_recommendations, collaborative_mode):
+                yield json.dumps({'user_id': user_id, 'recommendations': recommendations}, default=str) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/profile')
 def api_profile():
     """API endpoint to get user profile"""
@@ -573,36 +1042,17 @@ def api_rating_history():
         user_id = session['user_id']
         ratings = user_system.get_user_ratings(user_id)
         
-        # Get movie details for the rated movies
+        # Pre-encoded movie fields with the rating spliced in; basic info for movies not in the local catalog
         rating_history = []
-        if ratings and movies_df is not None:
+        if ratings and movie_catalog is not None:
+            rows = movie_catalog.rows_for(ratings.keys())
+            fragments = dict(zip(movie_catalog.movie_ids[rows].tolist(), movie_catalog.fragments(rows, RATING_HISTORY_FIELDS)))
             for movie_id, rating in ratings.items():
-                movie_data = movies_df[movies_df['movie_id'] == movie_id]
-                if not movie_data.empty:
-                    movie_info = movie_data.iloc[0].to_dict()
-                    
-                    # Clean NaN values
-                    import math
-                    for key, value in movie_info.items():
-                        if isinstance(value, float) and math.isnan(value):
-                            movie_info[key] = None
-                        elif isinstance(value, str) and value.lower() == 'nan':
-                            movie_info[key] = None
-                    
-                    rating_history.append({
-                        'movie_id': movie_id,
-                        'rating': rating,
-                        'title': movie_info.get('title', f'Movie {movie_id}'),
-                        'overview': movie_info.get('overview', ''),
-                        'genre': movie_info.get('genre', ''),
-                        'poster_url': movie_info.get('poster_url'),
-                        'backdrop_url': movie_info.get('backdrop_url'),
-                        'vote_average': movie_info.get('vote_average', 0),
-                        'release_date': movie_info.get('release_date', '')
-                    })
+                fragment = fragments.get(movie_id)
+                if fragment is not None:
+                    rating_history.append(fast_json.extend_object(fragment, {'rating': rating}))
                 else:
-                    # If movie not in local database, return basic info
-                    rating_history.append({
+                    rating_history.append(fast_json.dumps({
                         'movie_id': movie_id,
                         'rating': rating,
                         'title': f'Movie {movie_id}',
@@ -612,9 +1062,9 @@ def api_rating_history():
                         'backdrop_url': None,
                         'vote_average': 0,
                         'release_date': ''
-                    })
+                    }))
         
-        return jsonify(rating_history)
+        return json_bytes_response(fast_json.array(rating_history))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -630,20 +1080,15 @@ def api_movie_details():
         if not movie_ids:
             return jsonify([])
         
-        # Filter movies_df to get only the requested movie IDs
-        if movies_df is not None:
-            movie_details = movies_df[movies_df['movie_id'].isin(movie_ids)].to_dict('records')
-            
-            # Clean NaN values from the response
-            import math
-            for movie in movie_details:
-                for key, value in movie.items():
-                    if isinstance(value, float) and math.isnan(value):
-                        movie[key] = None
-                    elif isinstance(value, str) and value.lower() == 'nan':
-                        movie[key] = None
-            
-            return jsonify(movie_details)
+        # Look up only the requested movie IDs, as pre-encoded catalog records in catalog order, each once
+        if movie_catalog is not None:
+            movie_ids = sorted(set(movie_ids))
+            rows = np.unique(movie_catalog.rows_for(movie_ids))
+            return conditional_json_response(
+                make_etag(movie_catalog.version, ','.join(map(str, movie_ids))),
+                MOVIE_DETAILS_MAX_AGE,
+                lambda: fast_json.array(movie_catalog.fragments(rows))
+            )
         else:
             return jsonify([])
     except Exception as e:
@@ -865,4 +1310,6 @@ def recommendations():
     return redirect('http://localhost:3000/recommendations')
 
 if __name__ == '__main__':
+    # Turn SIGTERM (docker stop) into a normal exit so atexit handlers flush queued writes
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
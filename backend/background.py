@@ -0,0 +1,50 @@
+import threading
+from typing import Callable, Optional
+
+class PeriodicTask:
+    """Run a function on a daemon thread every `interval` seconds, or sooner when triggered"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], None], run_immediately: bool = True):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_immediately = run_immediately
+        self.last_error: Optional[Exception] = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'PeriodicTask':
+        """Start the worker thread (no-op if it is already running)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def trigger(self):
+        """Ask the worker to run as soon as possible instead of waiting for the interval"""
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the worker thread and wait for the current run to finish"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        if not self.run_immediately:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+        while not self._stopped.is_set():
+            try:
+                self.func()
+                self.last_error = None
+            except Exception as e:
+                # Keep the schedule alive; the next run gets another chance
+                self.last_error = e
+
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
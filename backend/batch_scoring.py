@@ -0,0 +1,25 @@
+import numpy as np
+from typing import List, Tuple
+
+def top_n_per_row(scores: np.ndarray, n: int, min_score: float = -np.inf) -> List[List[Tuple[int, float]]]:
+    """Best n (column, score) pairs of every row of a dense score block, highest first
+
+    Entries at or below `min_score` (e.g. -inf for excluded items, 0 for
+    items with no evidence) are never returned.
+    """
+    n_rows, n_cols = scores.shape
+    n = min(n, n_cols)
+    if n <= 0 or n_rows == 0:
+        return [[] for _ in range(n_rows)]
+
+    top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    results = []
+    for row_cols, row_scores in zip(top, top_scores):
+        keep = row_scores > min_score
+        results.append(list(zip(row_cols[keep].tolist(), row_scores[keep].tolist())))
+    return results
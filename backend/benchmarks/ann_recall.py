@@ -0,0 +1,124 @@
+"""Recall-vs-exact benchmark for the LSH ANN index.
+
+Runs offline against the cached catalog (content vectors) and a synthetic
+ratings matrix (user vectors), sweeping the recall/speed knobs:
+
+    cd backend && python benchmarks/ann_recall.py --users 20000 --movies 5000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ann_index import RandomProjectionLSH
+
+
+def load_content_vectors(catalog_path):
+    import pandas as pd
+    from content_index import ContentIndex
+
+    with open(catalog_path, 'r') as f:
+        movies_df = pd.DataFrame(json.load(f))
+    return ContentIndex.build(movies_df).matrix
+
+
+def synthetic_user_vectors(n_users, n_movies, ratings_per_user, seed=42):
+    """Ratings with Zipfian movie popularity so some columns are dense and most are sparse"""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_movies + 1) ** 1.1
+    popularity /= popularity.sum()
+    rows = np.repeat(np.arange(n_users), ratings_per_user)
+    cols = rng.choice(n_movies, size=n_users * ratings_per_user, p=popularity)
+    values = rng.integers(1, 6, size=len(cols)).astype(np.float32)
+    matrix = sparse.csr_matrix((values, (rows, cols)), shape=(n_users, n_movies))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def exact_top_k(vectors, norms, query_row, k):
+    query = vectors[query_row]
+    dots = np.asarray((vectors @ query.T).todense()).ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarities = np.where(norms > 0, dots / (norms * norms[query_row]), 0.0)
+    similarities[query_row] = -np.inf
+    top = np.argpartition(-similarities, k - 1)[:k]
+    return set(top.tolist())
+
+
+def run(name, vectors, n_queries, k, configs, seed=0):
+    rng = np.random.default_rng(seed)
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    queries = rng.choice(np.flatnonzero(norms > 0), size=min(n_queries, int((norms > 0).sum())), replace=False)
+
+    exact_times, truth = [], {}
+    for q in queries:
+        start = time.perf_counter()
+        truth[q] = exact_top_k(vectors, norms, q, k)
+        exact_times.append(time.perf_counter() - start)
+
+    results = []
+    for n_tables, n_bits, probe_radius in configs:
+        start = time.perf_counter()
+        index = RandomProjectionLSH(n_tables, n_bits, probe_radius).fit(vectors)
+        build_seconds = time.perf_counter() - start
+
+        recalls, times, candidate_counts = [], [], []
+        for q in queries:
+            start = time.perf_counter()
+            found = index.search(vectors[q], vectors, k, exclude_rows=[q])
+            times.append(time.perf_counter() - start)
+            candidate_counts.append(len(index.candidates(vectors[q])))
+            recalls.append(len({row for row, _ in found} & truth[q]) / k)
+
+        results.append({
+            'dataset': name,
+            'rows': int(vectors.shape[0]),
+            'n_tables': n_tables,
+            'n_bits': n_bits,
+            'probe_radius': probe_radius,
+            'recall_at_k': float(np.mean(recalls)),
+            'mean_candidates': float(np.mean(candidate_counts)),
+            'build_seconds': build_seconds,
+            'ann_p50_ms': float(np.percentile(times, 50) * 1000),
+            'ann_p99_ms': float(np.percentile(times, 99) * 1000),
+            'exact_p50_ms': float(np.percentile(exact_times, 50) * 1000),
+            'exact_p99_ms': float(np.percentile(exact_times, 99) * 1000),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cached_movies.json'))
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--movies', type=int, default=5000)
+    parser.add_argument('--ratings-per-user', type=int, default=30)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    configs = [(8, 6, 0), (8, 6, 1), (16, 8, 1), (24, 8, 1), (32, 10, 1)]
+
+    results = []
+    if os.path.exists(args.catalog):
+        results += run('content', load_content_vectors(args.catalog), args.queries, args.k, configs)
+    results += run('users', synthetic_user_vectors(args.users, args.movies, args.ratings_per_user), args.queries, args.k, configs)
+
+    print(f"{'dataset':<8} {'rows':>7} {'tables':>6} {'bits':>4} {'probe':>5} {'recall':>7} {'cands':>7} {'ann p50':>9} {'exact p50':>10}")
+    for r in results:
+        print(f"{r['dataset']:<8} {r['rows']:>7} {r['n_tables']:>6} {r['n_bits']:>4} {r['probe_radius']:>5} "
+              f"{r['recall_at_k']:>7.3f} {r['mean_candidates']:>7.0f} {r['ann_p50_ms']:>7.2f}ms {r['exact_p50_ms']:>8.2f}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
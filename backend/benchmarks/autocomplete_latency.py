@@ -0,0 +1,88 @@
+"""Latency of /api/autocomplete lookups in the title prefix index.
+
+Builds the TitlePrefixIndex over the cached catalog, repeated up to --movies
+titles (each copy gets a numeric suffix so titles stay distinct), then
+replays typeahead traffic: every prefix of randomly chosen titles, one
+keystroke at a time, and reports p50/p95/p99/max per lookup:
+
+    cd backend && python benchmarks/autocomplete_latency.py --movies 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from movie_catalog import MovieCatalog
+from title_index import TitlePrefixIndex
+
+
+def synthetic_catalog(catalog_path, n_movies):
+    """Repeat the cached catalog up to n_movies rows with unique ids and titles"""
+    with open(catalog_path, 'r') as f:
+        base = pd.DataFrame(json.load(f))
+    repeats = -(-n_movies // len(base))
+    copies = []
+    for copy in range(repeats):
+        frame = base.copy()
+        if copy:
+            frame['title'] = frame['title'] + f' {copy}'
+            frame['popularity'] = frame['popularity'] * random.random()
+        copies.append(frame)
+    movies_df = pd.concat(copies, ignore_index=True).head(n_movies)
+    movies_df['movie_id'] = np.arange(1, len(movies_df) + 1)
+    return movies_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cached_movies.json'))
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--titles', type=int, default=2000, help='titles typed out keystroke by keystroke')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    movies_df = synthetic_catalog(args.catalog, args.movies)
+    catalog = MovieCatalog(movies_df)
+
+    start_time = time.perf_counter()
+    index = TitlePrefixIndex.build(catalog, args.k)
+    build_seconds = time.perf_counter() - start_time
+
+    # Typeahead traffic: prefixes of real titles, including the trailing space between words
+    titles = random.sample(movies_df['title'].tolist(), min(args.titles, len(movies_df)))
+    queries = [title[:length] for title in titles for length in range(1, len(title) + 1)]
+
+    latencies = np.empty(len(queries))
+    empty = 0
+    for i, query in enumerate(queries):
+        start_time = time.perf_counter()
+        results = index.complete(query)
+        latencies[i] = time.perf_counter() - start_time
+        empty += not results
+
+    percentiles = {f'p{p}': float(np.percentile(latencies, p) * 1e6) for p in (50, 95, 99)}
+    percentiles['max'] = float(latencies.max() * 1e6)
+    print(f"{len(index)} titles indexed in {build_seconds:.2f}s, {len(queries)} lookups ({empty} with no match)")
+    print('  '.join(f"{name} {value:.1f}us" for name, value in percentiles.items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'movies': len(index),
+                'build_seconds': build_seconds,
+                'lookups': len(queries),
+                'latency_us': percentiles
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
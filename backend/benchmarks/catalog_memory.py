@@ -0,0 +1,85 @@
+"""Memory report for the compact catalog layout.
+
+Compares, column by column, a pandas DataFrame of the catalog (int64 ids,
+float64 scores, Python-string genres and full image URLs) with the compact
+columnar encoding used by MovieCatalog / CatalogSnapshot (int32 ids, float32
+scores, genre code lists, URLs rebuilt from paths), scaled to 100k movies:
+
+    cd backend && python benchmarks/catalog_memory.py --movies 100000
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from catalog_snapshot import CatalogSnapshot
+from tmdb_client import TMDBClient
+
+
+def synthetic_catalog(catalog_path, n_movies):
+    """Repeat the cached catalog up to n_movies rows with unique ids"""
+    with open(catalog_path, 'r') as f:
+        base = pd.DataFrame(json.load(f))
+    repeats = -(-n_movies // len(base))
+    movies_df = pd.concat([base] * repeats, ignore_index=True).head(n_movies)
+    movies_df['movie_id'] = np.arange(1, len(movies_df) + 1)
+    return movies_df
+
+
+def records_bytes(movies_df, sample=2000):
+    """Approximate size of one dict per movie (what the catalog held before), from a sample"""
+    records = movies_df.head(sample).to_dict('records')
+    total = 0
+    for record in records:
+        total += sys.getsizeof(record)
+        total += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in record.items())
+    return total * len(movies_df) / max(1, len(records))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cached_movies.json'))
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    tmdb_client = TMDBClient()
+    url_builders = {'poster_url': ('poster_path', tmdb_client.get_poster_url), 'backdrop_url': ('backdrop_path', tmdb_client.get_backdrop_url)}
+
+    movies_df = synthetic_catalog(args.catalog, args.movies)
+    frame_bytes = movies_df.memory_usage(deep=True, index=False).to_dict()
+    compact_bytes = CatalogSnapshot.from_frame(movies_df, url_builders=url_builders).nbytes()
+    scale = 100000 / len(movies_df)
+
+    rows = []
+    for name in movies_df.columns:
+        before, after = int(frame_bytes[name]), int(compact_bytes.get(name, 0))
+        rows.append({'column': name, 'dataframe_bytes': before, 'compact_bytes': after, 'saved_per_100k': int((before - after) * scale)})
+    total_before, total_after = sum(r['dataframe_bytes'] for r in rows), sum(r['compact_bytes'] for r in rows)
+    dict_bytes = int(records_bytes(movies_df))
+
+    print(f"{len(movies_df)} movies")
+    print(f"{'column':<14} {'DataFrame':>12} {'compact':>12} {'saved/100k':>12}")
+    for r in rows:
+        print(f"{r['column']:<14} {r['dataframe_bytes']:>12,} {r['compact_bytes']:>12,} {r['saved_per_100k']:>12,}")
+    print(f"{'total':<14} {total_before:>12,} {total_after:>12,} {int((total_before - total_after) * scale):>12,}")
+    print(f"per-movie dict records (no longer kept): {dict_bytes:,} bytes, {int(dict_bytes * scale):,} per 100k")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'movies': len(movies_df),
+                'columns': rows,
+                'dataframe_bytes': total_before,
+                'compact_bytes': total_after,
+                'saved_per_100k': int((total_before - total_after) * scale),
+                'dict_records_bytes': dict_bytes,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
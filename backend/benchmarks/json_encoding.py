@@ -0,0 +1,89 @@
+"""Encoding cost of movie list responses: per-request records + jsonify vs pre-encoded fragments.
+
+For list sizes typical of the list endpoints (12 popular movies, a 20-movie
+rating page, a long rating history), times building the response body with
+
+  - legacy:    DataFrame rows -> to_dict('records') -> NaN/"nan" scrub -> jsonify
+  - records:   MovieCatalog.records() (decoded, NaN-free) -> jsonify
+  - fast_json: MovieCatalog.records() -> fast_json.dumps (orjson when installed)
+  - fragments: MovieCatalog.fragments() concatenated (encoded once, cache warm)
+
+and reports the mean time per response in microseconds:
+
+    cd backend && python benchmarks/json_encoding.py --sizes 12 20 200
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fast_json
+from movie_catalog import MovieCatalog
+
+
+def legacy_records(movies_df, rows):
+    """What the endpoints did before records were sanitized once at load"""
+    records = movies_df.iloc[rows].to_dict('records')
+    for record in records:
+        for key, value in record.items():
+            if pd.isna(value) or (isinstance(value, str) and value.lower() == 'nan'):
+                record[key] = None
+    return records
+
+
+def time_per_call(fn, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start_time) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cached_movies.json'))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[12, 20, 200])
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r') as f:
+        movies_df = pd.DataFrame(json.load(f))
+    catalog = MovieCatalog(movies_df)
+    catalog.fragments()
+
+    app = Flask(__name__)
+    random.seed(args.seed)
+    print(f"encoder: {'orjson' if fast_json.orjson is not None else 'json (orjson not installed)'}")
+
+    results = {}
+    with app.app_context():
+        for size in args.sizes:
+            rows = np.asarray(random.sample(range(len(catalog)), min(size, len(catalog))))
+            timings = {
+                'legacy': time_per_call(lambda: jsonify(legacy_records(movies_df, rows)).get_data(), args.repeat),
+                'records': time_per_call(lambda: jsonify(catalog.records(rows)).get_data(), args.repeat),
+                'fast_json': time_per_call(lambda: fast_json.dumps(catalog.records(rows)), args.repeat),
+                'fragments': time_per_call(lambda: fast_json.array(catalog.fragments(rows)), args.repeat)
+            }
+            results[size] = timings
+            print(f"{len(rows):>5} movies  " + '  '.join(f"{name} {value:.1f}us" for name, value in timings.items())
+                  + f"  ({timings['legacy'] / timings['fragments']:.0f}x)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'encoder': 'orjson' if fast_json.orjson is not None else 'json',
+                'mean_us': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Recommendation engines and endpoints at scale, on synthetic data, fully offline.
+
+For every combination of --users and --movies, seeds a temporary directory
+with a Zipfian synthetic catalog and cinemate.db (see synthetic_data.py), then
+runs a fresh Python process there that imports the app and times
+
+  - each engine: content-based, collaborative (user / item / mf) and the hybrid
+    get_recommendations_for_user, on a sample of users
+  - each endpoint through the Flask test client, signed in as sampled users
+
+reporting p50/p95/p99/max latency in milliseconds, model build times and the
+process's peak RSS. TMDb is pointed at a closed local port and the
+recommendation cache is disabled, so every call really computes its result:
+
+    cd backend && python benchmarks/recommendation_suite.py \\
+        --users 1000 10000 100000 --movies 1000 50000 --output results.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import WORDS
+
+COLLABORATIVE_MODES = ('user', 'item', 'mf')
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is in KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def summarize(latencies) -> dict:
+    latencies = np.asarray(latencies) * 1000
+    if len(latencies) == 0:
+        return {'calls': 0}
+    summary = {f'p{p}': float(np.percentile(latencies, p)) for p in (50, 95, 99)}
+    summary['max'] = float(latencies.max())
+    summary['calls'] = int(len(latencies))
+    return summary
+
+
+def timed(fn, args_list):
+    latencies = []
+    for args in args_list:
+        start_time = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start_time)
+    return summarize(latencies)
+
+
+def run_scale(samples: int, n_recommendations: int, seed: int) -> dict:
+    """Body of the per-scale child process; the working directory holds the seeded dataset"""
+    result = {'rss_mb': {}, 'build_seconds': {}}
+    rng = random.Random(seed)
+
+    start_time = time.perf_counter()
+    import app
+    result['build_seconds']['app_import'] = time.perf_counter() - start_time
+    result['rss_mb']['after_import'] = peak_rss_mb()
+
+    user_system = app.user_system
+    start_time = time.perf_counter()
+    user_system.ratings_matrix
+    result['build_seconds']['ratings_matrix'] = time.perf_counter() - start_time
+
+    rated_users = user_system.ratings_matrix.user_ids
+    sample_users = [int(user_id) for user_id in rng.sample(list(rated_users), min(samples, len(rated_users)))]
+    catalog_ids = app.movie_catalog.ids()
+
+    def available(user_id):
+        rated = set(user_system.get_user_ratings(user_id))
+        return [movie_id for movie_id in catalog_ids if movie_id not in rated]
+
+    engine_args = [(user_id, available(user_id)) for user_id in sample_users]
+
+    engines = {}
+    engines['content'] = timed(
+        lambda user_id, ids: user_system.get_content_based_recommendations(
+            user_id, n_recommendations, ids, app.movie_catalog, app.content_index, app.neighbor_table, app.content_ann),
+        engine_args)
+
+    for mode in COLLABORATIVE_MODES:
+        # Item similarities and the factor model are fitted by background jobs in the app; fit them here, timed
+        start_time = time.perf_counter()
+        if mode == 'item':
+            user_system.refresh_item_similarity()
+        elif mode == 'mf':
+            user_system.refresh_factor_model()
+        if mode != 'user':
+            result['build_seconds'][f'collaborative_{mode}_fit'] = time.perf_counter() - start_time
+        engines[f'collaborative_{mode}'] = timed(
+            lambda user_id, ids: user_system.get_collaborative_recommendations(user_id, n_recommendations, ids, mode),
+            engine_args)
+
+    engines['hybrid'] = timed(
+        lambda user_id: app.get_recommendations_for_user(user_id, n_recommendations),
+        [(user_id,) for user_id in sample_users])
+    result['engines'] = engines
+    result['rss_mb']['after_engines'] = peak_rss_mb()
+
+    # Endpoints, each request signed in as the next sampled user
+    client = app.app.test_client()
+    sample_ids = rng.sample(catalog_ids, min(len(catalog_ids), 200))
+    endpoints = {
+        'recommendations': lambda: '/api/recommendations',
+        'rating_history': lambda: '/api/rating-history',
+        'user_stats': lambda: '/api/user-stats',
+        'popular_movies': lambda: '/api/popular-movies',
+        'rate_movies': lambda: f'/api/rate-movies?page={rng.randint(1, 20)}',
+        'movie_details': lambda: '/api/movie-details?ids=' + ','.join(map(str, rng.sample(sample_ids, 12))),
+        'search_movies': lambda: f'/api/search-movies?q={rng.choice(WORDS)}',
+        'autocomplete': lambda: f'/api/autocomplete?q={rng.choice(WORDS)[:rng.randint(1, 4)]}'
+    }
+
+    def request(path, user_id):
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}')
+
+    result['endpoints'] = {
+        name: timed(request, [(path(), user_id) for user_id in sample_users])
+        for name, path in endpoints.items()
+    }
+    result['rss_mb']['peak'] = peak_rss_mb()
+    return result
+
+
+def run_child(args):
+    result = run_scale(args.samples, args.n, args.seed)
+    with open(args.result_path, 'w') as f:
+        json.dump(result, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--movies', type=int, nargs='+', default=[1000])
+    parser.add_argument('--ratings-per-user', type=float, default=20)
+    parser.add_argument('--zipf-a', type=float, default=1.1)
+    parser.add_argument('--samples', type=int, default=100, help='users timed per engine and endpoint')
+    parser.add_argument('--n', type=int, default=12, help='recommendations per call')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='keep the seeded temporary directories')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--result-path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.result_path:
+        run_child(args)
+        return
+
+    results = []
+    for n_movies in args.movies:
+        for n_users in args.users:
+            work_dir = tempfile.mkdtemp(prefix=f'cinemate-bench-{n_users}u-{n_movies}m-')
+            try:
+                # Seeded by a separate process, so this one's memory never counts against a scale
+                start_time = time.perf_counter()
+                subprocess.run(
+                    [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'synthetic_data.py'),
+                     '--out', work_dir, '--users', str(n_users), '--movies', str(n_movies),
+                     '--ratings-per-user', str(args.ratings_per_user), '--zipf-a', str(args.zipf_a), '--seed', str(args.seed)],
+                    stdout=subprocess.DEVNULL, check=True
+                )
+                with open(os.path.join(work_dir, 'dataset.json'), 'r') as f:
+                    dataset = json.load(f)
+                dataset['seed_seconds'] = time.perf_counter() - start_time
+                print(f"{n_users} users x {n_movies} movies: {dataset['ratings']} ratings seeded in {dataset['seed_seconds']:.1f}s", flush=True)
+
+                result_path = os.path.join(work_dir, 'result.json')
+                env = dict(
+                    os.environ,
+                    PYTHONPATH=os.path.abspath(BACKEND_DIR),
+                    TMDB_API_KEY='',
+                    TMDB_BASE_URL='http://127.0.0.1:9',
+                    RECOMMENDATION_CACHE_SIZE='0',
+                    COLLABORATIVE_MODE='user',
+                    ANN_BACKEND='',
+                    CONTENT_BACKEND='neighbors'
+                )
+                subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--result-path', result_path,
+                     '--samples', str(args.samples), '--n', str(args.n), '--seed', str(args.seed)],
+                    cwd=work_dir, env=env, check=True
+                )
+                with open(result_path, 'r') as f:
+                    result = json.load(f)
+            finally:
+                if not args.keep:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+
+            result['dataset'] = dataset
+            results.append(result)
+            for section in ('engines', 'endpoints'):
+                for name, summary in result[section].items():
+                    print(f"  {section[:-1]:<8} {name:<24} p50 {summary['p50']:8.2f}ms  p95 {summary['p95']:8.2f}ms  p99 {summary['p99']:8.2f}ms")
+            print('  build   ' + '  '.join(f"{name} {seconds:.2f}s" for name, seconds in result['build_seconds'].items()))
+            print(f"  peak RSS {result['rss_mb']['peak']:.0f} MB", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'params': {key: value for key, value in vars(args).items() if key not in ('result_path', 'output', 'keep')},
+                'python': sys.version.split()[0],
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
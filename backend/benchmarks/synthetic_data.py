@@ -0,0 +1,155 @@
+"""Synthetic catalogs and rating databases for offline benchmarks.
+
+Movie popularity follows a Zipf law: the movie of popularity rank r is picked
+by a rating with probability proportional to 1 / r**zipf_a, so a few titles
+collect most ratings and the long tail gets few, as in real rating logs.
+Ratings are a movie quality plus a user bias plus noise, so the collaborative
+engines have some signal to find. To write a catalog, a database and
+dataset.json (statistics) into a directory:
+
+    cd backend && python benchmarks/synthetic_data.py --users 10000 --movies 50000 --out /tmp/bench
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import numpy as np
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family', 'Fantasy',
+    'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction', 'Thriller', 'War', 'Western'
+]
+
+WORDS = [
+    'night', 'river', 'silent', 'empire', 'shadow', 'journey', 'last', 'golden', 'storm', 'city', 'lost',
+    'dream', 'winter', 'fire', 'secret', 'island', 'broken', 'star', 'ghost', 'kingdom', 'midnight', 'road',
+    'ocean', 'wild', 'iron', 'glass', 'hidden', 'rising', 'dark', 'summer', 'crown', 'echo', 'frontier',
+    'garden', 'heart', 'legend', 'machine', 'north', 'paper', 'queen', 'signal', 'tower', 'valley', 'wolf'
+]
+
+
+def zipf_weights(n: int, zipf_a: float) -> np.ndarray:
+    """Probability of each popularity rank 1..n"""
+    weights = 1.0 / np.arange(1, n + 1) ** zipf_a
+    return weights / weights.sum()
+
+
+def synthetic_movies(n_movies: int, zipf_a: float = 1.1, seed: int = 42) -> List[Dict]:
+    """Catalog records in the cached_movies.json format; movie_id i has popularity rank rank_of[i]"""
+    rng = np.random.RandomState(seed)
+    rank_of = rng.permutation(n_movies)
+    popularity = 1000.0 * zipf_weights(n_movies, zipf_a)[rank_of] / zipf_weights(n_movies, zipf_a)[0]
+    movies = []
+    for i in range(n_movies):
+        title_words = rng.choice(WORDS, rng.randint(1, 4), replace=False)
+        genres = rng.choice(GENRES, rng.randint(1, 4), replace=False)
+        movies.append({
+            'movie_id': i + 1,
+            'title': ' '.join(title_words).title() + f' {i + 1}',
+            'overview': ' '.join(rng.choice(WORDS, 25)),
+            'genre': ', '.join(genres),
+            'poster_path': None,
+            'backdrop_path': None,
+            'vote_average': round(float(rng.uniform(3.0, 9.0)), 1),
+            'release_date': f'{rng.randint(1950, 2025)}-{rng.randint(1, 13):02d}-{rng.randint(1, 29):02d}',
+            'popularity': round(float(popularity[i]), 4),
+            'poster_url': None,
+            'backdrop_url': None
+        })
+    return movies
+
+
+def synthetic_ratings(n_users: int, n_movies: int, ratings_per_user: float = 20, zipf_a: float = 1.1, seed: int = 42) -> np.ndarray:
+    """(user_id, movie_id, rating) rows, at most one per user and movie; movie choice is Zipf over popularity rank"""
+    rng = np.random.RandomState(seed)
+    # Same rank permutation as synthetic_movies, so popular movies are the ones rated most
+    rank_of = np.random.RandomState(seed).permutation(n_movies)
+    movie_at_rank = np.argsort(rank_of) + 1
+
+    counts = np.minimum(rng.geometric(1.0 / max(1.0, ratings_per_user), n_users), n_movies)
+    user_ids = np.repeat(np.arange(1, n_users + 1), counts)
+    cdf = np.cumsum(zipf_weights(n_movies, zipf_a))
+    ranks = np.minimum(np.searchsorted(cdf, rng.random_sample(len(user_ids)) * cdf[-1]), n_movies - 1)
+    movie_ids = movie_at_rank[ranks]
+
+    # Repeated (user, movie) draws collapse to one rating
+    pairs = np.unique(user_ids.astype(np.int64) * (n_movies + 1) + movie_ids)
+    user_ids, movie_ids = pairs // (n_movies + 1), pairs % (n_movies + 1)
+
+    quality = rng.normal(3.4, 0.7, n_movies + 1)
+    bias = rng.normal(0.0, 0.5, n_users + 1)
+    ratings = np.clip(np.rint(quality[movie_ids] + bias[user_ids] + rng.normal(0.0, 0.8, len(pairs))), 1, 5)
+    return np.column_stack([user_ids, movie_ids, ratings]).astype(np.int64)
+
+
+def seed_database(db_path: str, n_users: int, ratings: np.ndarray):
+    """Create the schema through UserSystem and bulk-load users and ratings"""
+    from user_system import UserSystem
+
+    UserSystem(db_path).db.close()
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        'INSERT INTO users (id, username, email, password_hash) VALUES (?, ?, ?, ?)',
+        ((user_id, f'bench{user_id}', f'bench{user_id}@example.com', '!') for user_id in range(1, n_users + 1))
+    )
+    conn.executemany(
+        'INSERT INTO user_ratings (user_id, movie_id, rating) VALUES (?, ?, ?)',
+        ratings.tolist()
+    )
+    now = time.time()
+    conn.executemany(
+        'INSERT INTO user_ratings_updates (user_id, updated_at) VALUES (?, ?)',
+        ((int(user_id), now) for user_id in np.unique(ratings[:, 0]))
+    )
+    conn.commit()
+    conn.close()
+
+
+def write_dataset(out_dir: str, n_users: int, n_movies: int, ratings_per_user: float = 20, zipf_a: float = 1.1, seed: int = 42) -> Dict:
+    """Write cached_movies.json and cinemate.db into out_dir; returns dataset statistics
+
+    Importing user_system opens ./cinemate.db as a side effect, so call this
+    with out_dir as the working directory (as main() does).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'cached_movies.json'), 'w') as f:
+        json.dump(synthetic_movies(n_movies, zipf_a, seed), f)
+    ratings = synthetic_ratings(n_users, n_movies, ratings_per_user, zipf_a, seed)
+    seed_database(os.path.join(out_dir, 'cinemate.db'), n_users, ratings)
+    per_movie = np.bincount(ratings[:, 1], minlength=n_movies + 1)[1:]
+    stats = {
+        'users': n_users,
+        'movies': n_movies,
+        'ratings': int(len(ratings)),
+        'rated_users': int(len(np.unique(ratings[:, 0]))),
+        'top_1pct_movie_share': float(np.sort(per_movie)[::-1][:max(1, n_movies // 100)].sum() / max(1, len(ratings)))
+    }
+    with open(os.path.join(out_dir, 'dataset.json'), 'w') as f:
+        json.dump(stats, f)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--movies', type=int, default=1000)
+    parser.add_argument('--ratings-per-user', type=float, default=20)
+    parser.add_argument('--zipf-a', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', required=True, help='directory for cached_movies.json and cinemate.db')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    os.chdir(args.out)
+    start_time = time.perf_counter()
+    stats = write_dataset('.', args.users, args.movies, args.ratings_per_user, args.zipf_a, args.seed)
+    print(json.dumps(stats), f'({time.perf_counter() - start_time:.1f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Cold-start catalog fetch against a local stub TMDb server.
+
+Starts an in-process HTTP server that mimics /movie/popular and
+/genre/movie/list with a fixed per-request latency (and optionally a share of
+503 responses), then times the old page-by-page loop against
+TMDBClient.get_popular_movies_pages and checks both return the same movies:
+
+    cd backend && python benchmarks/tmdb_bootstrap.py --pages 50 --latency-ms 80
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tmdb_client import TMDBClient
+
+GENRES = [{'id': 28, 'name': 'Action'}, {'id': 18, 'name': 'Drama'}, {'id': 35, 'name': 'Comedy'}, {'id': 53, 'name': 'Thriller'}]
+
+
+def stub_handler(total_pages, latency, error_rate, counters):
+    """Request handler answering like TMDb, after `latency` seconds"""
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, as TMDb
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            time.sleep(latency)
+            with lock:
+                counters['requests'] += 1
+                fail = rng.random() < error_rate
+            if fail:
+                return self._send(503, {'status_message': 'Service unavailable'})
+
+            if url.path.endswith('/genre/movie/list'):
+                return self._send(200, {'genres': GENRES})
+            if url.path.endswith('/movie/popular'):
+                page = int(parse_qs(url.query).get('page', ['1'])[0])
+                results = [] if page > total_pages else [
+                    {
+                        'id': page * 100 + i,
+                        'title': f'Movie {page}-{i}',
+                        'overview': f'Overview of movie {page}-{i}',
+                        'genre_ids': [GENRES[i % len(GENRES)]['id']],
+                        'poster_path': f'/p{page}_{i}.jpg',
+                        'backdrop_path': None,
+                        'vote_average': 5 + (i % 5),
+                        'release_date': '2020-01-01',
+                        'popularity': float(page * i)
+                    }
+                    for i in range(20)
+                ]
+                return self._send(200, {'page': page, 'results': results})
+            self._send(404, {'status_message': 'Not found'})
+
+    return Handler
+
+
+def sequential_fetch(client, pages):
+    """The previous bootstrap loop: one page after another, stop at the first empty page"""
+    movies = []
+    for page in range(1, pages + 1):
+        page_movies = client.get_popular_movies(page=page, limit=20)
+        if page_movies:
+            movies.extend(page_movies)
+        else:
+            break
+    return movies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 503')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--deadline', type=float, default=60.0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    counters = {'requests': 0}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), stub_handler(args.pages, args.latency_ms / 1000.0, args.error_rate, counters))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/3'
+
+    results = {'pages': args.pages, 'latency_ms': args.latency_ms, 'error_rate': args.error_rate, 'workers': args.workers}
+    fetched = {}
+    for name in ('sequential', 'concurrent'):
+        client = TMDBClient(api_key='stub', base_url=base_url, backoff_factor=0.01)
+        counters['requests'] = 0
+        start_time = time.perf_counter()
+        if name == 'sequential':
+            fetched[name] = sequential_fetch(client, args.pages)
+        else:
+            fetched[name] = client.get_popular_movies_pages(range(1, args.pages + 1), limit=20, max_workers=args.workers, deadline=args.deadline)
+        elapsed = time.perf_counter() - start_time
+        results[name] = {'seconds': round(elapsed, 3), 'movies': len(fetched[name]), 'requests': counters['requests']}
+        print(f"{name:<11} {elapsed:8.2f}s  {len(fetched[name]):5d} movies  {counters['requests']:6d} requests")
+
+    same = [m['movie_id'] for m in fetched['sequential']] == [m['movie_id'] for m in fetched['concurrent']]
+    results['same_movies'] = same
+    print(f"speedup {results['sequential']['seconds'] / max(results['concurrent']['seconds'], 1e-9):.1f}x, same movies: {same}")
+    server.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+class LRUTTLCache:
+    """Thread-safe bounded LRU cache whose entries also expire after a TTL
+
+    `on_event` is called with 'hit', 'miss', 'eviction', 'expiration' or
+    'invalidation' so callers can export counters without this module
+    depending on any metrics library.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300, on_event: Optional[Callable[[str], None]] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_event = on_event
+        self.clock = clock
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _emit(self, event: str):
+        if self.on_event is not None:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                pass
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or `default` if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    event = 'hit'
+                else:
+                    del self._entries[key]
+                    value = default
+                    event = 'expiration'
+            else:
+                value = default
+                event = 'miss'
+
+        self._emit(event)
+        if event == 'expiration':
+            self._emit('miss')
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+
+        for _ in range(evicted):
+            self._emit('eviction')
+
+    def invalidate(self, key: Hashable):
+        """Drop one entry if present"""
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+        if removed:
+            self._emit('invalidation')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[1] > self.clock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,65 @@
+import os
+import json
+import threading
+from typing import List, Dict, Callable
+
+class CatalogJournal:
+    """Append-only NDJSON journal of movies added to the catalog since the last snapshot
+
+    Each new movie costs one line appended to the journal instead of a rewrite
+    of the whole catalog. Startup replays snapshot + journal; compact() folds
+    the journal back into the catalog files and only then truncates it.
+    """
+
+    def __init__(self, path: str = "cached_movies.journal.ndjson"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = 0
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def append(self, movie: Dict):
+        """Append one movie record as a JSON line"""
+        self.append_many([movie])
+
+    def append_many(self, movies: List[Dict]):
+        """Append several movie records with a single write"""
+        if not movies:
+            return
+        lines = ''.join(json.dumps(movie, default=str) + '\n' for movie in movies)
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(lines)
+            self._entries += len(movies)
+
+    def replay(self) -> List[Dict]:
+        """All journaled records in append order; a torn last line (crash mid-write) is skipped"""
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with self._lock:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+            self._entries = len(records)
+        return records
+
+    def compact(self, write_catalog: Callable[[], None]):
+        """Write the catalog with `write_catalog()` (which must swap its files in atomically), then truncate the journal
+
+        Appends wait for the lock, so a movie is always in the catalog files,
+        the journal, or both (replay skips movies the catalog already has). If
+        `write_catalog()` raises, the journal is kept as it was.
+        """
+        with self._lock:
+            write_catalog()
+            open(self.path, 'w').close()
+            self._entries = 0
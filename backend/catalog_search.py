@@ -0,0 +1,77 @@
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Column weights for bm25(): a title match counts most, then genre, then overview
+BM25_WEIGHTS = (10.0, 1.0, 2.0)
+
+class CatalogSearchIndex:
+    """In-memory SQLite FTS5 index over catalog title, overview and genre, ranked with BM25
+
+    The last query term is matched as a prefix, so keystroke-driven queries
+    ("incep") find "Inception" before the word is complete.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self._conn.execute('''
+            CREATE VIRTUAL TABLE movies_fts USING fts5(
+                title, overview, genre,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+
+    @classmethod
+    def build(cls, movie_catalog, chunk_size: int = 5000) -> 'CatalogSearchIndex':
+        """Index every movie in the catalog, decoding records a chunk at a time"""
+        index = cls()
+        for start in range(0, len(movie_catalog), chunk_size):
+            index.add_movies(movie_catalog.records(range(start, min(start + chunk_size, len(movie_catalog)))))
+        return index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM movies_fts').fetchone()[0]
+
+    def add_movies(self, movies: Iterable[Dict]):
+        """Index (or re-index) movies; the rowid is the movie_id"""
+        rows = [
+            (int(movie['movie_id']), movie.get('title') or '', movie.get('overview') or '', movie.get('genre') or '')
+            for movie in movies
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany('DELETE FROM movies_fts WHERE rowid = ?', [(row[0],) for row in rows])
+            self._conn.executemany('INSERT INTO movies_fts (rowid, title, overview, genre) VALUES (?, ?, ?, ?)', rows)
+            self._conn.commit()
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """FTS5 MATCH expression for free text: every term required, the last one as a prefix"""
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            return ''
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, query: str, page: int = 1, per_page: int = 20) -> Tuple[List[int], int]:
+        """(movie_ids of the requested page, best match first; total number of matches)"""
+        expression = self.match_expression(query)
+        if not expression:
+            return [], 0
+
+        with self._lock:
+            total = self._conn.execute('SELECT COUNT(*) FROM movies_fts WHERE movies_fts MATCH ?', (expression,)).fetchone()[0]
+            if total == 0:
+                return [], 0
+            rows = self._conn.execute(f'''
+                SELECT rowid FROM movies_fts
+                WHERE movies_fts MATCH ?
+                ORDER BY bm25(movies_fts, {', '.join(str(w) for w in BM25_WEIGHTS)})
+                LIMIT ? OFFSET ?
+            ''', (expression, per_page, (max(1, page) - 1) * per_page)).fetchall()
+        return [row[0] for row in rows], total
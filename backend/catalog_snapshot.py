@@ -0,0 +1,256 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from typing import Optional, List, Dict, Tuple, Callable
+
+# Image URL column -> (path column, function building the URL from the path)
+UrlBuilders = Dict[str, Tuple[str, Callable[[Optional[str]], Optional[str]]]]
+
+# Columns holding comma-separated labels, stored as a list of small label codes per row
+MULTI_LABEL_COLUMNS = ('genre',)
+LABEL_SEPARATOR = ', '
+
+class CatalogSnapshot:
+    """Compact columnar movie catalog, held in memory or memory-mapped from a snapshot directory
+
+    Column encodings:
+    - numeric: ids as int32 (int64 only if they do not fit), scores as float32
+    - string: int64 offsets into one UTF-8 byte buffer (row i is
+      blob[offsets[i]:offsets[i + 1]]), plus a null mask when needed
+    - labels: uint8 codes into a vocabulary of at most 256 labels, with offsets
+      per row like strings, so each row decodes in its original order
+      (snapshots written with the older uint32 bitmask still load, in
+      vocabulary order)
+    - derived: image URLs rebuilt from their path column on demand; the few rows
+      whose URL does not follow from the path are kept as overrides
+
+    On disk every array is a <name>.npy file next to manifest.json and is opened
+    with mmap_mode='r', so workers on the same host share the pages through the
+    OS cache.
+    """
+
+    def __init__(self, n_rows: int, columns: List[Dict], arrays: Optional[Dict[str, np.ndarray]] = None, fingerprint: str = '', path: Optional[str] = None, url_builders: Optional[UrlBuilders] = None):
+        self.n_rows = n_rows
+        self.columns = columns
+        self.fingerprint = fingerprint
+        self.path = path
+        self.url_builders = url_builders or {}
+        self._arrays: Dict[str, np.ndarray] = dict(arrays or {})
+
+    @classmethod
+    def load(cls, path: str, url_builders: Optional[UrlBuilders] = None) -> 'CatalogSnapshot':
+        """Open a snapshot directory; arrays are memory-mapped on first use"""
+        with open(os.path.join(path, 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+        for column in manifest['columns']:
+            if column['kind'] == 'derived' and column['name'] not in (url_builders or {}):
+                raise ValueError(f"No URL builder for derived column {column['name']}")
+        return cls(int(manifest['rows']), manifest['columns'], fingerprint=manifest.get('fingerprint', ''), path=path, url_builders=url_builders)
+
+    @classmethod
+    def from_frame(cls, movies_df: pd.DataFrame, fingerprint: str = '', url_builders: Optional[UrlBuilders] = None) -> 'CatalogSnapshot':
+        """Encode a DataFrame into compact in-memory columns"""
+        url_builders = url_builders or {}
+        n_rows = len(movies_df)
+        columns, arrays = [], {}
+
+        for name in movies_df.columns:
+            values = movies_df[name]
+            source = url_builders.get(name)
+            if source is not None and source[0] in movies_df.columns:
+                column = cls._encode_derived(name, values, movies_df[source[0]], source)
+                if column is not None:
+                    columns.append(column)
+                    continue
+
+            if pd.api.types.is_bool_dtype(values):
+                arrays[name] = values.to_numpy(dtype=np.bool_)
+                columns.append({'name': name, 'kind': 'numeric'})
+            elif pd.api.types.is_integer_dtype(values):
+                array = values.to_numpy(dtype=np.int64)
+                fits = len(array) == 0 or (array.min() >= np.iinfo(np.int32).min and array.max() <= np.iinfo(np.int32).max)
+                arrays[name] = array.astype(np.int32) if fits else array
+                columns.append({'name': name, 'kind': 'numeric'})
+            elif pd.api.types.is_numeric_dtype(values):
+                arrays[name] = values.to_numpy(dtype=np.float32)
+                columns.append({'name': name, 'kind': 'numeric'})
+            elif name in MULTI_LABEL_COLUMNS and cls._encode_labels(name, values, columns, arrays):
+                continue
+            else:
+                cls._encode_strings(name, values, columns, arrays)
+
+        return cls(n_rows, columns, arrays, fingerprint, url_builders=url_builders)
+
+    @staticmethod
+    def _nulls(values: pd.Series) -> np.ndarray:
+        return values.isna().to_numpy() | values.astype(str).str.lower().eq('nan').to_numpy()
+
+    @classmethod
+    def _encode_strings(cls, name: str, values: pd.Series, columns: List[Dict], arrays: Dict[str, np.ndarray]):
+        nulls = cls._nulls(values)
+        encoded = [b'' if null else str(value).encode('utf-8') for value, null in zip(values.tolist(), nulls)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        arrays[f'{name}.offsets'] = offsets
+        arrays[f'{name}.blob'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        if nulls.any():
+            arrays[f'{name}.nulls'] = nulls
+        columns.append({'name': name, 'kind': 'string', 'nullable': bool(nulls.any())})
+
+    @classmethod
+    def _encode_labels(cls, name: str, values: pd.Series, columns: List[Dict], arrays: Dict[str, np.ndarray]) -> bool:
+        """Label code lists; returns False (caller stores plain strings) if there are more than 256 labels
+        or a row would not decode back to exactly the same string"""
+        nulls = cls._nulls(values)
+        row_labels = []
+        for value, null in zip(values.tolist(), nulls):
+            labels = [] if null else [label.strip() for label in str(value).split(',') if label.strip()]
+            if not null and LABEL_SEPARATOR.join(labels) != str(value):
+                return False
+            row_labels.append(labels)
+        vocabulary = sorted({label for labels in row_labels for label in labels})
+        if len(vocabulary) > 256:
+            return False
+
+        code_of = {label: i for i, label in enumerate(vocabulary)}
+        offsets = np.zeros(len(row_labels) + 1, dtype=np.int64)
+        np.cumsum([len(labels) for labels in row_labels], out=offsets[1:])
+        arrays[f'{name}.offsets'] = offsets
+        arrays[f'{name}.codes'] = np.asarray([code_of[label] for labels in row_labels for label in labels], dtype=np.uint8)
+        if nulls.any():
+            arrays[f'{name}.nulls'] = nulls
+        columns.append({'name': name, 'kind': 'labels', 'encoding': 'codes', 'labels': vocabulary, 'nullable': bool(nulls.any())})
+        return True
+
+    @classmethod
+    def _encode_derived(cls, name: str, urls: pd.Series, paths: pd.Series, source: Tuple[str, Callable]) -> Optional[Dict]:
+        """Drop a URL column that its builder reproduces from the path column, keeping mismatching rows as overrides"""
+        path_column, build_url = source
+        url_nulls, path_nulls = cls._nulls(urls), cls._nulls(paths)
+        overrides = {}
+        for row, (url, path, url_null, path_null) in enumerate(zip(urls.tolist(), paths.tolist(), url_nulls, path_nulls)):
+            expected = build_url(None if path_null else path)
+            actual = None if url_null else url
+            if expected != actual:
+                overrides[str(row)] = actual
+
+        # Not worth it if the URLs mostly don't follow from the paths
+        if len(overrides) > max(16, len(urls) // 100):
+            return None
+        return {'name': name, 'kind': 'derived', 'source': path_column, 'overrides': overrides}
+
+    def _array(self, name: str) -> np.ndarray:
+        array = self._arrays.get(name)
+        if array is None:
+            array = self._arrays[name] = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+        return array
+
+    def column_names(self) -> List[str]:
+        return [column['name'] for column in self.columns]
+
+    def numeric(self, name: str) -> np.ndarray:
+        """Zero-copy view of a numeric column"""
+        return self._array(name)
+
+    def _is_null(self, column: Dict, row: int) -> bool:
+        return bool(column.get('nullable')) and bool(self._array(f"{column['name']}.nulls")[row])
+
+    def _value(self, column: Dict, row: int, record: Dict):
+        name, kind = column['name'], column['kind']
+        if kind == 'numeric':
+            value = self._array(name)[row]
+            # str() gives the shortest repr, so float32 8.206 comes back as 8.206 rather than 8.2060003
+            return float(str(value)) if value.dtype.kind == 'f' else value.item()
+        if kind == 'derived':
+            override = column['overrides'].get(str(row), False)
+            if override is not False:
+                return override
+            if column['source'] not in record:
+                record[column['source']] = self._value(self._column(column['source']), row, record)
+            return self.url_builders[name][1](record[column['source']])
+        if self._is_null(column, row):
+            return None
+        if kind == 'labels':
+            labels = column['labels']
+            if column.get('encoding', 'mask') == 'mask':
+                mask = int(self._array(f'{name}.mask')[row])
+                return LABEL_SEPARATOR.join(label for i, label in enumerate(labels) if mask >> i & 1)
+            offsets = self._array(f'{name}.offsets')
+            return LABEL_SEPARATOR.join(labels[code] for code in self._array(f'{name}.codes')[offsets[row]:offsets[row + 1]])
+        offsets = self._array(f'{name}.offsets')
+        return bytes(self._array(f'{name}.blob')[offsets[row]:offsets[row + 1]]).decode('utf-8')
+
+    def _column(self, name: str) -> Dict:
+        for column in self.columns:
+            if column['name'] == name:
+                return column
+        raise KeyError(name)
+
+    def record(self, row: int) -> Dict:
+        """Decode one row into a plain dict"""
+        record = {}
+        for column in self.columns:
+            if column['name'] not in record:
+                record[column['name']] = self._value(column, row, record)
+        return {name: record[name] for name in self.column_names()}
+
+    def to_frame(self) -> pd.DataFrame:
+        """Decode every column into a DataFrame (only needed when the catalog text is required as a whole)"""
+        return pd.DataFrame([self.record(row) for row in range(self.n_rows)], columns=self.column_names())
+
+    def nbytes(self) -> Dict[str, int]:
+        """Bytes held by each column's arrays (derived columns count their overrides)"""
+        sizes = {}
+        for column in self.columns:
+            name = column['name']
+            if column['kind'] == 'derived':
+                sizes[name] = len(json.dumps(column['overrides']))
+                continue
+            sizes[name] = sum(
+                self._array(array_name).nbytes
+                for array_name in (name, f'{name}.offsets', f'{name}.blob', f'{name}.nulls', f'{name}.mask', f'{name}.codes')
+                if array_name in self._arrays or (self.path and os.path.exists(os.path.join(self.path, f'{array_name}.npy')))
+            )
+        return sizes
+
+    def save(self, path: str):
+        """Write the snapshot directory, swapping it in place of any existing one"""
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        for column in self.columns:
+            name = column['name']
+            for array_name in (name, f'{name}.offsets', f'{name}.blob', f'{name}.nulls', f'{name}.mask', f'{name}.codes'):
+                if array_name in self._arrays or (self.path and os.path.exists(os.path.join(self.path, f'{array_name}.npy'))):
+                    np.save(os.path.join(tmp_path, f'{array_name}.npy'), self._array(array_name))
+
+        with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+            json.dump({'rows': self.n_rows, 'fingerprint': self.fingerprint, 'columns': self.columns}, f)
+
+        # Readers that already mapped the old files keep them until they close; new readers see the new directory
+        old_path = f'{path}.old-{os.getpid()}'
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+if __name__ == '__main__':
+    # Convert the JSON cache: python catalog_snapshot.py [cached_movies.json] [catalog_snapshot]
+    import sys
+    from content_index import ContentIndex
+    from tmdb_client import TMDBClient
+
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "cached_movies.json"
+    snapshot_path = sys.argv[2] if len(sys.argv) > 2 else "catalog_snapshot"
+
+    tmdb_client = TMDBClient()
+    url_builders = {'poster_url': ('poster_path', tmdb_client.get_poster_url), 'backdrop_url': ('backdrop_path', tmdb_client.get_backdrop_url)}
+    with open(json_path, 'r') as f:
+        snapshot = CatalogSnapshot.from_frame(pd.DataFrame(json.load(f)), url_builders=url_builders)
+    # Fingerprint what the app will see after decoding
+    snapshot.fingerprint = ContentIndex.catalog_fingerprint(snapshot.to_frame())
+    snapshot.save(snapshot_path)
+    print(f"Wrote {snapshot.n_rows} movies to {snapshot_path}")
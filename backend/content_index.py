@@ -0,0 +1,236 @@
+import os
+import json
+import hashlib
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Optional, List, Dict, Iterable, NamedTuple
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+class IndexState(NamedTuple):
+    """One version of the index rows; never mutated once published"""
+    matrix: sparse.csr_matrix
+    movie_ids: np.ndarray
+    id_to_row: Dict[int, int]
+
+class ContentIndex:
+    """Fit-once TF-IDF index over the movie catalog for content-based scoring
+
+    The rows live in one IndexState that add_movies replaces with a single
+    assignment, so readers never see a matrix and id map of different sizes.
+    Rows are only ever appended, so a row number stays valid across versions.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer, matrix: sparse.csr_matrix, movie_ids: List[int], fingerprint: str = ''):
+        self.vectorizer = vectorizer
+        self.fingerprint = fingerprint
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        self._state = IndexState(matrix.tocsr(), movie_ids, {int(movie_id): row for row, movie_id in enumerate(movie_ids)})
+        self._write_lock = threading.Lock()
+
+    @property
+    def state(self) -> IndexState:
+        return self._state
+
+    @property
+    def matrix(self) -> sparse.csr_matrix:
+        return self._state.matrix
+
+    @property
+    def movie_ids(self) -> np.ndarray:
+        return self._state.movie_ids
+
+    @property
+    def id_to_row(self) -> Dict[int, int]:
+        return self._state.id_to_row
+
+    @staticmethod
+    def build_content_strings(movies_df: pd.DataFrame) -> List[str]:
+        """Build 'title overview genre' strings for every movie without iterating rows"""
+        content = pd.Series('', index=movies_df.index)
+        for column in ('title', 'overview', 'genre'):
+            if column in movies_df.columns:
+                values = movies_df[column]
+                part = values.where(values.notna(), '').astype(str)
+                content = content.str.cat(part, sep=' ')
+        content = content.str.strip()
+
+        # Movies with no text at all still get a token so they have a row
+        empty = content == ''
+        if empty.any():
+            content[empty] = 'movie ' + movies_df.loc[empty, 'movie_id'].astype(str)
+        return content.tolist()
+
+    @staticmethod
+    def catalog_fingerprint(movies_df: pd.DataFrame) -> str:
+        """Hash of the catalog ids and text used to detect stale persisted indexes"""
+        digest = hashlib.sha1()
+        digest.update(movies_df['movie_id'].to_numpy(dtype=np.int64).tobytes())
+        for text in ContentIndex.build_content_strings(movies_df):
+            digest.update(text.encode('utf-8', 'replace'))
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, movies_df: pd.DataFrame, max_features: int = 1000, fingerprint: Optional[str] = None) -> 'ContentIndex':
+        """Fit the TF-IDF vectorizer once over the whole catalog"""
+        tfidf = TfidfVectorizer(stop_words='english', max_features=max_features, min_df=1)
+        matrix = tfidf.fit_transform(cls.build_content_strings(movies_df))
+        if fingerprint is None:
+            fingerprint = cls.catalog_fingerprint(movies_df)
+        return cls(tfidf, matrix, movies_df['movie_id'].tolist(), fingerprint)
+
+    @classmethod
+    def load_or_build(cls, movies_df: pd.DataFrame, path: str = "content_index") -> 'ContentIndex':
+        """Load a persisted index if it matches the catalog, otherwise build and persist it"""
+        fingerprint = cls.catalog_fingerprint(movies_df)
+        index = cls.load(path)
+        if index is not None and index.fingerprint == fingerprint:
+            return index
+
+        index = cls.build(movies_df, fingerprint=fingerprint)
+        try:
+            index.save(path)
+        except Exception as e:
+            pass
+        return index
+
+    def save(self, path: str):
+        """Persist the matrix, ids and fitted vectorizer to a directory"""
+        state = self._state
+        os.makedirs(path, exist_ok=True)
+        sparse.save_npz(os.path.join(path, 'matrix.npz'), state.matrix)
+        np.save(os.path.join(path, 'movie_ids.npy'), state.movie_ids)
+        with open(os.path.join(path, 'vectorizer.pkl'), 'wb') as f:
+            pickle.dump(self.vectorizer, f)
+        with open(os.path.join(path, 'manifest.json'), 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'rows': int(state.matrix.shape[0])}, f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['ContentIndex']:
+        """Load a persisted index, returning None if it is missing or unreadable"""
+        try:
+            with open(os.path.join(path, 'manifest.json'), 'r') as f:
+                manifest = json.load(f)
+            matrix = sparse.load_npz(os.path.join(path, 'matrix.npz'))
+            movie_ids = np.load(os.path.join(path, 'movie_ids.npy'))
+            with open(os.path.join(path, 'vectorizer.pkl'), 'rb') as f:
+                vectorizer = pickle.load(f)
+            return cls(vectorizer, matrix, movie_ids.tolist(), manifest.get('fingerprint', ''))
+        except Exception as e:
+            return None
+
+    def __contains__(self, movie_id) -> bool:
+        return int(movie_id) in self.id_to_row
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def add_movies(self, movies_df: pd.DataFrame):
+        """Append rows for new movies using the already-fitted vocabulary, publishing them as a new state"""
+        with self._write_lock:
+            state = self._state
+            new_movies = movies_df[~movies_df['movie_id'].isin(state.id_to_row.keys())]
+            new_movies = new_movies.drop_duplicates(subset=['movie_id'], keep='first')
+            if new_movies.empty:
+                return
+
+            new_rows = self.vectorizer.transform(self.build_content_strings(new_movies))
+            new_ids = new_movies['movie_id'].to_numpy(dtype=np.int64)
+            id_to_row = dict(state.id_to_row)
+            start = len(state.movie_ids)
+            for offset, movie_id in enumerate(new_ids.tolist()):
+                id_to_row[movie_id] = start + offset
+            self._state = IndexState(
+                sparse.vstack([state.matrix, new_rows], format='csr'),
+                np.concatenate([state.movie_ids, new_ids]),
+                id_to_row
+            )
+
+    def rows_for(self, movie_ids: Iterable[int], state: Optional[IndexState] = None) -> List[int]:
+        """Map movie ids to matrix rows, skipping ids that are not indexed"""
+        id_to_row = (state or self._state).id_to_row
+        return [id_to_row[int(mid)] for mid in movie_ids if int(mid) in id_to_row]
+
+    def user_profile(self, liked_movie_ids: Iterable[int], state: Optional[IndexState] = None) -> Optional[sparse.csr_matrix]:
+        """Average TF-IDF vector of the liked movies"""
+        state = state or self._state
+        rows = self.rows_for(liked_movie_ids, state)
+        if not rows:
+            return None
+        return sparse.csr_matrix(state.matrix[rows].mean(axis=0))
+
+    def score(self, liked_movie_ids: Iterable[int]) -> Optional[np.ndarray]:
+        """Cosine similarity of the user profile with every movie, as one sparse mat-vec"""
+        state = self._state
+        profile = self.user_profile(liked_movie_ids, state)
+        if profile is None:
+            return None
+
+        norm = np.sqrt(profile.multiply(profile).sum())
+        if norm == 0:
+            return np.zeros(state.matrix.shape[0], dtype=np.float64)
+
+        # TF-IDF rows are already L2-normalized, so dot / |profile| is the cosine
+        return np.asarray(state.matrix @ profile.T.toarray()).ravel() / norm
+
+    def top_n(self, scores: np.ndarray, n: int, exclude_ids: Iterable[int] = ()) -> List[Dict]:
+        """Pick the n best-scoring movies, skipping excluded ids
+
+        `scores` may come from an older state with fewer rows; rows appended since are ignored.
+        """
+        state = self._state
+        scores = scores.copy()
+        exclude_rows = [row for row in self.rows_for(exclude_ids, state) if row < len(scores)]
+        if exclude_rows:
+            scores[exclude_rows] = -np.inf
+
+        n = min(n, len(scores))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        return [
+            {'movie_id': int(state.movie_ids[row]), 'score': float(scores[row])}
+            for row in top if np.isfinite(scores[row])
+        ]
+
+    def approximate_top_n(self, ann, liked_movie_ids: Iterable[int], n: int, exclude_ids: Iterable[int] = (), state: Optional[IndexState] = None) -> List[Dict]:
+        """Like score + top_n, but only reranks the ANN candidates for the user profile"""
+        state = state or self._state
+        profile = self.user_profile(liked_movie_ids, state)
+        if profile is None:
+            return []
+
+        # Movies appended after the ANN index was built are always reranked exactly
+        new_rows = range(ann.n_rows, state.matrix.shape[0])
+        neighbours = ann.search(profile, state.matrix, n, exclude_rows=self.rows_for(exclude_ids, state), extra_rows=new_rows)
+        return [{'movie_id': int(state.movie_ids[row]), 'score': score} for row, score in neighbours]
+
+    def liked_matrix(self, liked_movie_ids_per_user: List[Iterable[int]], state: Optional[IndexState] = None) -> sparse.csr_matrix:
+        """Users x catalog-rows indicator matrix of liked movies"""
+        state = state or self._state
+        indptr, indices = [0], []
+        for liked in liked_movie_ids_per_user:
+            rows = self.rows_for(liked, state)
+            indices.extend(rows)
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(liked_movie_ids_per_user), state.matrix.shape[0]))
+
+    def score_batch(self, liked: sparse.csr_matrix, state: Optional[IndexState] = None) -> np.ndarray:
+        """Cosine similarity of many user profiles with every movie, as one matrix-matrix product"""
+        matrix = (state or self._state).matrix
+        if liked.shape[1] < matrix.shape[0]:
+            # liked_matrix came from an older state; score against the rows it knew about
+            matrix = matrix[:liked.shape[1]]
+        counts = np.asarray(liked.sum(axis=1)).ravel()
+        inverse_counts = np.divide(1.0, counts, out=np.zeros_like(counts), where=counts > 0)
+        profiles = sparse.diags(inverse_counts.astype(np.float32)) @ liked @ matrix
+
+        norms = np.sqrt(np.asarray(profiles.multiply(profiles).sum(axis=1)).ravel())
+        inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        scores = (profiles @ matrix.T).toarray().astype(np.float32)
+        return scores * inverse_norms[:, None].astype(np.float32)
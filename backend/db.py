@@ -0,0 +1,120 @@
+import os
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+# Applied to every new connection. WAL lets readers run while a writer commits;
+# synchronous=NORMAL is durable across application crashes in WAL mode and only
+# risks the last transactions on power loss.
+DEFAULT_PRAGMAS: Dict[str, object] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,        # KiB (negative), i.e. ~16MB page cache per connection
+    'mmap_size': 268435456,      # memory-map up to 256MB of the database file
+    'temp_store': 'MEMORY',
+}
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections shared by request threads
+
+    Connections are reused, so each one keeps its page cache and its
+    prepared-statement cache (`cached_statements`) warm across requests.
+    `on_wait` is called with the seconds each borrow waited for a connection so
+    callers can export it without this module depending on a metrics library.
+    """
+
+    def __init__(self, db_path: str, size: int = 8, timeout: float = 30.0, busy_timeout: float = 5.0,
+                 cached_statements: int = 256, pragmas: Optional[Dict[str, object]] = None,
+                 on_wait: Optional[Callable[[float], None]] = None):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.on_wait = on_wait
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Connections must not cross fork(); a child process starts with an empty pool
+        self._pid = os.getpid()
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._created = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No SQLite connection available after {self.timeout}s")
+
+    def _report_wait(self, seconds: float):
+        if self.on_wait is not None:
+            try:
+                self.on_wait(seconds)
+            except Exception as e:
+                pass
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection; an uncommitted transaction is rolled back before it goes back to the pool"""
+        pid = os.getpid()
+        start_time = time.perf_counter()
+        try:
+            conn = self._acquire()
+        finally:
+            self._report_wait(time.perf_counter() - start_time)
+        try:
+            yield conn
+        finally:
+            if pid != self._pid:
+                conn.close()
+            else:
+                try:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    self._idle.put(conn)
+                except sqlite3.Error:
+                    # Broken connection: drop it and let the pool open a new one
+                    with self._lock:
+                        self._created -= 1
+
+    def close(self):
+        """Close idle connections; borrowed ones go back to the pool as usual"""
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._created -= 1
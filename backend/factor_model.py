@@ -0,0 +1,155 @@
+import time
+import threading
+import numpy as np
+from scipy import sparse
+from typing import Optional, List, Dict, Iterable, Callable
+from ratings_matrix import RatingsMatrix
+
+class FactorModel:
+    """Latent user/item factors fitted with alternating least squares on explicit ratings"""
+
+    def __init__(self, n_factors: int = 32, regularization: float = 0.1, iterations: int = 10, seed: int = 42, on_fit: Optional[Callable[[float], None]] = None):
+        self.n_factors = n_factors
+        self.regularization = regularization
+        self.iterations = iterations
+        self.seed = seed
+        self.user_factors: Optional[np.ndarray] = None
+        self.item_factors: Optional[np.ndarray] = None
+        self.global_mean = 0.0
+        self.user_index: Dict[int, int] = {}
+        self.movie_ids: Optional[np.ndarray] = None
+        self.col_of: Dict[int, int] = {}
+        self.matrix_version = -1
+        self.trained_at: Optional[float] = None
+        self.training_seconds = 0.0
+        # Called with the training time after every fit, wherever it was triggered from
+        self.on_fit = on_fit
+        self._lock = threading.Lock()
+        # Held for a whole fit, so factors and on_fit always come from one fit at a time
+        self._fit_lock = threading.Lock()
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.item_factors is not None and len(self.item_factors) > 0
+
+    def age_seconds(self) -> float:
+        """Seconds since the current factors were trained (NaN before the first fit)"""
+        if self.trained_at is None:
+            return float('nan')
+        return time.time() - self.trained_at
+
+    def fit(self, ratings_matrix: RatingsMatrix):
+        """Fit user and item factors to the mean-centered ratings; concurrent calls run one after another"""
+        with self._fit_lock:
+            self._fit(ratings_matrix)
+
+    def _fit(self, ratings_matrix: RatingsMatrix):
+        start_time = time.time()
+        version = ratings_matrix.version
+        ratings = ratings_matrix.csr().astype(np.float32)
+        user_ids = list(ratings_matrix.user_ids[:ratings.shape[0]])
+        movie_ids = np.asarray(ratings_matrix.movie_ids[:ratings.shape[1]], dtype=np.int64)
+
+        global_mean = float(ratings.data.mean()) if ratings.nnz else 0.0
+        centered = ratings.copy()
+        centered.data -= global_mean
+        centered_t = centered.T.tocsr()
+
+        rng = np.random.default_rng(self.seed)
+        user_factors = rng.normal(scale=0.1, size=(ratings.shape[0], self.n_factors)).astype(np.float32)
+        item_factors = rng.normal(scale=0.1, size=(ratings.shape[1], self.n_factors)).astype(np.float32)
+
+        for _ in range(self.iterations):
+            self._als_step(centered, item_factors, user_factors)
+            self._als_step(centered_t, user_factors, item_factors)
+
+        with self._lock:
+            self.user_factors = user_factors
+            self.item_factors = item_factors
+            self.global_mean = global_mean
+            self.user_index = {user_id: row for row, user_id in enumerate(user_ids)}
+            self.movie_ids = movie_ids
+            self.col_of = {int(movie_id): col for col, movie_id in enumerate(movie_ids)}
+            self.matrix_version = version
+            self.trained_at = time.time()
+            self.training_seconds = self.trained_at - start_time
+        if self.on_fit is not None:
+            self.on_fit(self.training_seconds)
+
+    def _solve_row(self, fixed: np.ndarray, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Regularized least squares for one row given the other side's factors (weighted-lambda)"""
+        factors = fixed[indices]
+        gram = factors.T @ factors + self.regularization * len(indices) * np.eye(self.n_factors, dtype=np.float32)
+        return np.linalg.solve(gram, factors.T @ values)
+
+    def _als_step(self, ratings: sparse.csr_matrix, fixed: np.ndarray, out: np.ndarray):
+        for row in range(ratings.shape[0]):
+            start, end = ratings.indptr[row], ratings.indptr[row + 1]
+            if start == end:
+                out[row] = 0.0
+                continue
+            out[row] = self._solve_row(fixed, ratings.indices[start:end], ratings.data[start:end])
+
+    def refresh(self, ratings_matrix: RatingsMatrix) -> bool:
+        """Retrain if the ratings changed since the last fit; returns True when training happened"""
+        if self.item_factors is not None and self.matrix_version == ratings_matrix.version:
+            return False
+        with self._fit_lock:
+            # Another caller may have fitted these ratings while we waited
+            if self.item_factors is not None and self.matrix_version == ratings_matrix.version:
+                return False
+            self._fit(ratings_matrix)
+        return True
+
+    def recommend(self, user_ratings: Dict[int, float], n: int, exclude_ids: Iterable[int] = ()) -> List[Dict]:
+        """Score every movie as one float32 mat-vec with the user's factors, then take an argpartition top-n"""
+        with self._lock:
+            item_factors = self.item_factors
+            movie_ids = self.movie_ids
+            col_of = self.col_of
+            global_mean = self.global_mean
+
+        if item_factors is None or not user_ratings:
+            return []
+
+        # Fold the user's current ratings in against the item factors, so fresh ratings count immediately
+        cols = np.asarray([col_of[mid] for mid in user_ratings if mid in col_of], dtype=np.int64)
+        if len(cols) == 0:
+            return []
+        values = np.asarray([user_ratings[int(movie_ids[col])] for col in cols], dtype=np.float32) - global_mean
+        user_vector = self._solve_row(item_factors, cols, values).astype(np.float32)
+
+        scores = item_factors @ user_vector + global_mean
+        scores[cols] = -np.inf
+        excluded = [col_of[int(mid)] for mid in exclude_ids if int(mid) in col_of]
+        if excluded:
+            scores[excluded] = -np.inf
+
+        n = min(n, int(np.isfinite(scores).sum()))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        return [{'movie_id': int(movie_ids[col]), 'predicted_rating': float(scores[col])} for col in top]
+
+    def score_batch(self, user_matrix: sparse.csr_matrix) -> np.ndarray:
+        """Predicted ratings for a block of users as one user-factor x item-factor product, rated items -inf"""
+        with self._lock:
+            item_factors = self.item_factors
+            global_mean = self.global_mean
+
+        n_cols = item_factors.shape[0]
+        # Ratings-matrix columns are append-only, so the model's columns are a prefix of them
+        user_matrix = user_matrix[:, :n_cols].tocsr()
+
+        user_block = np.zeros((user_matrix.shape[0], self.n_factors), dtype=np.float32)
+        for row in range(user_matrix.shape[0]):
+            start, end = user_matrix.indptr[row], user_matrix.indptr[row + 1]
+            if start < end:
+                values = user_matrix.data[start:end].astype(np.float32) - global_mean
+                user_block[row] = self._solve_row(item_factors, user_matrix.indices[start:end], values)
+
+        scores = user_block @ item_factors.T + global_mean
+        scores[user_matrix.nonzero()] = -np.inf
+        return scores
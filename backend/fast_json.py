@@ -0,0 +1,30 @@
+import json
+from typing import Any, Dict, Iterable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes with sorted keys, encoded with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=str, sort_keys=True, separators=(',', ':')).encode()
+
+def array(fragments: Iterable[bytes]) -> bytes:
+    """JSON array of already-encoded values"""
+    return b'[' + b','.join(fragments) + b']'
+
+def extend_object(fragment: bytes, fields: Dict[str, Any]) -> bytes:
+    """Already-encoded JSON object with extra members prepended"""
+    members = b','.join(dumps(key) + b':' + dumps(value) for key, value in fields.items())
+    if fragment == b'{}':
+        return b'{' + members + b'}'
+    return b'{' + members + b',' + fragment[1:]
+
+def object_with_arrays(fields: Dict[str, Any], arrays: Dict[str, Iterable[bytes]]) -> bytes:
+    """JSON object of plain values plus members that are arrays of already-encoded values, keys sorted"""
+    members = {key: dumps(value) for key, value in fields.items()}
+    members.update((key, array(fragments)) for key, fragments in arrays.items())
+    return b'{' + b','.join(dumps(key) + b':' + members[key] for key in sorted(members)) + b'}'
@@ -0,0 +1,100 @@
+import time
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple, Callable
+from content_index import ContentIndex
+from movie_catalog import MovieCatalog
+from neighbor_table import NeighborTable
+from ann_index import RandomProjectionLSH
+
+def combine_recommendations(content_recommendations: List[Dict], collaborative_recommendations: List[Dict], n_recommendations: int) -> List[Dict]:
+    """Combine recommendations (60% content-based, 40% collaborative)"""
+    recommendations = []
+
+    # Add content-based recommendations
+    content_count = min(len(content_recommendations), int(n_recommendations * 0.6))
+    recommendations.extend(content_recommendations[:content_count])
+
+    # Add collaborative recommendations
+    collab_count = min(len(collaborative_recommendations), n_recommendations - len(recommendations))
+    recommendations.extend(collaborative_recommendations[:collab_count])
+
+    # If we still don't have enough, add more from whichever has more
+    if len(recommendations) < n_recommendations:
+        remaining = n_recommendations - len(recommendations)
+        if len(content_recommendations) > content_count:
+            recommendations.extend(content_recommendations[content_count:content_count + remaining])
+        elif len(collaborative_recommendations) > collab_count:
+            recommendations.extend(collaborative_recommendations[collab_count:collab_count + remaining])
+
+    return recommendations[:n_recommendations]
+
+def enrich_recommendations(recommendations: List[Dict], rated_movie_ids: Iterable[int], movie_catalog: MovieCatalog) -> List[Dict]:
+    """Enrich recommendations with full movie data"""
+    # Double-check that these movies haven't been rated
+    rated_movie_ids = set(rated_movie_ids)
+    recommendations = [rec for rec in recommendations if rec['movie_id'] not in rated_movie_ids]
+
+    # Look all movies up in one pass over the catalog index
+    movie_infos = {movie['movie_id']: movie for movie in movie_catalog.get_many(rec['movie_id'] for rec in recommendations)}
+
+    enriched_recommendations = []
+    for rec in recommendations:
+        movie_id = rec['movie_id']
+        movie_info = movie_infos.get(movie_id)
+
+        if movie_info is not None:
+            # Create enriched recommendation
+            enriched_rec = {
+                'movie_id': movie_id,
+                'title': movie_info.get('title', f'Movie {movie_id}'),
+                'overview': movie_info.get('overview', ''),
+                'genre': movie_info.get('genre', ''),
+                'poster_url': movie_info.get('poster_url', ''),
+                'backdrop_url': movie_info.get('backdrop_url', ''),
+                'vote_average': movie_info.get('vote_average', 0),
+                'release_date': movie_info.get('release_date', ''),
+                'score': rec.get('score', 0),
+                'type': rec.get('type', 'content-based')
+            }
+            enriched_recommendations.append(enriched_rec)
+
+    return enriched_recommendations
+
+def recommend_batch(user_system, user_ids: List[int], n_recommendations: int, collaborative_mode: str,
+                    movie_catalog: MovieCatalog, content_index: Optional[ContentIndex],
+                    neighbor_table: Optional[NeighborTable] = None, content_ann: Optional[RandomProjectionLSH] = None,
+                    block_size: int = 256, on_duration: Optional[Callable[[str, float], None]] = None,
+                    on_count: Optional[Callable[[str, int], None]] = None) -> Iterator[Tuple[int, List[Dict]]]:
+    """Yield (user_id, recommendations) for many users, scoring each block of users with matrix-matrix products
+
+    Everything is passed in, so offline jobs can call this without the Flask app;
+    `on_duration(algorithm, seconds)` and `on_count(algorithm, n)` report metrics.
+    """
+    collab_algorithm = 'collaborative' if collaborative_mode == 'user' else f'collaborative-{collaborative_mode}'
+    available_movie_ids = movie_catalog.ids() if movie_catalog is not None else []
+
+    for start in range(0, len(user_ids), block_size):
+        block = user_ids[start:start + block_size]
+
+        content_start = time.time()
+        content_recommendations = user_system.get_content_based_recommendations_batch(block, n_recommendations, available_movie_ids, content_index, neighbor_table, content_ann)
+        if on_duration is not None:
+            on_duration('content-based-batch', time.time() - content_start)
+
+        try:
+            collab_start = time.time()
+            collaborative_recommendations = user_system.get_collaborative_recommendations_batch(block, n_recommendations, available_movie_ids, collaborative_mode)
+            if on_duration is not None:
+                on_duration(f'{collab_algorithm}-batch', time.time() - collab_start)
+        except Exception as e:
+            collaborative_recommendations = {}
+
+        for user_id in block:
+            content = content_recommendations.get(user_id, [])
+            collaborative = collaborative_recommendations.get(user_id, [])
+            if on_count is not None:
+                on_count('content-based', len(content))
+                on_count(collab_algorithm, len(collaborative))
+
+            rated_movie_ids = user_system.ratings_matrix.user_ratings(user_id).keys()
+            recommendations = combine_recommendations(content, collaborative, n_recommendations)
+            yield user_id, enrich_recommendations(recommendations, rated_movie_ids, movie_catalog)
@@ -0,0 +1,134 @@
+import threading
+import numpy as np
+from scipy import sparse
+from typing import Optional, List, Dict, Iterable
+from ratings_matrix import RatingsMatrix
+
+class ItemSimilarityModel:
+    """Sparse item-item cosine similarities from co-ratings, refit in the background"""
+
+    def __init__(self, neighbors_per_item: int = 50, shrinkage: float = 1.0):
+        self.neighbors_per_item = neighbors_per_item
+        self.shrinkage = shrinkage
+        self.similarity: Optional[sparse.csr_matrix] = None
+        self.abs_similarity: Optional[sparse.csr_matrix] = None
+        self.movie_ids: List[int] = []
+        self.col_of: Dict[int, int] = {}
+        self.matrix_version = -1
+        self._lock = threading.Lock()
+
+    @property
+    def is_fitted(self) -> bool:
+        # A model fitted before any ratings existed is as good as none
+        return self.similarity is not None and self.similarity.shape[0] > 0
+
+    def fit(self, ratings_matrix: RatingsMatrix):
+        """Compute item-item cosine similarities, keeping the strongest neighbors of each item"""
+        version = ratings_matrix.version
+        matrix = ratings_matrix.csr().tocsc().astype(np.float32)
+        movie_ids = list(ratings_matrix.movie_ids[:matrix.shape[1]])
+
+        # Cosine = dot product of L2-normalized item columns
+        col_norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+        inverse_norms = np.divide(1.0, col_norms, out=np.zeros_like(col_norms), where=col_norms > 0)
+        normalized = matrix @ sparse.diags(inverse_norms.astype(np.float32))
+
+        similarity = (normalized.T @ normalized).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+        similarity = self._prune(similarity, self.neighbors_per_item)
+
+        with self._lock:
+            self.similarity = similarity
+            self.abs_similarity = abs(similarity)
+            self.movie_ids = movie_ids
+            self.col_of = {movie_id: col for col, movie_id in enumerate(movie_ids)}
+            self.matrix_version = version
+
+    @staticmethod
+    def _prune(similarity: sparse.csr_matrix, k: int) -> sparse.csr_matrix:
+        """Keep only the k largest entries of every row"""
+        indptr, indices, data = [0], [], []
+        for row in range(similarity.shape[0]):
+            start, end = similarity.indptr[row], similarity.indptr[row + 1]
+            row_indices = similarity.indices[start:end]
+            row_data = similarity.data[start:end]
+            if len(row_data) > k:
+                keep = np.argpartition(-row_data, k - 1)[:k]
+                row_indices, row_data = row_indices[keep], row_data[keep]
+            indices.append(row_indices)
+            data.append(row_data)
+            indptr.append(indptr[-1] + len(row_data))
+
+        return sparse.csr_matrix(
+            (np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+             np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+             np.asarray(indptr)),
+            shape=similarity.shape
+        )
+
+    def refresh(self, ratings_matrix: RatingsMatrix) -> bool:
+        """Refit if the ratings changed since the last fit; returns True when a refit happened"""
+        if self.similarity is not None and self.matrix_version == ratings_matrix.version:
+            return False
+        self.fit(ratings_matrix)
+        return True
+
+    def recommend(self, user_ratings: Dict[int, float], n: int, exclude_ids: Iterable[int] = ()) -> List[Dict]:
+        """Score every item as the user's rating vector times the similarity matrix"""
+        with self._lock:
+            similarity = self.similarity
+            abs_similarity = self.abs_similarity
+            movie_ids = self.movie_ids
+            col_of = self.col_of
+
+        if similarity is None or not user_ratings:
+            return []
+
+        cols = [col_of[mid] for mid in user_ratings if mid in col_of]
+        if not cols:
+            return []
+        values = np.asarray([user_ratings[movie_ids[col]] for col in cols], dtype=np.float32)
+
+        user_vector = sparse.csr_matrix((values, ([0] * len(cols), cols)), shape=(1, len(movie_ids)))
+        rated_vector = sparse.csr_matrix((np.ones(len(cols), dtype=np.float32), ([0] * len(cols), cols)), shape=(1, len(movie_ids)))
+
+        numerator = (user_vector @ similarity).toarray().ravel()
+        denominator = (rated_vector @ abs_similarity).toarray().ravel()
+
+        # Similarity-weighted average rating, shrunk towards zero when evidence is thin
+        scores = numerator / (denominator + self.shrinkage) / 5.0
+
+        excluded = {int(mid) for mid in exclude_ids}
+        excluded.update(user_ratings.keys())
+        for mid in excluded:
+            col = col_of.get(mid)
+            if col is not None:
+                scores[col] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) == 0:
+            return []
+        if len(candidates) > n:
+            candidates = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        return [{'movie_id': int(movie_ids[col]), 'score': float(scores[col])} for col in candidates]
+
+    def score_batch(self, user_matrix: sparse.csr_matrix) -> np.ndarray:
+        """recommend() scores for a block of users (rows of the ratings matrix), rated items set to 0"""
+        with self._lock:
+            similarity = self.similarity
+            abs_similarity = self.abs_similarity
+
+        n_cols = similarity.shape[0]
+        # Ratings-matrix columns are append-only, so the model's columns are a prefix of them
+        user_matrix = user_matrix[:, :n_cols].tocsr()
+        rated = user_matrix.copy()
+        rated.data = np.ones_like(rated.data)
+
+        numerator = (user_matrix @ similarity).toarray()
+        denominator = (rated @ abs_similarity).toarray()
+        scores = (numerator / (denominator + self.shrinkage) / 5.0).astype(np.float32)
+        scores[rated.nonzero()] = 0.0
+        return scores
@@ -0,0 +1,204 @@
+import os
+import json
+import hashlib
+import math
+import threading
+import numpy as np
+import pandas as pd
+from typing import Optional, List, Dict, Iterable, Tuple
+from catalog_snapshot import CatalogSnapshot, UrlBuilders
+import fast_json
+
+class MovieCatalog:
+    """Loaded movie catalog with an O(1) movie_id -> row index over compact columnar storage
+
+    Records are decoded from the columns on access (NaN-free, image URLs rebuilt
+    from their paths), so the catalog never holds a dict per movie. Their JSON
+    encodings are cached per movie_id instead, since a movie's record never
+    changes once it is in the catalog.
+    """
+
+    def __init__(self, movies_df: Optional[pd.DataFrame] = None, snapshot: Optional[CatalogSnapshot] = None, url_builders: Optional[UrlBuilders] = None):
+        self._lock = threading.Lock()
+        if snapshot is None:
+            snapshot = CatalogSnapshot.from_frame(movies_df.reset_index(drop=True), url_builders=url_builders)
+        self._snapshot = snapshot
+        self._n_base = snapshot.n_rows
+        movie_ids = np.asarray(snapshot.numeric('movie_id'), dtype=np.int64) if snapshot.n_rows else np.zeros(0, dtype=np.int64)
+        # Stands in for the fingerprint of a snapshot that has none
+        self._base_digest = hashlib.sha1(movie_ids.tobytes()).hexdigest()
+
+        # Movies added after load are appended as dicts and to the id array (amortized O(1));
+        # the DataFrame view and the sorted id index are rebuilt lazily on first use
+        self._appended: List[Dict] = []
+        self._frame: Optional[pd.DataFrame] = None
+        self._frame_rows = 0
+        self._ids = np.empty(max(16, len(movie_ids)), dtype=np.int64)
+        self._ids[:len(movie_ids)] = movie_ids
+        self._row_of = {int(movie_id): row for row, movie_id in enumerate(movie_ids)}
+        self._sorted: Optional[tuple] = None
+        # (fields, movie_id) -> encoded record; fields=None is the whole record
+        self._fragments: Dict[Tuple[Optional[Tuple[str, ...]], int], bytes] = {}
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    @property
+    def movie_ids(self) -> np.ndarray:
+        return self._ids[:len(self)]
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """DataFrame of the whole catalog, including movies appended since load"""
+        with self._lock:
+            if self._frame is None:
+                self._frame = self._snapshot.to_frame()
+                self._frame_rows = self._n_base
+            if self._frame_rows < len(self):
+                appended = pd.DataFrame(self._appended[self._frame_rows - self._n_base:])
+                self._frame = pd.concat([self._frame, appended], ignore_index=True)
+                self._frame_rows = len(self._frame)
+            return self._frame
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the catalog does: the base snapshot's fingerprint (or a hash of its ids) plus the number of movies"""
+        return f"{self._snapshot.fingerprint or self._base_digest}-{len(self)}"
+
+    @property
+    def snapshot_fingerprint(self) -> Optional[str]:
+        """Fingerprint saved with the snapshot, while it still describes the whole catalog"""
+        if self._appended:
+            return None
+        return self._snapshot.fingerprint or None
+
+    def _record(self, row: int) -> Dict:
+        if row < self._n_base:
+            return self._sanitize(self._snapshot.record(row))
+        return dict(self._appended[row - self._n_base])
+
+    def _sorted_index(self) -> tuple:
+        sorted_index = self._sorted
+        if sorted_index is None:
+            with self._lock:
+                movie_ids = self.movie_ids.copy()
+                order = np.argsort(movie_ids, kind='stable')
+                sorted_index = self._sorted = (movie_ids[order], order)
+        return sorted_index
+
+    @staticmethod
+    def _sanitize(record: Dict) -> Dict:
+        """Replace NaN floats and 'nan' strings with None so records serialize cleanly"""
+        for key, value in record.items():
+            if isinstance(value, float) and math.isnan(value):
+                record[key] = None
+            elif isinstance(value, str) and value.lower() == 'nan':
+                record[key] = None
+            elif isinstance(value, np.generic):
+                record[key] = value.item()
+        return record
+
+    def __len__(self) -> int:
+        return self._n_base + len(self._appended)
+
+    def __contains__(self, movie_id) -> bool:
+        try:
+            return int(movie_id) in self._row_of
+        except (TypeError, ValueError):
+            return False
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def ids(self) -> List[int]:
+        return self.movie_ids.tolist()
+
+    def get(self, movie_id: int) -> Optional[Dict]:
+        """Record for one movie (a copy, safe to modify), or None if it is not in the catalog"""
+        row = self._row_of.get(int(movie_id))
+        return self._record(row) if row is not None else None
+
+    def rows_for(self, movie_ids: Iterable[int]) -> np.ndarray:
+        """Catalog rows of the given ids in request order, dropping unknown ids (one searchsorted over the sorted id array)"""
+        sorted_ids, sorted_rows = self._sorted_index()
+        ids = np.fromiter((int(mid) for mid in movie_ids), dtype=np.int64)
+        if len(ids) == 0 or len(sorted_ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        found = sorted_ids[positions] == ids
+        return sorted_rows[positions[found]]
+
+    def get_many(self, movie_ids: Iterable[int]) -> List[Dict]:
+        """Records for the given ids in request order, skipping ids not in the catalog"""
+        return [self._record(row) for row in self.rows_for(movie_ids)]
+
+    def records(self, rows: Optional[Iterable[int]] = None) -> List[Dict]:
+        """Copies of all records, or of the given catalog rows"""
+        if rows is None:
+            rows = range(len(self))
+        return [self._record(row) for row in rows]
+
+    def sorted_rows(self) -> np.ndarray:
+        """Catalog rows ordered by movie_id"""
+        return self._sorted_index()[1]
+
+    def sample_rows(self, n: int, random_state: int) -> np.ndarray:
+        """n distinct catalog rows chosen reproducibly for a seed (all rows if the catalog is smaller)"""
+        if len(self) <= n:
+            return np.arange(len(self))
+        return np.random.RandomState(random_state % (2 ** 32)).choice(len(self), n, replace=False)
+
+    def sample(self, n: int, random_state: int) -> List[Dict]:
+        """n distinct records chosen reproducibly for a seed (all records if the catalog is smaller)"""
+        return self.records(self.sample_rows(n, random_state))
+
+    def fragments(self, rows: Optional[Iterable[int]] = None, fields: Optional[Tuple[str, ...]] = None) -> List[bytes]:
+        """Pre-encoded JSON objects for all rows or the given rows (only `fields` if given), encoded once per movie"""
+        if rows is None:
+            rows = range(len(self))
+        encoded = []
+        for row in rows:
+            key = (fields, int(self._ids[row]))
+            fragment = self._fragments.get(key)
+            if fragment is None:
+                record = self._record(row)
+                if fields is not None:
+                    record = {field: record.get(field) for field in fields}
+                fragment = self._fragments[key] = fast_json.dumps(record)
+            encoded.append(fragment)
+        return encoded
+
+    def to_json(self, path: str):
+        """Write every record (appended movies included) as a JSON array, swapped in atomically"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.records(), f, default=str)
+        os.replace(tmp_path, path)
+
+    def add(self, movie: Dict) -> bool:
+        """Append one movie; returns False if it is already in the catalog"""
+        return bool(self.add_many([movie]))
+
+    def add_many(self, movies: Iterable[Dict]) -> List[Dict]:
+        """Append several movies under one lock acquisition; returns the records actually added (new ids only)"""
+        added = []
+        with self._lock:
+            for movie in movies:
+                movie_id = int(movie['movie_id'])
+                if movie_id in self._row_of:
+                    continue
+
+                row = len(self)
+                if row == len(self._ids):
+                    self._ids = np.concatenate([self._ids, np.empty(len(self._ids), dtype=np.int64)])
+                self._ids[row] = movie_id
+                # Same keys as the loaded records (missing fields as None), then any extra ones
+                record = self._sanitize({**dict.fromkeys(self._snapshot.column_names()), **movie})
+                self._appended.append(record)
+                self._row_of[movie_id] = row
+                added.append(dict(record))
+            if added:
+                self._sorted = None
+        return added
@@ -0,0 +1,175 @@
+import os
+import json
+import numpy as np
+from typing import Optional, List, Dict, Iterable, Tuple
+from scipy import sparse
+from content_index import ContentIndex
+
+class NeighborTable:
+    """Top-K most similar movies per movie, stored as CSR indices + float32 scores"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, scores: np.ndarray, movie_ids: np.ndarray, k: int, fingerprint: str = ''):
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+        self.movie_ids = movie_ids
+        self.k = k
+        self.fingerprint = fingerprint
+        self.id_to_row = {int(movie_id): row for row, movie_id in enumerate(movie_ids)}
+
+    @classmethod
+    def build(cls, content_index: ContentIndex, k: int = 20, chunk_size: int = 256) -> 'NeighborTable':
+        """Compute the top-K neighbors of every movie from the TF-IDF vectors, a block of rows at a time"""
+        state = content_index.state
+        matrix = state.matrix
+        n_movies = matrix.shape[0]
+        k = max(0, min(k, n_movies - 1))
+
+        indptr = np.zeros(n_movies + 1, dtype=np.int64)
+        indices_blocks = []
+        scores_blocks = []
+
+        matrix_t = matrix.T.tocsc()
+        for start in range(0, n_movies, chunk_size):
+            end = min(start + chunk_size, n_movies)
+            block = (matrix[start:end] @ matrix_t).toarray().astype(np.float32)
+
+            # A movie is never its own neighbor
+            block[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+            if k > 0:
+                top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(block, top, axis=1)
+                order = np.argsort(-top_scores, axis=1, kind='stable')
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+            else:
+                top = np.zeros((end - start, 0), dtype=np.int64)
+                top_scores = np.zeros((end - start, 0), dtype=np.float32)
+
+            # Only keep neighbors that share at least one term
+            keep = top_scores > 0
+            indptr[start + 1:end + 1] = np.cumsum(keep.sum(axis=1)) + indptr[start]
+            indices_blocks.append(top[keep].astype(np.int32))
+            scores_blocks.append(top_scores[keep].astype(np.float32))
+
+        indices = np.concatenate(indices_blocks) if indices_blocks else np.zeros(0, dtype=np.int32)
+        scores = np.concatenate(scores_blocks) if scores_blocks else np.zeros(0, dtype=np.float32)
+        return cls(indptr, indices, scores, state.movie_ids.copy(), k, content_index.fingerprint)
+
+    @classmethod
+    def load_or_build(cls, content_index: ContentIndex, path: str = "neighbor_table", k: int = 20) -> 'NeighborTable':
+        """Memory-map a persisted table if it matches the content index, otherwise build and persist it"""
+        table = cls.load(path)
+        if table is not None and table.fingerprint == content_index.fingerprint and table.k == k:
+            return table
+
+        table = cls.build(content_index, k)
+        try:
+            table.save(path)
+        except Exception as e:
+            pass
+        return table
+
+    def save(self, path: str):
+        """Persist the table as plain .npy arrays so it can be memory-mapped"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(path, 'indices.npy'), self.indices)
+        np.save(os.path.join(path, 'scores.npy'), self.scores)
+        np.save(os.path.join(path, 'movie_ids.npy'), self.movie_ids)
+        with open(os.path.join(path, 'manifest.json'), 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'k': self.k, 'rows': len(self.movie_ids)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Optional['NeighborTable']:
+        """Load a persisted table, returning None if it is missing or unreadable"""
+        mmap_mode = 'r' if mmap else None
+        try:
+            with open(os.path.join(path, 'manifest.json'), 'r') as f:
+                manifest = json.load(f)
+            return cls(
+                np.load(os.path.join(path, 'indptr.npy'), mmap_mode=mmap_mode),
+                np.load(os.path.join(path, 'indices.npy'), mmap_mode=mmap_mode),
+                np.load(os.path.join(path, 'scores.npy'), mmap_mode=mmap_mode),
+                np.load(os.path.join(path, 'movie_ids.npy')),
+                manifest.get('k', 0),
+                manifest.get('fingerprint', '')
+            )
+        except Exception as e:
+            return None
+
+    def __contains__(self, movie_id) -> bool:
+        return int(movie_id) in self.id_to_row
+
+    def neighbors(self, movie_id: int, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Most similar movies to one movie as (movie_id, similarity) pairs"""
+        row = self.id_to_row.get(int(movie_id))
+        if row is None:
+            return []
+
+        start, end = int(self.indptr[row]), int(self.indptr[row + 1])
+        if limit is not None:
+            end = min(end, start + limit)
+        return [
+            (int(self.movie_ids[idx]), float(score))
+            for idx, score in zip(self.indices[start:end], self.scores[start:end])
+        ]
+
+    def aggregate(self, liked_movie_ids: Iterable[int], n: int, exclude_ids: Iterable[int] = ()) -> List[Dict]:
+        """Score candidates by their mean similarity to the liked movies, touching only liked x K entries"""
+        rows = [self.id_to_row[int(mid)] for mid in liked_movie_ids if int(mid) in self.id_to_row]
+        if not rows:
+            return []
+
+        candidate_rows = np.concatenate([self.indices[self.indptr[r]:self.indptr[r + 1]] for r in rows])
+        candidate_scores = np.concatenate([self.scores[self.indptr[r]:self.indptr[r + 1]] for r in rows])
+        if len(candidate_rows) == 0:
+            return []
+
+        unique_rows, inverse = np.unique(candidate_rows, return_inverse=True)
+        totals = np.bincount(inverse, weights=candidate_scores) / len(rows)
+
+        excluded = {int(mid) for mid in exclude_ids}
+        order = np.argsort(-totals, kind='stable')
+
+        results = []
+        for i in order:
+            movie_id = int(self.movie_ids[unique_rows[i]])
+            if movie_id in excluded:
+                continue
+            results.append({'movie_id': movie_id, 'score': float(totals[i])})
+            if len(results) >= n:
+                break
+        return results
+
+    def as_csr(self, n_rows: Optional[int] = None) -> sparse.csr_matrix:
+        """The table as a square movie x movie sparse matrix, padded to n_rows for later catalog additions"""
+        n_rows = max(n_rows or 0, len(self.movie_ids))
+        indptr = np.concatenate([self.indptr, np.full(n_rows - len(self.movie_ids), self.indptr[-1], dtype=self.indptr.dtype)])
+        return sparse.csr_matrix((self.scores, self.indices, indptr), shape=(n_rows, n_rows))
+
+    def aggregate_batch(self, liked: sparse.csr_matrix) -> np.ndarray:
+        """aggregate() for many users at once: mean neighbor similarity as one sparse product"""
+        table = self.as_csr(liked.shape[1])
+        # Only liked movies that have a row in the table count towards the mean
+        in_table = liked[:, :len(self.movie_ids)]
+        counts = np.asarray(in_table.sum(axis=1)).ravel()
+        inverse_counts = np.divide(1.0, counts, out=np.zeros_like(counts), where=counts > 0)
+        totals = (liked @ table).toarray().astype(np.float32)
+        return totals * inverse_counts[:, None].astype(np.float32)
+
+if __name__ == '__main__':
+    # Offline precompute: python neighbor_table.py [cached_movies.json] [neighbor_table] [k]
+    import sys
+    import pandas as pd
+
+    catalog_path = sys.argv[1] if len(sys.argv) > 1 else "cached_movies.json"
+    table_path = sys.argv[2] if len(sys.argv) > 2 else "neighbor_table"
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    with open(catalog_path, 'r') as f:
+        movies_df = pd.DataFrame(json.load(f))
+    table = NeighborTable.build(ContentIndex.build(movies_df), k)
+    table.save(table_path)
+    print(f"Wrote {len(table.indices)} neighbors for {len(table.movie_ids)} movies to {table_path}")
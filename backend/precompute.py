@@ -0,0 +1,165 @@
+"""Offline job: materialize every user's hybrid top-N into the user_recommendations table
+
+    python -m precompute [--workers 4] [--n 12] [--mode user|item|mf] [--db cinemate.db]
+
+Users are split into contiguous user_id ranges, one range per task, and scored
+on a process pool with the same batch code path as /api/recommendations/batch.
+Results are bulk-written by the parent process so SQLite only ever sees one writer.
+
+The job never imports the Flask app: the catalog, content index and neighbor
+table are loaded from the files the app persists (same environment variables),
+and workers get the database path and collaborative mode explicitly.
+"""
+import os
+import time
+import argparse
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple, Dict, Optional
+import pandas as pd
+from ann_index import RandomProjectionLSH
+from catalog_journal import CatalogJournal
+from catalog_snapshot import CatalogSnapshot
+from content_index import ContentIndex
+from hybrid import recommend_batch
+from movie_catalog import MovieCatalog
+from neighbor_table import NeighborTable
+from tmdb_client import TMDBClient
+from user_system import UserSystem
+
+# Model state of this process: built by run() before workers are forked, or by _init_worker under spawn
+_state: Optional[Dict] = None
+
+def _config(db_path: str, collaborative_mode: str) -> Dict:
+    """Everything a worker needs to rebuild the model state, as plain picklable values"""
+    return {
+        'db_path': db_path,
+        'collaborative_mode': collaborative_mode,
+        'catalog_json_path': os.getenv('CATALOG_JSON_PATH', 'cached_movies.json'),
+        'catalog_snapshot_path': os.getenv('CATALOG_SNAPSHOT_PATH', 'catalog_snapshot'),
+        'catalog_journal_path': os.getenv('CATALOG_JOURNAL_PATH', 'cached_movies.journal.ndjson'),
+        'content_index_path': os.getenv('CONTENT_INDEX_PATH', 'content_index'),
+        'neighbor_table_path': os.getenv('NEIGHBOR_TABLE_PATH', 'neighbor_table'),
+        'neighbor_table_k': int(os.getenv('NEIGHBOR_TABLE_K', '20')),
+        'content_backend': os.getenv('CONTENT_BACKEND', 'neighbors'),
+        'ann_params': (int(os.getenv('ANN_TABLES', '16')), int(os.getenv('ANN_BITS', '8')), int(os.getenv('ANN_PROBE_RADIUS', '1')))
+    }
+
+def _load_catalog(config: Dict) -> MovieCatalog:
+    """The catalog the app would load: a current snapshot, else cached_movies.json, plus the journal"""
+    tmdb_client = TMDBClient()
+    url_builders = {'poster_url': ('poster_path', tmdb_client.get_poster_url), 'backdrop_url': ('backdrop_path', tmdb_client.get_backdrop_url)}
+    manifest = os.path.join(config['catalog_snapshot_path'], 'manifest.json')
+    json_path = config['catalog_json_path']
+    if os.path.exists(manifest) and (not os.path.exists(json_path) or os.path.getmtime(manifest) >= os.path.getmtime(json_path)):
+        movie_catalog = MovieCatalog(snapshot=CatalogSnapshot.load(config['catalog_snapshot_path'], url_builders))
+    else:
+        movie_catalog = MovieCatalog(pd.read_json(json_path, orient='records'), url_builders=url_builders)
+    movie_catalog.add_many(CatalogJournal(config['catalog_journal_path']).replay())
+    return movie_catalog
+
+def _load_state(config: Dict) -> Dict:
+    """Load the catalog and content models and fit the collaborative model, without any side effects on the files"""
+    user_system = UserSystem(config['db_path'])
+    movie_catalog = _load_catalog(config)
+
+    fingerprint = movie_catalog.snapshot_fingerprint
+    content_index = ContentIndex.load(config['content_index_path']) if fingerprint else None
+    if content_index is None or content_index.fingerprint != fingerprint:
+        fingerprint = ContentIndex.catalog_fingerprint(movie_catalog.df)
+        content_index = ContentIndex.load(config['content_index_path'])
+        if content_index is None or content_index.fingerprint != fingerprint:
+            content_index = ContentIndex.build(movie_catalog.df, fingerprint=fingerprint)
+
+    neighbor_table = NeighborTable.load(config['neighbor_table_path'])
+    if neighbor_table is None or neighbor_table.fingerprint != content_index.fingerprint or neighbor_table.k != config['neighbor_table_k']:
+        neighbor_table = NeighborTable.build(content_index, config['neighbor_table_k'])
+
+    content_ann = None
+    if config['content_backend'] == 'lsh':
+        content_ann = RandomProjectionLSH(*config['ann_params']).fit(content_index.matrix)
+
+    # Load the ratings matrix and fit the selected model once per process
+    user_system.ratings_matrix
+    if config['collaborative_mode'] == 'item':
+        user_system.refresh_item_similarity()
+    elif config['collaborative_mode'] == 'mf':
+        user_system.refresh_factor_model()
+
+    return {
+        'user_system': user_system,
+        'movie_catalog': movie_catalog,
+        'content_index': content_index,
+        'neighbor_table': neighbor_table,
+        'content_ann': content_ann
+    }
+
+def _init_worker(config: Dict):
+    # Under fork the parent's loaded state is inherited; under spawn each worker loads its own once
+    global _state
+    if _state is None:
+        _state = _load_state(config)
+
+def _rated_user_ids(db_path: str) -> List[int]:
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT DISTINCT user_id FROM user_ratings ORDER BY user_id')
+    user_ids = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return user_ids
+
+def _partition(user_ids: List[int], n_parts: int) -> List[List[int]]:
+    """Split sorted user ids into at most n_parts contiguous ranges of similar size"""
+    size = max(1, -(-len(user_ids) // max(1, n_parts)))
+    return [user_ids[start:start + size] for start in range(0, len(user_ids), size)]
+
+def _compute_range(user_ids: List[int], n_recommendations: int, collaborative_mode: str) -> List[Tuple[int, List[Dict]]]:
+    return list(recommend_batch(
+        _state['user_system'], user_ids, n_recommendations, collaborative_mode,
+        _state['movie_catalog'], _state['content_index'], _state['neighbor_table'], _state['content_ann']
+    ))
+
+def run(db_path: str, n_recommendations: int, collaborative_mode: str, workers: int) -> int:
+    """Recompute and store recommendations for every user with ratings; returns the number of users written"""
+    global _state
+    # Stamp before any ratings are read: ratings written during the run then count as newer than the results
+    computed_at = time.time()
+
+    config = _config(db_path, collaborative_mode)
+    _state = _load_state(config)
+    user_system = _state['user_system']
+
+    user_ids = _rated_user_ids(db_path)
+    written = 0
+    if workers <= 1:
+        for part in _partition(user_ids, 1):
+            rows = _compute_range(part, n_recommendations, collaborative_mode)
+            user_system.save_precomputed_recommendations(rows, n_recommendations, collaborative_mode, computed_at)
+            written += len(rows)
+        return written
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as executor:
+        futures = [
+            executor.submit(_compute_range, part, n_recommendations, collaborative_mode)
+            for part in _partition(user_ids, workers * 4)
+        ]
+        for future in as_completed(futures):
+            rows = future.result()
+            user_system.save_precomputed_recommendations(rows, n_recommendations, collaborative_mode, computed_at)
+            written += len(rows)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute top-N recommendations for all users")
+    parser.add_argument('--db', default='cinemate.db', help='SQLite database path')
+    parser.add_argument('--n', type=int, default=12, help='recommendations per user (must match what the API requests)')
+    parser.add_argument('--mode', default=os.getenv('COLLABORATIVE_MODE', 'user'), choices=['user', 'item', 'mf'], help='collaborative filtering mode')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    written = run(args.db, args.n, args.mode, args.workers)
+    print(f"Precomputed recommendations for {written} users in {time.time() - start_time:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import base64
+import zlib
+import numpy as np
+from typing import Iterable, List, Optional, Tuple
+
+class RatingCandidatePool:
+    """Movies offered on the rating page, with shuffled orderings precomputed once per catalog version
+
+    The pool is the first `pool_size` movies by movie_id; their pre-encoded
+    JSON records and `n_permutations` shuffles of the pool are built once, so
+    serving a page is a slice of a permutation plus a lookup of prebuilt
+    fragments. Pages are addressed by an opaque cursor (pool version,
+    permutation, offset), and movies the user already rated can be skipped
+    with a boolean mask over the pool. The pool version is a checksum of the
+    pool's movie ids, so adding movies outside the pool keeps cursors valid;
+    a cursor from an older pool restarts its permutation at offset 0.
+    """
+
+    def __init__(self, movie_catalog, pool_size: int = 400, n_permutations: int = 16, seed: int = 42):
+        self.catalog_size = len(movie_catalog)
+        rows = movie_catalog.sorted_rows()[:pool_size]
+        self.fragments: List[bytes] = movie_catalog.fragments(rows)
+        self.movie_ids = np.asarray(movie_catalog.movie_ids[rows], dtype=np.int64)
+        # Same ids and seed give the same shuffles, so a rebuilt pool with an unchanged version serves the same pages
+        self.version = zlib.crc32(self.movie_ids.tobytes(), seed)
+        rng = np.random.RandomState(seed)
+        self.permutations = [rng.permutation(len(self.fragments)) for _ in range(max(1, n_permutations))]
+
+    def __len__(self) -> int:
+        return len(self.fragments)
+
+    def encode_cursor(self, permutation: int, offset: int) -> str:
+        return base64.urlsafe_b64encode(f'{self.version}.{permutation}.{offset}'.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str) -> Optional[Tuple[int, int]]:
+        """(permutation, offset), or None if the cursor is malformed; a cursor from another pool version restarts at offset 0"""
+        try:
+            version, permutation, offset = (int(part) for part in base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split('.'))
+        except (ValueError, UnicodeDecodeError) as e:
+            return None
+        if not 0 <= permutation < len(self.permutations) or offset < 0:
+            return None
+        return permutation, offset if version == self.version else 0
+
+    def _keep_mask(self, exclude_ids: Iterable[int]) -> Optional[np.ndarray]:
+        exclude = np.fromiter((int(movie_id) for movie_id in exclude_ids), dtype=np.int64)
+        if len(exclude) == 0:
+            return None
+        return ~np.isin(self.movie_ids, exclude)
+
+    def available(self, exclude_ids: Iterable[int] = ()) -> int:
+        """Number of pool movies left once excluded movies are removed"""
+        keep = self._keep_mask(exclude_ids)
+        return len(self.fragments) if keep is None else int(keep.sum())
+
+    def page_after(self, permutation: int, offset: int, page_size: int, exclude_ids: Iterable[int] = ()) -> Tuple[List[bytes], Optional[int]]:
+        """Up to page_size encoded records from `offset` in a permutation, skipping excluded movies; returns (fragments, next offset or None)"""
+        order = self.permutations[permutation][offset:]
+        keep = self._keep_mask(exclude_ids)
+        positions = np.flatnonzero(keep[order])[:page_size] if keep is not None else np.arange(min(page_size, len(order)))
+        if len(positions) == 0:
+            return [], None
+        next_offset = offset + int(positions[-1]) + 1
+        has_more = next_offset < len(self.fragments) and (keep is None or keep[self.permutations[permutation][next_offset:]].any())
+        return [self.fragments[i] for i in order[positions]], next_offset if has_more else None
+
+    def page(self, permutation: int, page: int, page_size: int, exclude_ids: Iterable[int] = ()) -> Tuple[List[bytes], int, Optional[int]]:
+        """Numbered page of a permutation with excluded movies removed; returns (fragments, total available, next offset or None)"""
+        order = self.permutations[permutation]
+        offsets = np.arange(len(order))
+        keep = self._keep_mask(exclude_ids)
+        if keep is not None:
+            offsets = offsets[keep[order]]
+        start = (page - 1) * page_size
+        selected = offsets[start:start + page_size]
+        next_offset = int(selected[-1]) + 1 if len(selected) and start + page_size < len(offsets) else None
+        return [self.fragments[i] for i in order[selected]], len(offsets), next_offset
@@ -0,0 +1,219 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (sequence number, user_id, movie_id, rating or None for a removal, time of the change)
+RatingOp = Tuple[int, int, int, Optional[int], float]
+
+class RatingWriteQueue:
+    """Write-behind queue for rating changes, group-committed by a single writer thread
+
+    put() returns as soon as the change is queued; the writer commits whatever
+    has accumulated every `flush_interval` seconds, or as soon as `max_batch`
+    changes are waiting, in one transaction via `write_ops`. Changes that are
+    queued or being written stay visible through pending() until committed.
+
+    A failed batch is retried with exponential backoff. After `max_retries`
+    failures, or at once for an exception in `permanent_errors` (a constraint
+    violation will never succeed), the batch is split in half so the good
+    changes still commit; a single change that keeps failing is dead-lettered:
+    dropped from the queue, logged, kept in `dead_letters` and reported to
+    `on_dead_letter(op, error)`.
+    """
+
+    def __init__(self, write_ops: Callable[[List[RatingOp]], None], flush_interval: float = 0.05, max_batch: int = 500,
+                 on_flush: Optional[Callable[[int, float], None]] = None, max_retries: int = 5, max_backoff: float = 2.0,
+                 permanent_errors: Tuple[type, ...] = (), on_dead_letter: Optional[Callable[[RatingOp, Exception], None]] = None):
+        self.write_ops = write_ops
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.on_flush = on_flush
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.permanent_errors = permanent_errors
+        self.on_dead_letter = on_dead_letter
+        self.last_error: Optional[Exception] = None
+        self.dead_letters: deque = deque(maxlen=1000)
+        # Failed attempts of the batch at the head of the queue, and the size the next batch is limited to
+        self._attempts = 0
+        self._batch_limit = max_batch
+        self._cond = threading.Condition()
+        self._ops: List[RatingOp] = []
+        self._in_flight = 0
+        # user_id -> movie_id -> (sequence number, rating) for changes not yet committed
+        self._pending: Dict[int, Dict[int, Tuple[int, Optional[int]]]] = {}
+        self._next_seq = 1
+        self._committed_seq = 0
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'RatingWriteQueue':
+        """Start the writer thread (no-op if it is already running)"""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='rating-writer', daemon=True)
+                self._thread.start()
+        return self
+
+    def __len__(self) -> int:
+        """Changes queued or being written"""
+        with self._cond:
+            return len(self._ops) + self._in_flight
+
+    def put(self, user_id: int, movie_id: int, rating: Optional[int]):
+        """Queue one rating change (rating=None removes the rating)"""
+        self.put_many(user_id, {movie_id: rating})
+
+    def put_many(self, user_id: int, ratings: Dict[int, Optional[int]]):
+        """Queue several rating changes for one user"""
+        now = time.time()
+        with self._cond:
+            user_pending = self._pending.setdefault(user_id, {})
+            for movie_id, rating in ratings.items():
+                seq = self._next_seq
+                self._next_seq += 1
+                self._ops.append((seq, user_id, movie_id, rating, now))
+                user_pending[movie_id] = (seq, rating)
+            if len(self._ops) == len(ratings) or len(self._ops) >= self.max_batch:
+                self._cond.notify_all()
+
+    def pending(self, user_id: int) -> Dict[int, Optional[int]]:
+        """Uncommitted changes for a user: movie_id -> rating, or None for a removal"""
+        with self._cond:
+            return {movie_id: rating for movie_id, (seq, rating) in self._pending.get(user_id, {}).items()}
+
+    def pending_all(self) -> Dict[int, Dict[int, Optional[int]]]:
+        """Uncommitted changes for every user: user_id -> movie_id -> rating, or None for a removal"""
+        with self._cond:
+            return {
+                user_id: {movie_id: rating for movie_id, (seq, rating) in user_pending.items()}
+                for user_id, user_pending in self._pending.items()
+            }
+
+    def _backoff(self) -> float:
+        return min(self.max_backoff, self.flush_interval * 2 ** max(0, self._attempts - 1))
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far is committed or dead-lettered; returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            target = self._next_seq - 1
+            if self._thread is None or not self._thread.is_alive():
+                # No writer (not started or already stopped): write inline
+                while self._ops and time.monotonic() < deadline:
+                    if not self._write_next():
+                        self._cond.wait(min(self._backoff(), max(0.0, deadline - time.monotonic())))
+                return self._committed_seq >= target
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._committed_seq >= target, timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """Commit everything still queued and stop the writer thread, giving up after `timeout` seconds"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                return
+        self.flush(max(0.0, deadline - time.monotonic()))
+
+    def _run(self):
+        with self._cond:
+            while True:
+                self._cond.wait_for(lambda: self._ops or self._stopping)
+                if not self._ops:
+                    break
+
+                # Group commit: let the batch fill up for at most flush_interval
+                deadline = self._ops[0][4] + self.flush_interval
+                while len(self._ops) < self.max_batch and not self._stopping and not self._flush_requested:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._flush_requested = False
+
+                if not self._write_next():
+                    # Back off before retrying a failed batch, also while stopping (retries are capped)
+                    self._cond.wait(self._backoff())
+
+    def _write_next(self) -> bool:
+        """Write the next batch; called with the condition held, released while writing
+
+        Returns False if the batch failed and was put back for another attempt.
+        """
+        batch = self._ops[:self._batch_limit]
+        del self._ops[:self._batch_limit]
+        self._in_flight = len(batch)
+
+        self._cond.release()
+        start_time = time.perf_counter()
+        try:
+            self.write_ops(batch)
+            error = None
+        except Exception as e:
+            error = e
+        duration = time.perf_counter() - start_time
+        self._cond.acquire()
+
+        self._in_flight = 0
+        if error is not None:
+            self.last_error = error
+            self._attempts += 1
+            if isinstance(error, self.permanent_errors) or self._attempts >= self.max_retries:
+                if len(batch) == 1:
+                    self._dead_letter(batch[0], error)
+                    return True
+                # Isolate the failing changes: retry in halves, so the rest of the batch still commits
+                self._batch_limit = max(1, len(batch) // 2)
+                self._attempts = 0
+            # Keep the changes (and their order) for the next attempt
+            self._ops[:0] = batch
+            return False
+
+        self.last_error = None
+        self._attempts = 0
+        self._batch_limit = self.max_batch
+        self._complete(batch)
+
+        if self.on_flush is not None:
+            try:
+                self.on_flush(len(batch), duration)
+            except Exception as e:
+                pass
+        return True
+
+    def _dead_letter(self, op: RatingOp, error: Exception):
+        """Give up on one change; called with the condition held"""
+        logger.error("Dropping rating change after %d failed attempts: user %s movie %s rating %s: %s",
+                     self._attempts, op[1], op[2], op[3], error)
+        self._attempts = 0
+        self._batch_limit = self.max_batch
+        self.dead_letters.append((op, error))
+        self._complete([op])
+        if self.on_dead_letter is not None:
+            try:
+                self.on_dead_letter(op, error)
+            except Exception as e:
+                pass
+
+    def _complete(self, batch: List[RatingOp]):
+        """Forget changes that were committed or dead-lettered; called with the condition held"""
+        for seq, user_id, movie_id, rating, changed_at in batch:
+            user_pending = self._pending.get(user_id)
+            if user_pending is not None and user_pending.get(movie_id, (0, None))[0] <= seq:
+                del user_pending[movie_id]
+                if not user_pending:
+                    del self._pending[user_id]
+        self._committed_seq = batch[-1][0]
+        self._cond.notify_all()
@@ -0,0 +1,205 @@
+import threading
+import numpy as np
+from scipy import sparse
+from typing import Optional, List, Dict, Iterable, Tuple
+
+class RatingsMatrix:
+    """In-process sparse user x movie ratings matrix kept in sync with the user_ratings table"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.user_index: Dict[int, int] = {}
+        self.user_ids: List[int] = []
+        self.movie_index: Dict[int, int] = {}
+        self.movie_ids: List[int] = []
+        self._base = sparse.csr_matrix((0, 0), dtype=np.float32)
+        # (row, col) -> new rating, 0 meaning removed; folded into _base on the next read
+        self._pending: Dict[Tuple[int, int], float] = {}
+        self._row_norms = None
+        self.version = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, int, int]]) -> 'RatingsMatrix':
+        """Build the matrix from (user_id, movie_id, rating) rows in one pass"""
+        matrix = cls()
+        row_idx, col_idx, values = [], [], []
+        for user_id, movie_id, rating in rows:
+            row_idx.append(matrix._user_row(user_id))
+            col_idx.append(matrix._movie_col(movie_id))
+            values.append(rating)
+
+        matrix._base = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), (np.asarray(row_idx, dtype=np.int32), np.asarray(col_idx, dtype=np.int32))),
+            shape=(len(matrix.user_ids), len(matrix.movie_ids))
+        )
+        matrix._base.sum_duplicates()
+        return matrix
+
+    def _user_row(self, user_id: int) -> int:
+        user_id = int(user_id)
+        row = self.user_index.get(user_id)
+        if row is None:
+            row = len(self.user_ids)
+            self.user_index[user_id] = row
+            self.user_ids.append(user_id)
+        return row
+
+    def _movie_col(self, movie_id: int) -> int:
+        movie_id = int(movie_id)
+        col = self.movie_index.get(movie_id)
+        if col is None:
+            col = len(self.movie_ids)
+            self.movie_index[movie_id] = col
+            self.movie_ids.append(movie_id)
+        return col
+
+    def set_rating(self, user_id: int, movie_id: int, rating: float):
+        """Apply an insert-or-replace delta"""
+        with self._lock:
+            self._pending[(self._user_row(user_id), self._movie_col(movie_id))] = float(rating)
+            self.version += 1
+
+    def set_ratings(self, user_id: int, ratings: Dict[int, float]):
+        """Apply several insert-or-replace deltas for one user"""
+        with self._lock:
+            row = self._user_row(user_id)
+            for movie_id, rating in ratings.items():
+                self._pending[(row, self._movie_col(movie_id))] = float(rating)
+            self.version += 1
+
+    def remove_rating(self, user_id: int, movie_id: int):
+        """Apply a delete delta"""
+        with self._lock:
+            row = self.user_index.get(int(user_id))
+            col = self.movie_index.get(int(movie_id))
+            if row is None or col is None:
+                return
+            self._pending[(row, col)] = 0.0
+            self.version += 1
+
+    def csr(self) -> sparse.csr_matrix:
+        """Current matrix with all pending deltas folded in"""
+        with self._lock:
+            if self._pending:
+                self._apply_pending()
+            return self._base
+
+    def _apply_pending(self):
+        keys = list(self._pending.keys())
+        rows = np.fromiter((r for r, _ in keys), dtype=np.int32, count=len(keys))
+        cols = np.fromiter((c for _, c in keys), dtype=np.int32, count=len(keys))
+        new_values = np.fromiter(self._pending.values(), dtype=np.float32, count=len(keys))
+
+        # Replace old values by adding (new - old); cells outside the old shape start at zero
+        old_values = np.zeros(len(keys), dtype=np.float32)
+        inside = (rows < self._base.shape[0]) & (cols < self._base.shape[1])
+        if inside.any():
+            old_values[inside] = np.asarray(self._base[rows[inside], cols[inside]]).ravel()
+
+        shape = (len(self.user_ids), len(self.movie_ids))
+        base = self._base
+        if base.shape != shape:
+            base = base.copy()
+            base.resize(shape)
+
+        delta = sparse.csr_matrix((new_values - old_values, (rows, cols)), shape=shape)
+        base = (base + delta).tocsr()
+        base.eliminate_zeros()
+        base.sort_indices()
+
+        self._base = base
+        self._pending = {}
+        self._row_norms = None
+
+    def row_norms(self) -> np.ndarray:
+        """L2 norm of every user row, cached until the next delta"""
+        with self._lock:
+            matrix = self.csr()
+            if self._row_norms is None:
+                self._row_norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+            return self._row_norms
+
+    @property
+    def nnz(self) -> int:
+        return self.csr().nnz
+
+    def __contains__(self, user_id) -> bool:
+        row = self.user_index.get(int(user_id))
+        if row is None:
+            return False
+        indptr = self.csr().indptr
+        return indptr[row + 1] > indptr[row]
+
+    def user_ratings(self, user_id: int) -> Dict[int, float]:
+        """One user's ratings read straight from the CSR row"""
+        with self._lock:
+            row = self.user_index.get(int(user_id))
+            if row is None:
+                return {}
+            matrix = self.csr()
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            return {
+                self.movie_ids[col]: float(value)
+                for col, value in zip(matrix.indices[start:end], matrix.data[start:end])
+            }
+
+    def similar_users(self, user_id: int, k: int = 5, ann=None) -> List[Tuple[int, float]]:
+        """Top-k users by cosine similarity of rating rows, without forming the user x user matrix"""
+        with self._lock:
+            row = self.user_index.get(int(user_id))
+            if row is None:
+                return []
+            matrix = self.csr()
+            norms = self.row_norms()
+        
+        if ann is not None:
+            # Rerank only the ANN candidates, plus users who appeared after the index was built
+            new_rows = range(ann.n_rows, matrix.shape[0])
+            neighbours = ann.search(matrix[row], matrix, k, exclude_rows=[row], extra_rows=new_rows)
+            return [(self.user_ids[r], similarity) for r, similarity in neighbours]
+
+        if norms[row] == 0:
+            return []
+
+        dots = np.asarray((matrix @ matrix[row].T).todense()).ravel()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarities = np.where(norms > 0, dots / (norms * norms[row]), 0.0)
+        similarities[row] = -np.inf
+
+        k = min(k, len(similarities) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return [(self.user_ids[i], float(similarities[i])) for i in top]
+
+    def similar_users_batch(self, user_ids: List[int], k: int = 5) -> Dict[int, List[Tuple[int, float]]]:
+        """similar_users() for a block of users: one sparse block x users product, top-k per row"""
+        with self._lock:
+            matrix = self.csr()
+            norms = self.row_norms()
+        
+        present = [(user_id, self.user_index[int(user_id)]) for user_id in user_ids if int(user_id) in self.user_index]
+        results = {user_id: [] for user_id in user_ids}
+        if not present:
+            return results
+        
+        rows = np.asarray([row for _, row in present])
+        dots = (matrix[rows] @ matrix.T).tocsr()
+        
+        for i, (user_id, row) in enumerate(present):
+            if norms[row] == 0:
+                continue
+            start, end = dots.indptr[i], dots.indptr[i + 1]
+            others = dots.indices[start:end]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                similarities = np.where(norms[others] > 0, dots.data[start:end] / (norms[others] * norms[row]), 0.0)
+            similarities[others == row] = -np.inf
+            
+            top_k = min(k, int(np.isfinite(similarities).sum()))
+            if top_k <= 0:
+                continue
+            top = np.argpartition(-similarities, top_k - 1)[:top_k]
+            top = top[np.argsort(-similarities[top], kind='stable')]
+            results[user_id] = [(self.user_ids[others[j]], float(similarities[j])) for j in top]
+        return results
@@ -0,0 +1,112 @@
+import json
+import time
+from typing import Any, Callable, Optional, Tuple
+from cache import LRUTTLCache
+from db import ConnectionPool
+
+class ResponseCache:
+    """Two-tier cache for upstream API responses: an in-memory LRU in front of a SQLite table
+
+    Values are stored as JSON, so every get returns a fresh copy the caller may
+    modify. Each entry remembers how long the upstream call took, and
+    `on_lookup(namespace, result, saved_seconds)` is called for every lookup
+    with result 'memory_hit', 'disk_hit' or 'miss', so callers can export hit
+    ratio and latency saved without this module depending on a metrics library.
+    """
+
+    def __init__(self, db_path: str = "tmdb_cache.db", memory_entries: int = 2048,
+                 on_lookup: Optional[Callable[[str, str, float], None]] = None, pool_size: int = 4):
+        self.memory = LRUTTLCache(memory_entries, ttl=0)
+        self.db = ConnectionPool(db_path, size=pool_size)
+        self.on_lookup = on_lookup
+        with self.db.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    fetch_seconds REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            ''')
+            conn.commit()
+        self.purge_expired()
+
+    def _emit(self, namespace: str, result: str, saved_seconds: float = 0.0):
+        if self.on_lookup is not None:
+            try:
+                self.on_lookup(namespace, result, saved_seconds)
+            except Exception as e:
+                pass
+
+    def get(self, namespace: str, key: str) -> Tuple[bool, Any]:
+        """(True, value) if a fresh entry exists in either tier, else (False, None)"""
+        entry = self.memory.get((namespace, key))
+        if entry is not None:
+            value, fetch_seconds = entry
+            self._emit(namespace, 'memory_hit', fetch_seconds)
+            return True, json.loads(value)
+
+        now = time.time()
+        with self.db.connection() as conn:
+            row = conn.execute('''
+                SELECT value, fetch_seconds, expires_at FROM responses
+                WHERE namespace = ? AND key = ?
+            ''', (namespace, key)).fetchone()
+        if row is None or row[2] <= now:
+            self._emit(namespace, 'miss')
+            return False, None
+
+        # Promote to memory for the rest of the entry's lifetime
+        value, fetch_seconds, expires_at = row
+        self.memory.set((namespace, key), (value, fetch_seconds), ttl=expires_at - now)
+        self._emit(namespace, 'disk_hit', fetch_seconds)
+        return True, json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float, fetch_seconds: float = 0.0):
+        """Store a value in both tiers for `ttl` seconds"""
+        encoded = json.dumps(value, default=str)
+        self.memory.set((namespace, key), (encoded, fetch_seconds), ttl=ttl)
+        with self.db.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO responses (namespace, key, value, fetch_seconds, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (namespace, key, encoded, fetch_seconds, time.time() + ttl))
+            conn.commit()
+
+    def get_or_fetch(self, namespace: str, key: str, fetch: Callable[[], Any], ttl: float,
+                     negative_ttl: Optional[float] = None, is_empty: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Cached value, or call `fetch()` and cache its result; empty results are kept for `negative_ttl` instead
+
+        Exceptions from fetch() propagate and nothing is cached.
+        """
+        found, value = self.get(namespace, key)
+        if found:
+            return value
+
+        start_time = time.perf_counter()
+        value = fetch()
+        fetch_seconds = time.perf_counter() - start_time
+
+        if is_empty is not None and is_empty(value):
+            ttl = ttl if negative_ttl is None else negative_ttl
+        if ttl > 0:
+            try:
+                self.set(namespace, key, value, ttl, fetch_seconds)
+            except Exception as e:
+                # A cache write failure must not fail the request
+                pass
+        return value
+
+    def purge_expired(self):
+        """Delete expired rows from the disk tier"""
+        with self.db.connection() as conn:
+            conn.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+            conn.commit()
+
+    def clear(self):
+        self.memory.clear()
+        with self.db.connection() as conn:
+            conn.execute('DELETE FROM responses')
+            conn.commit()
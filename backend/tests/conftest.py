@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+# Backend modules open relative paths on import (user_system creates ./cinemate.db), so run from a scratch directory
+os.chdir(tempfile.mkdtemp(prefix='cinemate-tests-'))
@@ -0,0 +1,49 @@
+import json
+import pytest
+from catalog_journal import CatalogJournal
+
+
+def test_replay_returns_appended_movies_and_skips_a_torn_last_line(tmp_path):
+    journal = CatalogJournal(str(tmp_path / 'journal.ndjson'))
+    journal.append({'movie_id': 1, 'title': 'One'})
+    journal.append_many([{'movie_id': 2, 'title': 'Two'}, {'movie_id': 3, 'title': 'Three'}])
+    with open(journal.path, 'a') as f:
+        f.write('{"movie_id": 4, "tit')
+
+    assert [movie['movie_id'] for movie in CatalogJournal(journal.path).replay()] == [1, 2, 3]
+    assert len(journal) == 3
+
+
+def test_compact_writes_the_catalog_then_truncates(tmp_path):
+    journal = CatalogJournal(str(tmp_path / 'journal.ndjson'))
+    catalog_path = tmp_path / 'catalog.json'
+    catalog = [{'movie_id': 1, 'title': 'One'}]
+    journal.append_many([{'movie_id': 2, 'title': 'Two'}, {'movie_id': 3, 'title': 'Three'}])
+
+    def write_catalog():
+        # Runs under the journal lock, before the journal is truncated
+        with open(journal.path) as f:
+            catalog_path.write_text(json.dumps(catalog + [json.loads(line) for line in f]))
+
+    journal.compact(write_catalog)
+
+    assert [movie['movie_id'] for movie in json.loads(catalog_path.read_text())] == [1, 2, 3]
+    assert journal.replay() == []
+    assert len(journal) == 0
+
+    journal.append({'movie_id': 4, 'title': 'Four'})
+    assert [movie['movie_id'] for movie in journal.replay()] == [4]
+
+
+def test_failed_compaction_keeps_the_journal(tmp_path):
+    journal = CatalogJournal(str(tmp_path / 'journal.ndjson'))
+    journal.append_many([{'movie_id': 2, 'title': 'Two'}, {'movie_id': 3, 'title': 'Three'}])
+
+    def write_catalog():
+        raise OSError('disk full')
+
+    with pytest.raises(OSError):
+        journal.compact(write_catalog)
+
+    assert [movie['movie_id'] for movie in journal.replay()] == [2, 3]
+    assert len(journal) == 2
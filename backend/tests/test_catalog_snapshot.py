@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from catalog_snapshot import CatalogSnapshot
+
+
+def test_genres_keep_their_original_order_through_save_and_load(tmp_path):
+    movies_df = pd.DataFrame({
+        'movie_id': [1, 2, 3],
+        'title': ['One', 'Two', 'Three'],
+        'genre': ['Science Fiction, Action', 'Drama, Comedy, Action', None]
+    })
+    CatalogSnapshot.from_frame(movies_df).save(str(tmp_path / 'snapshot'))
+    snapshot = CatalogSnapshot.load(str(tmp_path / 'snapshot'))
+
+    assert [snapshot.record(row)['genre'] for row in range(3)] == ['Science Fiction, Action', 'Drama, Comedy, Action', None]
+
+
+def test_genres_that_would_not_round_trip_are_stored_as_strings():
+    movies_df = pd.DataFrame({'movie_id': [1], 'genre': ['Drama,Comedy']})
+    snapshot = CatalogSnapshot.from_frame(movies_df)
+
+    assert snapshot.columns[1]['kind'] == 'string'
+    assert snapshot.record(0)['genre'] == 'Drama,Comedy'
+
+
+def test_bitmask_snapshots_still_load():
+    columns = [{'name': 'movie_id', 'kind': 'numeric'}, {'name': 'genre', 'kind': 'labels', 'labels': ['Action', 'Drama'], 'nullable': False}]
+    arrays = {'movie_id': np.array([1, 2], dtype=np.int32), 'genre.mask': np.array([3, 2], dtype=np.uint32)}
+    snapshot = CatalogSnapshot(2, columns, arrays)
+
+    assert [snapshot.record(row)['genre'] for row in range(2)] == ['Action, Drama', 'Drama']
@@ -0,0 +1,73 @@
+import threading
+import numpy as np
+import pandas as pd
+from content_index import ContentIndex
+
+
+def catalog(start, stop):
+    return pd.DataFrame({
+        'movie_id': list(range(start, stop)),
+        'title': [f'Movie {i}' for i in range(start, stop)],
+        'overview': [('space pirates' if i % 2 else 'romantic comedy') + f' story {i}' for i in range(start, stop)],
+        'genre': ['Science Fiction' if i % 2 else 'Romance' for i in range(start, stop)]
+    })
+
+
+def test_add_movies_appends_rows_with_the_fitted_vocabulary():
+    index = ContentIndex.build(catalog(1, 11))
+    vocabulary = dict(index.vectorizer.vocabulary_)
+
+    index.add_movies(pd.concat([catalog(5, 13), catalog(12, 13)]))
+
+    assert len(index) == 12
+    assert index.movie_ids.tolist() == list(range(1, 13))
+    assert index.rows_for([11, 12, 99]) == [10, 11]
+    assert index.vectorizer.vocabulary_ == vocabulary
+    scores = index.score([11])
+    assert index.top_n(scores, 1, exclude_ids=[11])[0]['movie_id'] % 2 == 1
+
+
+def test_add_movies_publishes_a_new_state_and_leaves_the_old_one_intact():
+    index = ContentIndex.build(catalog(1, 11))
+    before = index.state
+    scores = index.score([1])
+
+    index.add_movies(catalog(11, 15))
+
+    assert index.state is not before
+    assert before.matrix.shape[0] == len(before.movie_ids) == len(before.id_to_row) == 10
+    # Scores computed before the append still rank against the rows they cover
+    top = index.top_n(scores, 3, exclude_ids=[1, 12])
+    assert len(top) == 3 and all(movie['movie_id'] <= 10 for movie in top)
+    # So does a batch built from the old state
+    liked = index.liked_matrix([[1], [2]], before)
+    assert index.score_batch(liked).shape == (2, 10)
+
+
+def test_readers_never_see_a_half_applied_append():
+    index = ContentIndex.build(catalog(1, 51))
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            state = index.state
+            if not state.matrix.shape[0] == len(state.movie_ids) == len(state.id_to_row):
+                errors.append(state.matrix.shape[0])
+            try:
+                index.top_n(index.score([1, 2]), 5, exclude_ids=range(1, 200))
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for start in range(51, 251, 10):
+        index.add_movies(catalog(start, start + 10))
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
+    assert len(index) == 250
+    assert np.array_equal(index.movie_ids, np.arange(1, 251))
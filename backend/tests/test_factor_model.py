@@ -0,0 +1,35 @@
+import threading
+import time
+from factor_model import FactorModel
+from ratings_matrix import RatingsMatrix
+
+
+def test_concurrent_refreshes_fit_once_per_ratings_version():
+    matrix = RatingsMatrix.from_rows((user_id, movie_id, 1 + (user_id * movie_id) % 5) for user_id in range(1, 21) for movie_id in range(1, 31))
+    fits = []
+    model = FactorModel(n_factors=4, iterations=2, on_fit=fits.append)
+    original_fit = model._fit
+    running, overlaps = [], []
+
+    def slow_fit(ratings_matrix):
+        running.append(1)
+        overlaps.append(len(running) > 1)
+        time.sleep(0.05)
+        original_fit(ratings_matrix)
+        running.pop()
+
+    model._fit = slow_fit
+    threads = [threading.Thread(target=model.refresh, args=(matrix,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == [False]
+    assert len(fits) == 1
+    assert model.matrix_version == matrix.version
+
+    matrix.set_rating(1, 1, 5)
+    assert model.refresh(matrix)
+    assert not model.refresh(matrix)
+    assert len(fits) == 2
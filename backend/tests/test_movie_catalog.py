@@ -0,0 +1,19 @@
+import pandas as pd
+from movie_catalog import MovieCatalog
+
+
+def frame(movie_ids):
+    return pd.DataFrame({'movie_id': movie_ids, 'title': [f'Movie {i}' for i in movie_ids]})
+
+
+def test_version_depends_only_on_the_movies():
+    catalog = MovieCatalog(frame([1, 2, 3]))
+    assert MovieCatalog(frame([1, 2, 3])).version == catalog.version
+    assert MovieCatalog(frame([1, 2, 4])).version != catalog.version
+
+    before = catalog.version
+    catalog.add({'movie_id': 10, 'title': 'New'})
+    assert catalog.version != before
+
+    catalog.snapshot.fingerprint = 'abc'
+    assert catalog.version == 'abc-4'
@@ -0,0 +1,75 @@
+import json
+import pandas as pd
+from movie_catalog import MovieCatalog
+from rating_pool import RatingCandidatePool
+
+
+def make_pool(n_movies=50, pool_size=40):
+    catalog = MovieCatalog(pd.DataFrame({
+        'movie_id': list(range(n_movies, 0, -1)),
+        'title': [f'Movie {i}' for i in range(n_movies, 0, -1)]
+    }))
+    return catalog, RatingCandidatePool(catalog, pool_size=pool_size, n_permutations=4)
+
+
+def walk(pool, permutation, offset, page_size, exclude_ids=()):
+    """Follow cursors from an offset of a permutation, returning every movie id served"""
+    served, cursor = [], pool.encode_cursor(permutation, offset)
+    while cursor is not None:
+        permutation, offset = pool.decode_cursor(cursor)
+        fragments, next_offset = pool.page_after(permutation, offset, page_size, exclude_ids)
+        served += [json.loads(fragment)['movie_id'] for fragment in fragments]
+        cursor = pool.encode_cursor(permutation, next_offset) if next_offset is not None else None
+    return served
+
+
+def test_cursor_round_trip():
+    _, pool = make_pool()
+    cursor = pool.encode_cursor(3, 17)
+
+    assert pool.decode_cursor(cursor) == (3, 17)
+    assert pool.decode_cursor('garbage') is None
+    assert pool.decode_cursor(pool.encode_cursor(4, 0)) is None
+    assert pool.decode_cursor(pool.encode_cursor(0, -1)) is None
+
+
+def test_cursor_walk_serves_the_pool_once_skipping_excluded_movies():
+    _, pool = make_pool()
+    assert sorted(walk(pool, 1, 0, 7)) == list(range(1, 41))
+
+    rated = [2, 3, 5, 7, 11, 13]
+    served = walk(pool, 1, 0, 7, exclude_ids=rated)
+    assert sorted(served) == sorted(set(range(1, 41)) - set(rated))
+    assert pool.available(rated) == 34
+
+
+def test_numbered_page_cursor_continues_after_that_page():
+    _, pool = make_pool()
+    first, total, next_offset = pool.page(2, 1, 10)
+    rest = walk(pool, 2, next_offset, 10)
+
+    assert total == 40
+    assert sorted([json.loads(fragment)['movie_id'] for fragment in first] + rest) == list(range(1, 41))
+
+
+def test_cursors_survive_movies_added_outside_the_pool():
+    catalog, pool = make_pool()
+    cursor = pool.encode_cursor(0, 10)
+    catalog.add({'movie_id': 1000, 'title': 'New'})
+    rebuilt = RatingCandidatePool(catalog, pool_size=40, n_permutations=4)
+
+    assert rebuilt.catalog_size == pool.catalog_size + 1
+    assert rebuilt.version == pool.version
+    assert rebuilt.decode_cursor(cursor) == (0, 10)
+    assert walk(rebuilt, 0, 10, 7) == walk(pool, 0, 10, 7)
+
+
+def test_cursor_from_an_older_pool_restarts_the_permutation():
+    catalog, pool = make_pool(n_movies=30)
+    cursor = pool.encode_cursor(2, 10)
+    catalog.add({'movie_id': 1000, 'title': 'New'})
+    rebuilt = RatingCandidatePool(catalog, pool_size=40, n_permutations=4)
+
+    assert rebuilt.version != pool.version
+    assert rebuilt.decode_cursor(cursor) == (2, 0)
+    assert sorted(walk(rebuilt, 2, 0, 7)) == list(range(1, 31)) + [1000]
@@ -0,0 +1,129 @@
+import sqlite3
+import time
+import pytest
+from rating_queue import RatingWriteQueue
+from user_system import UserSystem
+
+
+class FakeStore:
+    """write_ops target: commits a batch unless it contains a rating outside 1-5 or fail_times is still positive"""
+
+    def __init__(self, fail_times=0, error=RuntimeError):
+        self.rows = {}
+        self.fail_times = fail_times
+        self.error = error
+        self.calls = 0
+
+    def write(self, batch):
+        self.calls += 1
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise self.error('transient failure')
+        if any(rating is not None and not 1 <= rating <= 5 for _, _, _, rating, _ in batch):
+            raise sqlite3.IntegrityError('CHECK constraint failed: rating')
+        for _, user_id, movie_id, rating, _ in batch:
+            self.rows[(user_id, movie_id)] = rating
+
+
+def test_bad_change_is_dead_lettered_and_later_changes_commit():
+    store = FakeStore()
+    dead = []
+    queue = RatingWriteQueue(store.write, flush_interval=0.01, permanent_errors=(sqlite3.IntegrityError,),
+                             on_dead_letter=lambda op, error: dead.append(op))
+    queue.put(1, 10, 4)
+    queue.put(1, 9, 3)
+    queue.put(1, 3, 9)
+    queue.put(1, 5, 4)
+
+    assert queue.flush(timeout=2.0)
+    assert store.rows == {(1, 10): 4, (1, 9): 3, (1, 5): 4}
+    assert [(op[2], op[3]) for op in dead] == [(3, 9)]
+    assert [(op[2], op[3]) for op, error in queue.dead_letters] == [(3, 9)]
+    assert queue.pending(1) == {}
+    assert len(queue) == 0
+
+
+def test_transient_failures_are_retried():
+    store = FakeStore(fail_times=2)
+    queue = RatingWriteQueue(store.write, flush_interval=0.001).start()
+    queue.put_many(1, {10: 4, 11: 5})
+    assert queue.flush(timeout=2.0)
+    assert store.rows == {(1, 10): 4, (1, 11): 5}
+    assert not queue.dead_letters
+    queue.stop(timeout=2.0)
+
+
+def test_persistent_failure_gives_up_and_stop_returns():
+    store = FakeStore(fail_times=10 ** 6)
+    queue = RatingWriteQueue(store.write, flush_interval=0.001, max_retries=2, max_backoff=0.01).start()
+    queue.put_many(1, {10: 4, 11: 5, 12: 3})
+
+    start_time = time.monotonic()
+    assert queue.flush(timeout=5.0)
+    queue.stop(timeout=5.0)
+    assert time.monotonic() - start_time < 5.0
+    assert store.rows == {}
+    assert sorted(op[2] for op, error in queue.dead_letters) == [10, 11, 12]
+    assert queue.pending(1) == {}
+
+
+def test_flush_without_writer_thread_terminates():
+    store = FakeStore(fail_times=10 ** 6)
+    queue = RatingWriteQueue(store.write, flush_interval=0.001, max_retries=2, max_backoff=0.01)
+    queue.put(1, 10, 4)
+    assert queue.flush(timeout=5.0)
+    assert len(queue.dead_letters) == 1
+
+
+def test_stop_gives_up_after_timeout_while_writes_keep_failing():
+    store = FakeStore(fail_times=10 ** 6)
+    queue = RatingWriteQueue(store.write, flush_interval=0.05, max_retries=10 ** 6, max_backoff=0.05).start()
+    queue.put(1, 10, 4)
+
+    start_time = time.monotonic()
+    queue.stop(timeout=0.3)
+    assert time.monotonic() - start_time < 2.0
+    assert queue.pending(1) == {10: 4}
+
+
+@pytest.fixture
+def write_behind_users(tmp_path):
+    users = UserSystem(str(tmp_path / 'ratings.db'), pool_size=2)
+    users.enable_write_behind(flush_interval=0.01)
+    yield users
+    users.write_queue.stop(timeout=2.0)
+    users.db.close()
+
+
+def test_write_behind_rejects_invalid_rating_before_queueing(write_behind_users):
+    users = write_behind_users
+    with pytest.raises(ValueError):
+        users.add_rating(1, 3, 9)
+    users.add_rating(1, 4, 5)
+
+    assert users.flush_rating_writes(2.0)
+    assert users.get_user_ratings(1) == {4: 5}
+    assert list(users.get_all_ratings().itertuples(index=False, name=None)) == [(1, 4, 5)]
+    assert not users.write_queue.dead_letters
+
+
+def test_reads_fall_back_to_pending_overlay_when_writes_fail(write_behind_users):
+    users = write_behind_users
+    users.read_flush_timeout = 0.05
+    users.add_rating(1, 7, 4)
+    assert users.flush_rating_writes(timeout=2.0)
+    users.write_queue.write_ops = FakeStore(fail_times=10 ** 6).write
+    users.write_queue.max_retries = 10 ** 6
+    users.add_rating(1, 4, 5)
+    users.add_rating(1, 7, 3)
+
+    assert users.get_user_stats(1) == {'movies_rated': 2, 'average_rating': 4.0, 'favorite_movies': 1}
+    assert sorted(users.get_all_ratings().itertuples(index=False, name=None)) == [(1, 4, 5), (1, 7, 3)]
+    assert users.ratings_matrix.user_ratings(1) == {4: 5, 7: 3}
+
+    # Once the changes are dead-lettered the matrix is back to what was committed
+    users.write_queue.max_retries = 1
+    assert users.flush_rating_writes(timeout=2.0)
+    assert len(users.write_queue.dead_letters) == 2
+    assert users.ratings_matrix.user_ratings(1) == {7: 4}
+    assert users.get_user_ratings(1) == {7: 4}
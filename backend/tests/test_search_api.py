@@ -0,0 +1,69 @@
+import os
+import shutil
+import pytest
+from conftest import BACKEND_DIR
+
+
+@pytest.fixture(scope='module')
+def app_module():
+    # The real catalog, TMDb disabled; tests that need TMDb stub its search
+    shutil.copy(os.path.join(BACKEND_DIR, 'cached_movies.json'), 'cached_movies.json')
+    os.environ['TMDB_API_KEY'] = ''
+    os.environ['TMDB_BASE_URL'] = 'http://127.0.0.1:9'
+    import app
+    return app
+
+
+@pytest.fixture
+def tmdb_search(app_module, monkeypatch):
+    """Stub TMDb search: records the requested pages and returns `results` on each"""
+    calls = []
+    stub = {'results': []}
+
+    def search_movies(query, page=1):
+        calls.append(page)
+        return {'movies': [dict(movie) for movie in stub['results']], 'total_pages': 1 if stub['results'] else 0, 'total_results': len(stub['results'])}
+
+    monkeypatch.setattr(app_module.tmdb_client, 'api_key', 'test-key')
+    monkeypatch.setattr(app_module.tmdb_client, 'search_movies', search_movies)
+    stub['calls'] = calls
+    return stub
+
+
+def search(app_module, query, page=1):
+    response = app_module.app.test_client().get('/api/search-movies', query_string={'q': query, 'page': page})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_fewer_local_hits_than_a_page_are_served_without_tmdb(app_module, tmdb_search):
+    body = search(app_module, 'Pirates of the Caribbean: The Curse of the Black Pearl')
+
+    assert 22 in [movie['movie_id'] for movie in body['movies']]
+    assert 0 < body['total_results'] < app_module.SEARCH_PAGE_SIZE
+    assert len(body['movies']) == body['total_results']
+    assert body['total_pages'] == 2
+    assert tmdb_search['calls'] == []
+
+
+def test_tmdb_pages_follow_the_local_pages(app_module, tmdb_search):
+    query = 'Pirates of the Caribbean: The Curse of the Black Pearl'
+    local_total = search(app_module, query)['total_results']
+    tmdb_search['results'] = [{'movie_id': 22, 'title': 'Pirates'}, {'movie_id': 99999901, 'title': 'Elsewhere'}]
+
+    body = search(app_module, query, page=2)
+
+    assert tmdb_search['calls'] == [1]
+    # Movies already listed locally are not repeated
+    assert [movie['movie_id'] for movie in body['movies']] == [99999901]
+    assert body['total_pages'] == 2
+    assert body['total_results'] == local_total + 2
+
+
+def test_tmdb_answers_when_nothing_matches_locally(app_module, tmdb_search):
+    tmdb_search['results'] = [{'movie_id': 99999902, 'title': 'Only remote'}]
+
+    body = search(app_module, 'qwxzvbnm')
+
+    assert tmdb_search['calls'] == [1]
+    assert [movie['movie_id'] for movie in body['movies']] == [99999902]
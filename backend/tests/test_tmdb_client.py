@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pytest
+from tmdb_client import TMDBClient
+
+
+class StubTMDb(ThreadingHTTPServer):
+    """Local stand-in for the TMDb API; `pages` maps a page number to (delay, status, results) steps served in turn"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.pages = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def page(self, page, results=None, delay=0.0, status=200):
+        self.pages.setdefault(page, []).append((delay, status, movies(page) if results is None else results))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith('/genre/movie/list'):
+            return self.reply(200, {'genres': [{'id': 1, 'name': 'Drama'}]})
+        page = int(parse_qs(url.query)['page'][0])
+        with self.server.lock:
+            steps = self.server.pages[page]
+            step = steps.pop(0) if len(steps) > 1 else steps[0]
+            self.server.calls[page] += 1
+        delay, status, results = step
+        time.sleep(delay)
+        self.reply(status, {'page': page, 'results': results})
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except OSError:
+            pass  # the client gave up on a slow page
+
+    def log_message(self, format, *args):
+        pass
+
+
+def movies(page):
+    return [{'id': page * 10 + i, 'title': f'Movie {page * 10 + i}', 'overview': '', 'genre_ids': [1]} for i in range(2)]
+
+
+def ids(result):
+    return [movie['movie_id'] for movie in result]
+
+
+@pytest.fixture
+def stub():
+    server = StubTMDb()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(server, **kwargs):
+    kwargs.setdefault('backoff_factor', 0)
+    return TMDBClient(api_key='test', base_url=f'http://127.0.0.1:{server.server_address[1]}', **kwargs)
+
+
+def test_pages_come_back_in_page_order_whatever_order_they_finish(stub):
+    for page, delay in zip(range(1, 5), (0.3, 0.2, 0.1, 0.0)):
+        stub.page(page, delay=delay)
+
+    result = client_for(stub).get_popular_movies_pages(range(1, 5))
+
+    assert ids(result) == [10, 11, 20, 21, 30, 31, 40, 41]
+    assert result[0]['genre'] == 'Drama'
+
+
+def test_503_is_retried(stub):
+    stub.page(1)
+    stub.page(2, status=503)
+    stub.page(2)
+
+    result = client_for(stub).get_popular_movies_pages([1, 2])
+
+    assert ids(result) == [10, 11, 20, 21]
+    assert stub.calls[2] == 2
+
+
+def test_page_slower_than_the_request_timeout_is_skipped(stub):
+    stub.page(1)
+    stub.page(2, delay=2.0)
+    stub.page(3)
+
+    started = time.monotonic()
+    result = client_for(stub, timeout=0.3, max_retries=0).get_popular_movies_pages([1, 2, 3])
+
+    assert ids(result) == [10, 11, 30, 31]
+    assert time.monotonic() - started < 1.5
+
+
+def test_deadline_returns_the_pages_that_finished(stub):
+    stub.page(1)
+    stub.page(2)
+    stub.page(3, delay=2.0)
+
+    started = time.monotonic()
+    result = client_for(stub).get_popular_movies_pages([1, 2, 3], deadline=0.5)
+
+    assert ids(result) == [10, 11, 20, 21]
+    assert time.monotonic() - started < 1.5
+
+
+def test_empty_page_ends_the_list(stub):
+    stub.page(1)
+    stub.page(2, results=[])
+    stub.page(3)
+
+    result = client_for(stub).get_popular_movies_pages([1, 2, 3])
+
+    assert ids(result) == [10, 11]
@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+from content_index import ContentIndex
+from user_system import UserSystem
+
+
+@pytest.fixture
+def users(tmp_path):
+    users = UserSystem(str(tmp_path / 'ratings.db'), pool_size=2)
+    yield users
+    users.db.close()
+
+
+def test_batch_fallback_matches_single_user_for_liked_movies_outside_the_index(users):
+    index = ContentIndex.build(pd.DataFrame({
+        'movie_id': list(range(1, 11)),
+        'overview': [f'space pirates story {i}' for i in range(1, 11)]
+    }))
+    # 499-502 are catalog movies the index has not seen yet
+    catalog_ids = list(range(1, 11)) + [499, 500, 501, 502]
+    user_id = users.create_user('viewer', 'viewer@example.com', 'secret')
+    users.add_rating(user_id, 500, 5)
+
+    single = users.get_content_based_recommendations(user_id, 3, catalog_ids, content_index=index)
+    batch = users.get_content_based_recommendations_batch([user_id], 3, catalog_ids, content_index=index)[user_id]
+
+    assert batch == single
+    assert [rec['movie_id'] for rec in batch] == [499, 501, 502]
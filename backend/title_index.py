@@ -0,0 +1,123 @@
+import re
+import bisect
+import heapq
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class TitlePrefixIndex:
+    """Typeahead index: binary search over sorted normalized title keys, best-ranked matches first
+
+    Every title is indexed under its full normalized form and under each later
+    word ("the dark knight", "dark knight", "knight"), so a prefix of any word
+    in the title matches. Movies are ranked by (popularity, vote_average).
+
+    Short prefixes match thousands of keys, so the top `k` movies for every
+    prefix of up to `memo_length` characters are precomputed (the per-node
+    top-K of a trie); longer prefixes select a narrow key range that is
+    scanned with a heap, and the result is memoized too when that range is
+    longer than `scan_limit` keys.
+    """
+
+    def __init__(self, k: int = 10, memo_length: int = 4, scan_limit: int = 256):
+        self.k = k
+        self.memo_length = memo_length
+        self.scan_limit = scan_limit
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        self._movie_ids: List[int] = []
+        self._rank: Dict[int, Tuple[float, float]] = {}
+        self._titles: Dict[int, str] = {}
+        # prefix -> best movie_ids, for prefixes of at most memo_length characters
+        self._top: Dict[str, List[int]] = {}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lower case, accents stripped, punctuation turned into spaces, whitespace collapsed"""
+        text = unicodedata.normalize('NFKD', text or '')
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+        return ' '.join(re.findall(r'\w+', text))
+
+    @classmethod
+    def build(cls, movie_catalog, k: int = 10, chunk_size: int = 5000) -> 'TitlePrefixIndex':
+        """Index every movie in the catalog, decoding records a chunk at a time"""
+        index = cls(k)
+        rows = []
+        for start in range(0, len(movie_catalog), chunk_size):
+            for movie in movie_catalog.records(range(start, min(start + chunk_size, len(movie_catalog)))):
+                rows.extend(index._register(movie))
+        rows.sort()
+        index._keys = [key for key, movie_id in rows]
+        index._movie_ids = [movie_id for key, movie_id in rows]
+        index._rebuild_top()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    @staticmethod
+    def _number(value) -> float:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return 0.0
+        return value if value == value else 0.0
+
+    def _register(self, movie: Dict) -> List[Tuple[str, int]]:
+        """Record a movie's rank and return its (key, movie_id) rows"""
+        movie_id = int(movie['movie_id'])
+        title = self.normalize(movie.get('title') or '')
+        if not title or movie_id in self._titles:
+            return []
+        self._titles[movie_id] = title
+        self._rank[movie_id] = (self._number(movie.get('popularity')), self._number(movie.get('vote_average')))
+        words = title.split(' ')
+        return [(' '.join(words[i:]), movie_id) for i in range(len(words))]
+
+    def _best(self, movie_ids: Iterable[int], limit: int) -> List[int]:
+        """Distinct movie_ids, best-ranked first"""
+        return heapq.nlargest(limit, set(movie_ids), key=lambda movie_id: (self._rank[movie_id], -movie_id))
+
+    def _rebuild_top(self):
+        candidates: Dict[str, set] = {}
+        for key, movie_id in zip(self._keys, self._movie_ids):
+            for length in range(1, min(self.memo_length, len(key)) + 1):
+                candidates.setdefault(key[:length], set()).add(movie_id)
+        self._top = {prefix: self._best(movie_ids, self.k) for prefix, movie_ids in candidates.items()}
+
+    def add_movies(self, movies: Iterable[Dict]):
+        """Index movies added to the catalog after the build"""
+        with self._lock:
+            for movie in movies:
+                for key, movie_id in self._register(movie):
+                    position = bisect.bisect_left(self._keys, key)
+                    self._keys.insert(position, key)
+                    self._movie_ids.insert(position, movie_id)
+                    for length in range(1, len(key) + 1):
+                        prefix = key[:length]
+                        if length <= self.memo_length or prefix in self._top:
+                            self._top[prefix] = self._best(self._top.get(prefix, []) + [movie_id], self.k)
+
+    def complete(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """movie_ids whose title (or a word of it) starts with the query, best-ranked first"""
+        limit = min(limit or self.k, self.k)
+        prefix = self.normalize(query)
+        if not prefix:
+            return []
+
+        # Trailing space is meaningful while typing: "dark " should not match "darkness"
+        if query[-1:].isspace():
+            prefix += ' '
+
+        top = self._top.get(prefix)
+        if top is not None:
+            return top[:limit]
+
+        with self._lock:
+            start = bisect.bisect_left(self._keys, prefix)
+            end = bisect.bisect_left(self._keys, prefix + '\U0010ffff', start)
+            if end - start <= self.scan_limit:
+                return self._best(self._movie_ids[start:end], limit)
+            # Wide range: keep its top-k so the next keystroke-identical lookup is a dict hit
+            top = self._top[prefix] = self._best(self._movie_ids[start:end], self.k)
+        return top[:limit]
@@ -1,23 +1,147 @@
 import requests
 import os
-from typing import List, Dict, Optional
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from response_cache import ResponseCache
+from typing import Callable, Iterable, List, Dict, Optional, Tuple, Union
 
 class TMDBClient:
     """Client for interacting with The Movie Database (TMDb) API"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: Union[float, Tuple[float, float]] = (3.05, 10), max_retries: int = 3,
+                 backoff_factor: float = 0.3, pool_size: int = 16, genre_ttl: float = 86400,
+                 genre_cache_path: Optional[str] = None, on_request: Optional[Callable[[str], None]] = None,
+                 response_cache: Optional[ResponseCache] = None, search_ttl: float = 3600,
+                 details_ttl: float = 86400, negative_ttl: float = 300):
         self.api_key = api_key or os.getenv('TMDB_API_KEY') or "YOUR_TMDB_API_KEY_HERE"
-        self.base_url = "https://api.themoviedb.org/3"
+        self.base_url = base_url or os.getenv('TMDB_BASE_URL') or "https://api.themoviedb.org/3"
         self.image_base_url = "https://image.tmdb.org/t/p/w500"
+        # (connect, read) timeout applied to every request
+        self.timeout = timeout
         
         if not self.api_key or self.api_key == "YOUR_TMDB_API_KEY_HERE":
             self.api_key = None
+        
+        # Keep-alive session: one pooled connection per worker instead of a new TLS handshake per request.
+        # Connection errors, 429 and 5xx responses are retried with exponential backoff (honouring Retry-After).
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Genre id -> name map, fetched once and reused for `genre_ttl` seconds (optionally persisted to genre_cache_path)
+        self.genre_ttl = genre_ttl
+        self.genre_cache_path = genre_cache_path
+        self._genres: Optional[Dict[int, str]] = None
+        self._genres_fetched_at = 0.0
+        self._genres_lock = threading.Lock()
+        
+        # Called with the endpoint name for every upstream API call, so callers can count them
+        self.on_request = on_request
+        
+        # Optional memory + disk cache for search and details responses; empty results use negative_ttl
+        self.response_cache = response_cache
+        self.search_ttl = search_ttl
+        self.details_ttl = details_ttl
+        self.negative_ttl = negative_ttl
+    
+    def _cached(self, namespace: str, key: str, fetch: Callable[[], object], ttl: float, is_empty: Callable[[object], bool], fallback):
+        """Serve from the response cache, fetching on a miss; upstream failures return `fallback` and are not cached"""
+        try:
+            if self.response_cache is None:
+                return fetch()
+            return self.response_cache.get_or_fetch(namespace, key, fetch, ttl, self.negative_ttl, is_empty)
+        except requests.RequestException as e:
+            return fallback
+    
+    def _get(self, endpoint: str, url: str, params: Dict, timeout: Optional[Union[float, Tuple[float, float]]] = None) -> requests.Response:
+        """GET through the pooled session; `endpoint` is the low-cardinality name reported to on_request"""
+        if self.on_request is not None:
+            try:
+                self.on_request(endpoint)
+            except Exception as e:
+                pass
+        response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return response
     
     def get_popular_movies(self, page: int = 1, limit: int = 50) -> List[Dict]:
         """Get popular movies from TMDb"""
         if not self.api_key:
             return self._get_sample_movies()
         
+        try:
+            return self._fetch_popular_page(page, limit)
+        except requests.RequestException as e:
+            return self._get_sample_movies()
+    
+    def get_popular_movies_pages(self, pages: Iterable[int], limit: int = 50, max_workers: int = 8, deadline: float = 60.0) -> List[Dict]:
+        """Fetch several pages of popular movies concurrently, returned in page order
+        
+        At most max_workers requests are in flight. Pages that still fail after
+        retries, or that have not finished `deadline` seconds after the call,
+        are skipped; an empty page marks the end of the list.
+        """
+        pages = list(pages)
+        if not self.api_key:
+            return self._get_sample_movies()
+        
+        deadline_at = time.monotonic() + deadline
+        
+        def fetch(page):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                return self._fetch_popular_page(page, limit, timeout=self._clip_timeout(remaining))
+            except requests.RequestException as e:
+                return None
+        
+        results = {}
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tmdb-fetch')
+        try:
+            pending = {executor.submit(fetch, page): page for page in pages}
+            while pending:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+        finally:
+            # Don't wait for stragglers past the deadline; queued pages are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        movies = []
+        for page in pages:
+            page_movies = results.get(page)
+            if page_movies is None:
+                continue
+            if not page_movies:
+                break
+            movies.extend(page_movies)
+        return movies
+    
+    def _clip_timeout(self, remaining: float) -> Union[float, Tuple[float, float]]:
+        """Per-request timeout, shortened so a request cannot run past the overall deadline"""
+        if isinstance(self.timeout, tuple):
+            return tuple(min(t, remaining) for t in self.timeout)
+        return min(self.timeout, remaining)
+    
+    def _fetch_popular_page(self, page: int, limit: int, timeout: Optional[Union[float, Tuple[float, float]]] = None) -> List[Dict]:
+        """One page of popular movies; raises requests.RequestException on failure"""
         url = f"{self.base_url}/movie/popular"
         params = {
             'api_key': self.api_key,
@@ -25,35 +149,34 @@ class TMDBClient:
             'language': 'en-US'
         }
         
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            movies = []
-            for movie in data['results'][:limit]:
-                movies.append({
-                    'movie_id': movie['id'],
-                    'title': movie['title'],
-                    'overview': movie['overview'],
-                    'genre': self._get_genre_names(movie.get('genre_ids', [])),
-                    'poster_path': movie.get('poster_path'),
-                    'backdrop_path': movie.get('backdrop_path'),
-                    'vote_average': movie.get('vote_average', 0),
-                    'release_date': movie.get('release_date', ''),
-                    'popularity': movie.get('popularity', 0)
-                })
-            
-            return movies
-            
-        except requests.RequestException as e:
-            return self._get_sample_movies()
+        data = self._get('movie/popular', url, params, timeout).json()
+        
+        movies = []
+        for movie in data['results'][:limit]:
+            movies.append({
+                'movie_id': movie['id'],
+                'title': movie['title'],
+                'overview': movie['overview'],
+                'genre': self._get_genre_names(movie.get('genre_ids', [])),
+                'poster_path': movie.get('poster_path'),
+                'backdrop_path': movie.get('backdrop_path'),
+                'vote_average': movie.get('vote_average', 0),
+                'release_date': movie.get('release_date', ''),
+                'popularity': movie.get('popularity', 0)
+            })
+        
+        return movies
     
     def get_movie_details(self, movie_id: int) -> Optional[Dict]:
         """Get detailed information about a specific movie"""
         if not self.api_key:
             return None
         
+        return self._cached('details', str(int(movie_id)), lambda: self._fetch_movie_details(movie_id),
+                            self.details_ttl, lambda details: details is None, None)
+    
+    def _fetch_movie_details(self, movie_id: int) -> Optional[Dict]:
+        """Movie details, or None if TMDb has no such movie; raises requests.RequestException on other failures"""
         url = f"{self.base_url}/movie/{movie_id}"
         params = {
             'api_key': self.api_key,
@@ -62,18 +185,30 @@ class TMDBClient:
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.RequestException as e:
-            return None
+            return self._get('movie/details', url, params).json()
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+    
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Cache key form of a search query: lower case, whitespace collapsed"""
+        return ' '.join(query.lower().split())
     
     def search_movies(self, query: str, page: int = 1) -> Dict:
         """Search for movies by title"""
         if not self.api_key:
             return {'movies': [], 'total_pages': 0, 'total_results': 0}
         
+        # TMDb search is case-insensitive, so "Inception" and " inception " share one cache entry
+        key = f"{self.normalize_query(query)}|{page}"
+        return self._cached('search', key, lambda: self._fetch_search(' '.join(query.split()), page),
+                            self.search_ttl, lambda result: not result['movies'],
+                            {'movies': [], 'total_pages': 0, 'total_results': 0})
+    
+    def _fetch_search(self, query: str, page: int) -> Dict:
+        """One page of search results; raises requests.RequestException on failure"""
         url = f"{self.base_url}/search/movie"
         params = {
             'api_key': self.api_key,
@@ -82,38 +217,56 @@ class TMDBClient:
             'language': 'en-US'
         }
         
-        try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            movies = []
-            for movie in data['results']:
-                movies.append({
-                    'movie_id': movie['id'],
-                    'title': movie['title'],
-                    'overview': movie['overview'],
-                    'genre': self._get_genre_names(movie.get('genre_ids', [])),
-                    'poster_path': movie.get('poster_path'),
-                    'backdrop_path': movie.get('backdrop_path'),
-                    'vote_average': movie.get('vote_average', 0),
-                    'release_date': movie.get('release_date', '')
-                })
-            
-            return {
-                'movies': movies,
-                'total_pages': data.get('total_pages', 0),
-                'total_results': data.get('total_results', 0)
-            }
-            
-        except requests.RequestException as e:
-            return {'movies': [], 'total_pages': 0, 'total_results': 0}
+        data = self._get('search/movie', url, params).json()
+        
+        movies = []
+        for movie in data['results']:
+            movies.append({
+                'movie_id': movie['id'],
+                'title': movie['title'],
+                'overview': movie['overview'],
+                'genre': self._get_genre_names(movie.get('genre_ids', [])),
+                'poster_path': movie.get('poster_path'),
+                'backdrop_path': movie.get('backdrop_path'),
+                'vote_average': movie.get('vote_average', 0),
+                'release_date': movie.get('release_date', '')
+            })
+        
+        return {
+            'movies': movies,
+            'total_pages': data.get('total_pages', 0),
+            'total_results': data.get('total_results', 0)
+        }
     
     def get_genres(self) -> Dict[int, str]:
-        """Get movie genres mapping"""
+        """Get movie genres mapping (cached for genre_ttl seconds)"""
         if not self.api_key:
             return self._get_sample_genres()
         
+        genres = self._genres
+        if genres is not None and time.time() - self._genres_fetched_at < self.genre_ttl:
+            return genres
+        
+        with self._genres_lock:
+            # Another thread may have refreshed it while we waited
+            if self._genres is not None and time.time() - self._genres_fetched_at < self.genre_ttl:
+                return self._genres
+            if self._genres is None and self._load_persisted_genres():
+                return self._genres
+            if self._fetch_genres():
+                return self._genres
+        
+        # Keep serving a stale map rather than losing genre names while TMDb is unavailable
+        return self._genres if self._genres is not None else self._get_sample_genres()
+    
+    def refresh_genres(self) -> bool:
+        """Re-fetch the genre map now (e.g. from a background job); returns False if the fetch failed"""
+        if not self.api_key:
+            return False
+        with self._genres_lock:
+            return self._fetch_genres()
+    
+    def _fetch_genres(self) -> bool:
         url = f"{self.base_url}/genre/movie/list"
         params = {
             'api_key': self.api_key,
@@ -121,17 +274,45 @@ class TMDBClient:
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {genre['id']: genre['name'] for genre in data['genres']}
-            
-        except requests.RequestException as e:
-            return self._get_sample_genres()
+            data = self._get('genre/movie/list', url, params).json()
+            genres = {genre['id']: genre['name'] for genre in data['genres']}
+        except (requests.RequestException, ValueError, KeyError) as e:
+            return False
+        
+        self._genres, self._genres_fetched_at = genres, time.time()
+        self._persist_genres()
+        return True
+    
+    def _load_persisted_genres(self) -> bool:
+        """Use the genre map saved by an earlier process if it is still within the TTL"""
+        if not self.genre_cache_path or not os.path.exists(self.genre_cache_path):
+            return False
+        try:
+            with open(self.genre_cache_path, 'r') as f:
+                cached = json.load(f)
+            fetched_at = float(cached['fetched_at'])
+            genres = {int(genre_id): name for genre_id, name in cached['genres'].items()}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return False
+        
+        if time.time() - fetched_at >= self.genre_ttl or not genres:
+            return False
+        self._genres, self._genres_fetched_at = genres, fetched_at
+        return True
+    
+    def _persist_genres(self):
+        if not self.genre_cache_path:
+            return
+        tmp_path = f"{self.genre_cache_path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'fetched_at': self._genres_fetched_at, 'genres': self._genres}, f)
+            os.replace(tmp_path, self.genre_cache_path)
+        except OSError as e:
+            pass
     
     def _get_genre_names(self, genre_ids: List[int]) -> str:
-        """Convert genre IDs to genre names"""
+        """Convert genre IDs to genre names (no HTTP call while the cached genre map is fresh)"""
         genres = self.get_genres()
         genre_names = [genres.get(genre_id, '') for genre_id in genre_ids]
         return ', '.join(filter(None, genre_names))
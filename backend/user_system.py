@@ -1,91 +1,138 @@
 import sqlite3
 import hashlib
+import json
+import time
 import pandas as pd
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Callable
 from datetime import datetime, timedelta
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import secrets
 import string
+from content_index import ContentIndex
+from movie_catalog import MovieCatalog
+from neighbor_table import NeighborTable
+from ratings_matrix import RatingsMatrix
+from item_similarity import ItemSimilarityModel
+from factor_model import FactorModel
+from ann_index import RandomProjectionLSH
+from batch_scoring import top_n_per_row
+from db import ConnectionPool
+from rating_queue import RatingWriteQueue, RatingOp
+import threading
 
 class UserSystem:
-    def __init__(self, db_path: str = "cinemate.db"):
+    def __init__(self, db_path: str = "cinemate.db", pool_size: int = 8):
         self.db_path = db_path
+        # Shared WAL-mode connections; every query goes through self.db.connection()
+        self.db = ConnectionPool(db_path, size=pool_size)
+        self._ratings_matrix = None
+        self._ratings_matrix_lock = threading.Lock()
+        self.item_similarity = ItemSimilarityModel()
+        self.factor_model = FactorModel()
+        # Optional ANN index over user rating vectors; exact search is used while it is None
+        self.user_ann: Optional[RandomProjectionLSH] = None
+        # Per-user counter bumped on every rating change, plus callbacks notified with the user_id
+        self._ratings_versions: Dict[int, int] = {}
+        self._ratings_listeners: List[Callable[[int], None]] = []
+        self._versions_lock = threading.Lock()
+        # Optional write-behind queue for rating changes; writes are synchronous while it is None
+        self.write_queue: Optional[RatingWriteQueue] = None
+        # How long a read waits for queued writes before falling back to committed rows plus the pending overlay
+        self.read_flush_timeout = 1.0
         self._init_database()
     
     def _init_database(self):
         """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create user_ratings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_ratings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                movie_id INTEGER NOT NULL,
-                rating INTEGER NOT NULL CHECK (rating >= 1 AND rating <= 5),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, movie_id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create user_sessions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                session_token TEXT UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create password_reset_tokens table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS password_reset_tokens (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                token TEXT UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP NOT NULL,
-                used BOOLEAN DEFAULT FALSE,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Create users table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    email TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Create user_ratings table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_ratings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    movie_id INTEGER NOT NULL,
+                    rating INTEGER NOT NULL CHECK (rating >= 1 AND rating <= 5),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(user_id, movie_id),
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            # Create user_sessions table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    session_token TEXT UNIQUE NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at TIMESTAMP NOT NULL,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            # Create password_reset_tokens table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS password_reset_tokens (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    token TEXT UNIQUE NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at TIMESTAMP NOT NULL,
+                    used BOOLEAN DEFAULT FALSE,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            # Last time each user's ratings changed, so precomputed recommendations can be checked for staleness
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_ratings_updates (
+                    user_id INTEGER PRIMARY KEY,
+                    updated_at REAL NOT NULL,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            # Create user_recommendations table (filled by the offline precompute job)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_recommendations (
+                    user_id INTEGER PRIMARY KEY,
+                    n_recommendations INTEGER NOT NULL,
+                    collaborative_mode TEXT NOT NULL,
+                    recommendations TEXT NOT NULL,
+                    computed_at REAL NOT NULL,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            
+            conn.commit()
     
     def create_user(self, username: str, email: str, password: str) -> Optional[int]:
         """Create a new user account"""
         try:
             password_hash = hashlib.sha256(password.encode()).hexdigest()
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO users (username, email, password_hash)
-                VALUES (?, ?, ?)
-            ''', (username, email, password_hash))
-            
-            user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO users (username, email, password_hash)
+                    VALUES (?, ?, ?)
+                ''', (username, email, password_hash))
+                
+                user_id = cursor.lastrowid
+                conn.commit()
             
             return user_id
         except sqlite3.IntegrityError:
@@ -96,31 +143,29 @@ class UserSystem:
         """Authenticate a user and return their user ID"""
         password_hash = hashlib.sha256(password.encode()).hexdigest()
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id FROM users 
-            WHERE username = ? AND password_hash = ?
-        ''', (username, password_hash))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id FROM users 
+                WHERE username = ? AND password_hash = ?
+            ''', (username, password_hash))
+            
+            result = cursor.fetchone()
         
         return result[0] if result else None
     
     def get_user_by_id(self, user_id: int) -> Optional[Dict]:
         """Get user information by ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, username, email, created_at FROM users 
-            WHERE id = ?
-        ''', (user_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id, username, email, created_at FROM users 
+                WHERE id = ?
+            ''', (user_id,))
+            
+            result = cursor.fetchone()
         
         if result:
             return {
@@ -133,16 +178,15 @@ class UserSystem:
 
     def get_user_by_username(self, username: str) -> Optional[Dict]:
         """Get user information by username"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, username, email, created_at FROM users 
-            WHERE username = ?
-        ''', (username,))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id, username, email, created_at FROM users 
+                WHERE username = ?
+            ''', (username,))
+            
+            result = cursor.fetchone()
         
         if result:
             return {
@@ -155,16 +199,15 @@ class UserSystem:
 
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user information by email"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, username, email, created_at FROM users 
-            WHERE email = ?
-        ''', (email,))
-        
-        result = cursor.fetchone()
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id, username, email, created_at FROM users 
+                WHERE email = ?
+            ''', (email,))
+            
+            result = cursor.fetchone()
         
         if result:
             return {
@@ -180,15 +223,14 @@ class UserSystem:
         try:
             password_hash = hashlib.sha256(new_password.encode()).hexdigest()
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE users SET password_hash = ? WHERE id = ?
-            ''', (password_hash, user_id))
-            
-            conn.commit()
-            conn.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    UPDATE users SET password_hash = ? WHERE id = ?
+                ''', (password_hash, user_id))
+                
+                conn.commit()
             
             return True
         except Exception as e:
@@ -196,98 +238,336 @@ class UserSystem:
     
     def save_user_ratings(self, user_id: int, ratings: Dict[int, int]):
         """Save user ratings to the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        self.add_ratings_bulk(user_id, ratings)
+    
+    @staticmethod
+    def validate_ratings(ratings: Dict) -> Dict[int, int]:
+        """Coerce {movie_id: rating} to ints, raising ValueError if any id or rating (1-5) is invalid"""
+        validated = {}
         for movie_id, rating in ratings.items():
-            cursor.execute('''
+            try:
+                movie_id, rating = int(movie_id), int(rating)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid rating {rating!r} for movie {movie_id!r}")
+            if not 1 <= rating <= 5:
+                raise ValueError(f"Rating for movie {movie_id} must be between 1 and 5")
+            validated[movie_id] = rating
+        return validated
+    
+    def add_ratings_bulk(self, user_id: int, ratings: Dict[int, int]) -> int:
+        """Insert or replace many ratings for one user in a single transaction; returns the number written
+        
+        The whole payload is validated before anything is written, so a bad rating leaves the database unchanged.
+        """
+        ratings = self.validate_ratings(ratings)
+        if not ratings:
+            return 0
+        
+        if self.write_queue is not None:
+            self.write_queue.put_many(user_id, ratings)
+            self._update_ratings_matrix(lambda matrix: matrix.set_ratings(user_id, ratings))
+            self._ratings_changed(user_id)
+            return len(ratings)
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.executemany('''
                 INSERT OR REPLACE INTO user_ratings (user_id, movie_id, rating)
                 VALUES (?, ?, ?)
-            ''', (user_id, movie_id, rating))
+            ''', [(user_id, movie_id, rating) for movie_id, rating in ratings.items()])
+            
+            self._touch_ratings_updated(cursor, user_id)
+            conn.commit()
         
-        conn.commit()
-        conn.close()
+        self._update_ratings_matrix(lambda matrix: matrix.set_ratings(user_id, ratings))
+        self._ratings_changed(user_id)
+        return len(ratings)
     
     def add_rating(self, user_id: int, movie_id: int, rating: int):
-        """Add a single rating for a user and movie"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO user_ratings (user_id, movie_id, rating)
-            VALUES (?, ?, ?)
-        ''', (user_id, movie_id, rating))
+        """Add a single rating for a user and movie; raises ValueError for an invalid id or a rating outside 1-5"""
+        (movie_id, rating), = self.validate_ratings({movie_id: rating}).items()
+        if self.write_queue is not None:
+            self.write_queue.put(user_id, movie_id, rating)
+            self._update_ratings_matrix(lambda matrix: matrix.set_rating(user_id, movie_id, rating))
+            self._ratings_changed(user_id)
+            return
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT OR REPLACE INTO user_ratings (user_id, movie_id, rating)
+                VALUES (?, ?, ?)
+            ''', (user_id, movie_id, rating))
+            
+            self._touch_ratings_updated(cursor, user_id)
+            conn.commit()
         
-        conn.commit()
-        conn.close()
+        self._update_ratings_matrix(lambda matrix: matrix.set_rating(user_id, movie_id, rating))
+        self._ratings_changed(user_id)
     
     def remove_rating(self, user_id: int, movie_id: int):
-        """Remove a rating for a user and movie"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            DELETE FROM user_ratings 
-            WHERE user_id = ? AND movie_id = ?
-        ''', (user_id, movie_id))
+        """Remove a rating for a user and movie; raises ValueError for an invalid movie id"""
+        try:
+            movie_id = int(movie_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid movie id {movie_id!r}")
+        if self.write_queue is not None:
+            self.write_queue.put(user_id, movie_id, None)
+            self._update_ratings_matrix(lambda matrix: matrix.remove_rating(user_id, movie_id))
+            self._ratings_changed(user_id)
+            return
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                DELETE FROM user_ratings 
+                WHERE user_id = ? AND movie_id = ?
+            ''', (user_id, movie_id))
+            
+            self._touch_ratings_updated(cursor, user_id)
+            conn.commit()
         
-        conn.commit()
-        conn.close()
+        self._update_ratings_matrix(lambda matrix: matrix.remove_rating(user_id, movie_id))
+        self._ratings_changed(user_id)
     
     def get_user_ratings(self, user_id: int) -> Dict[int, int]:
         """Get all ratings for a specific user"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT movie_id, rating FROM user_ratings 
-            WHERE user_id = ?
-        ''', (user_id,))
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT movie_id, rating FROM user_ratings 
+                WHERE user_id = ?
+            ''', (user_id,))
+            
+            ratings = {row[0]: row[1] for row in cursor.fetchall()}
         
-        ratings = {row[0]: row[1] for row in cursor.fetchall()}
-        conn.close()
+        # Overlay changes still waiting in the write-behind queue so users see their own writes
+        if self.write_queue is not None:
+            for movie_id, rating in self.write_queue.pending(user_id).items():
+                if rating is None:
+                    ratings.pop(movie_id, None)
+                else:
+                    ratings[movie_id] = rating
         
         return ratings
     
     def get_all_ratings(self) -> pd.DataFrame:
         """Get all user ratings for collaborative filtering"""
-        conn = sqlite3.connect(self.db_path)
-        
         query = '''
             SELECT user_id, movie_id, rating 
             FROM user_ratings
         '''
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
+        flushed = self.write_queue is None or self.write_queue.flush(self.read_flush_timeout)
+        
+        with self.db.connection() as conn:
+            df = pd.read_sql_query(query, conn)
+        
+        pending = [] if flushed else [
+            (user_id, movie_id, rating)
+            for user_id, changes in self.write_queue.pending_all().items()
+            for movie_id, rating in changes.items()
+        ]
+        if pending:
+            # Writes are failing or slow: committed rows with the queued changes laid over them
+            changed = pd.MultiIndex.from_tuples([(user_id, movie_id) for user_id, movie_id, rating in pending])
+            df = df[~pd.MultiIndex.from_frame(df[['user_id', 'movie_id']]).isin(changed)]
+            added = pd.DataFrame([row for row in pending if row[2] is not None], columns=['user_id', 'movie_id', 'rating'])
+            df = pd.concat([df, added], ignore_index=True)
         
         return df
     
-    def get_user_stats(self, user_id: int) -> Dict:
-        """Get user statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get total movies rated
+    @property
+    def ratings_matrix(self) -> RatingsMatrix:
+        """Sparse user-item matrix, loaded from SQLite once and then kept current by rating deltas"""
+        if self._ratings_matrix is None:
+            with self._ratings_matrix_lock:
+                if self._ratings_matrix is None:
+                    # Deltas are only applied once the matrix exists, so queued writes are flushed to SQLite
+                    # first (bounded), and whatever is still queued is laid over the committed rows
+                    if self.write_queue is not None:
+                        self.write_queue.flush(self.read_flush_timeout)
+                    
+                    with self.db.connection() as conn:
+                        cursor = conn.cursor()
+                        
+                        cursor.execute('''
+                            SELECT user_id, movie_id, rating 
+                            FROM user_ratings
+                        ''')
+                        
+                        matrix = RatingsMatrix.from_rows(cursor.fetchall())
+                    
+                    if self.write_queue is not None:
+                        for user_id, changes in self.write_queue.pending_all().items():
+                            for movie_id, rating in changes.items():
+                                if rating is None:
+                                    matrix.remove_rating(user_id, movie_id)
+                                else:
+                                    matrix.set_rating(user_id, movie_id, rating)
+                    
+                    self._ratings_matrix = matrix
+        return self._ratings_matrix
+    
+    def _touch_ratings_updated(self, cursor, user_id: int, updated_at: Optional[float] = None):
+        """Record when the user's ratings last changed (same transaction as the rating write)"""
         cursor.execute('''
-            SELECT COUNT(*) FROM user_ratings WHERE user_id = ?
-        ''', (user_id,))
-        movies_rated = cursor.fetchone()[0]
+            INSERT OR REPLACE INTO user_ratings_updates (user_id, updated_at)
+            VALUES (?, ?)
+        ''', (user_id, time.time() if updated_at is None else updated_at))
+    
+    def enable_write_behind(self, flush_interval: float = 0.05, max_batch: int = 500, on_flush: Optional[Callable[[int, float], None]] = None,
+                            max_retries: int = 8, on_dead_letter: Optional[Callable[[RatingOp, Exception], None]] = None) -> RatingWriteQueue:
+        """Queue rating changes and group-commit them on a writer thread instead of writing on the request thread
+        
+        Constraint violations are never retried; they isolate and drop the offending change (see RatingWriteQueue).
+        A dropped change is also undone in the in-memory ratings matrix before on_dead_letter is called.
+        """
+        if self.write_queue is None:
+            def dead_letter(op: RatingOp, error: Exception):
+                self._rating_dropped(op)
+                if on_dead_letter is not None:
+                    on_dead_letter(op, error)
+            
+            self.write_queue = RatingWriteQueue(
+                self._write_rating_ops, flush_interval, max_batch, on_flush,
+                max_retries=max_retries, permanent_errors=(sqlite3.IntegrityError,), on_dead_letter=dead_letter
+            ).start()
+        return self.write_queue
+    
+    def _rating_dropped(self, op: RatingOp):
+        """Undo a dead-lettered change in the matrix: the cell goes back to the committed rating, or to a later queued change"""
+        seq, user_id, movie_id, rating, changed_at = op
+        current = self.get_user_ratings(user_id).get(movie_id)
+        if current is None:
+            self._update_ratings_matrix(lambda matrix: matrix.remove_rating(user_id, movie_id))
+        else:
+            self._update_ratings_matrix(lambda matrix: matrix.set_rating(user_id, movie_id, current))
+        self._ratings_changed(user_id)
+    
+    def flush_rating_writes(self, timeout: float = 10.0) -> bool:
+        """Commit queued rating changes; returns False if they could not all be written within timeout"""
+        if self.write_queue is None:
+            return True
+        return self.write_queue.flush(timeout)
+    
+    def _write_rating_ops(self, ops: List[RatingOp]):
+        """Group commit: apply a batch of queued rating changes in one transaction (last change per movie wins)"""
+        latest, updated_at = {}, {}
+        for seq, user_id, movie_id, rating, changed_at in ops:
+            latest[(user_id, movie_id)] = rating
+            updated_at[user_id] = max(changed_at, updated_at.get(user_id, 0))
+        
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.executemany('''
+                INSERT OR REPLACE INTO user_ratings (user_id, movie_id, rating)
+                VALUES (?, ?, ?)
+            ''', [(user_id, movie_id, rating) for (user_id, movie_id), rating in latest.items() if rating is not None])
+            
+            cursor.executemany('''
+                DELETE FROM user_ratings 
+                WHERE user_id = ? AND movie_id = ?
+            ''', [(user_id, movie_id) for (user_id, movie_id), rating in latest.items() if rating is None])
+            
+            for user_id, changed_at in updated_at.items():
+                self._touch_ratings_updated(cursor, user_id, changed_at)
+            conn.commit()
+    
+    def save_precomputed_recommendations(self, rows: List[Tuple[int, List[Dict]]], n_recommendations: int, collaborative_mode: str, computed_at: float):
+        """Bulk-write (user_id, recommendations) rows produced by the precompute job"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.executemany('''
+                INSERT OR REPLACE INTO user_recommendations (user_id, n_recommendations, collaborative_mode, recommendations, computed_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(user_id, n_recommendations, collaborative_mode, json.dumps(recommendations, default=str), computed_at)
+                  for user_id, recommendations in rows])
+            
+            conn.commit()
+    
+    def get_precomputed_recommendations(self, user_id: int, n_recommendations: int, collaborative_mode: str) -> Optional[List[Dict]]:
+        """Precomputed recommendations, or None if missing or the user's ratings changed since they were computed"""
+        if self.write_queue is not None and self.write_queue.pending(user_id):
+            return None
         
-        # Get average rating
-        cursor.execute('''
-            SELECT AVG(rating) FROM user_ratings WHERE user_id = ?
-        ''', (user_id,))
-        avg_rating = cursor.fetchone()[0] or 0
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT r.recommendations FROM user_recommendations r
+                LEFT JOIN user_ratings_updates u ON u.user_id = r.user_id
+                WHERE r.user_id = ? AND r.n_recommendations = ? AND r.collaborative_mode = ?
+                  AND (u.updated_at IS NULL OR u.updated_at < r.computed_at)
+            ''', (user_id, n_recommendations, collaborative_mode))
+            
+            result = cursor.fetchone()
         
-        # Get favorite movies (5 stars only)
-        cursor.execute('''
-            SELECT COUNT(*) FROM user_ratings 
-            WHERE user_id = ? AND rating = 5
-        ''', (user_id,))
-        favorite_movies = cursor.fetchone()[0]
+        return json.loads(result[0]) if result else None
+    
+    def add_ratings_listener(self, callback: Callable[[int], None]):
+        """Register a callback invoked with the user_id whenever that user's ratings change"""
+        self._ratings_listeners.append(callback)
+    
+    def get_ratings_version(self, user_id: int) -> int:
+        """Counter that changes every time the user's ratings change in this process"""
+        return self._ratings_versions.get(user_id, 0)
+    
+    def _ratings_changed(self, user_id: int):
+        with self._versions_lock:
+            self._ratings_versions[user_id] = self._ratings_versions.get(user_id, 0) + 1
+        
+        for callback in self._ratings_listeners:
+            try:
+                callback(user_id)
+            except Exception as e:
+                pass
+    
+    def _update_ratings_matrix(self, apply_delta):
+        """Apply a rating delta to the in-memory matrix if it has been loaded"""
+        with self._ratings_matrix_lock:
+            if self._ratings_matrix is not None:
+                apply_delta(self._ratings_matrix)
+    
+    def get_user_stats(self, user_id: int) -> Dict:
+        """Get user statistics"""
+        if self.write_queue is not None and self.write_queue.pending(user_id):
+            # Changes still queued: count from the committed ratings with the pending overlay instead of waiting
+            ratings = list(self.get_user_ratings(user_id).values())
+            return {
+                'movies_rated': len(ratings),
+                'average_rating': round(sum(ratings) / len(ratings), 1) if ratings else 0,
+                'favorite_movies': sum(1 for rating in ratings if rating == 5)
+            }
         
-        conn.close()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get total movies rated
+            cursor.execute('''
+                SELECT COUNT(*) FROM user_ratings WHERE user_id = ?
+            ''', (user_id,))
+            movies_rated = cursor.fetchone()[0]
+            
+            # Get average rating
+            cursor.execute('''
+                SELECT AVG(rating) FROM user_ratings WHERE user_id = ?
+            ''', (user_id,))
+            avg_rating = cursor.fetchone()[0] or 0
+            
+            # Get favorite movies (5 stars only)
+            cursor.execute('''
+                SELECT COUNT(*) FROM user_ratings 
+                WHERE user_id = ? AND rating = 5
+            ''', (user_id,))
+            favorite_movies = cursor.fetchone()[0]
+            
         
         return {
             'movies_rated': movies_rated,
@@ -299,51 +579,105 @@ class UserSystem:
         """Create a user-item ratings matrix for collaborative filtering"""
         return self.get_all_ratings()
     
-    def get_collaborative_recommendations(self, user_id: int, n_recommendations: int = 10, available_movie_ids: List[int] = None) -> List[Dict]:
-        """Get collaborative filtering recommendations using matrix factorization"""
-        from sklearn.metrics.pairwise import cosine_similarity
-        from sklearn.decomposition import NMF
-        import numpy as np
+    def rebuild_user_ann(self, n_tables: int = 16, n_bits: int = 8, probe_radius: int = 1):
+        """Rebuild the approximate nearest-neighbour index over user rating vectors"""
+        self.user_ann = RandomProjectionLSH(n_tables, n_bits, probe_radius).fit(self.ratings_matrix.csr())
+    
+    def refresh_item_similarity(self) -> bool:
+        """Refit the item-item similarity model if ratings changed since the last fit"""
+        return self.item_similarity.refresh(self.ratings_matrix)
+    
+    def refresh_factor_model(self) -> bool:
+        """Retrain the matrix-factorization model if ratings changed since the last fit"""
+        return self.factor_model.refresh(self.ratings_matrix)
+    
+    def get_collaborative_recommendations(self, user_id: int, n_recommendations: int = 10, available_movie_ids: List[int] = None, mode: str = 'user') -> List[Dict]:
+        """Get collaborative filtering recommendations: user-based, item-based or matrix factorization"""
+        if mode == 'item':
+            return self.get_item_based_recommendations(user_id, n_recommendations, available_movie_ids)
+        if mode == 'mf':
+            return self.get_factor_model_recommendations(user_id, n_recommendations, available_movie_ids)
+        
+        return self.get_user_based_recommendations(user_id, n_recommendations, available_movie_ids)
+    
+    def get_factor_model_recommendations(self, user_id: int, n_recommendations: int = 10, available_movie_ids: List[int] = None) -> List[Dict]:
+        """Get collaborative filtering recommendations from the latent-factor model"""
+        ratings_matrix = self.ratings_matrix
+        
+        if ratings_matrix.nnz < 3 or user_id not in ratings_matrix:
+            return self._get_simple_recommendations(user_id, n_recommendations, available_movie_ids, 'collaborative')
+        
+        # The background trainer normally keeps the model fresh; train inline only the first time
+        if not self.factor_model.is_fitted:
+            self.refresh_factor_model()
+        
+        user_ratings = ratings_matrix.user_ratings(user_id)
+        
+        recommendations = []
+        for movie_score in self.factor_model.recommend(user_ratings, n_recommendations):
+            # Convert predicted rating (1-5) to recommendation score (2-4)
+            predicted = min(5.0, max(1.0, movie_score['predicted_rating']))
+            rec_score = 2.0 + (predicted - 1.0) / 2.0
+            recommendations.append({
+                'movie_id': movie_score['movie_id'],
+                'score': round(rec_score, 2),
+                'type': 'collaborative'
+            })
         
-        # Get all user ratings for collaborative filtering
-        all_ratings = self.get_all_ratings()
+        return recommendations
+    
+    def get_item_based_recommendations(self, user_id: int, n_recommendations: int = 10, available_movie_ids: List[int] = None) -> List[Dict]:
+        """Get item-based collaborative filtering recommendations from precomputed item-item similarities"""
+        ratings_matrix = self.ratings_matrix
         
-        if len(all_ratings) < 3:
+        if ratings_matrix.nnz < 3 or user_id not in ratings_matrix:
             return self._get_simple_recommendations(user_id, n_recommendations, available_movie_ids, 'collaborative')
         
-        # Create user-item matrix
-        user_item_matrix = all_ratings.pivot_table(
-            index='user_id', 
-            columns='movie_id', 
-            values='rating', 
-            fill_value=0
-        )
+        # The background job normally keeps the model fresh; fit inline only the first time
+        if not self.item_similarity.is_fitted:
+            self.refresh_item_similarity()
         
-        # Check if current user exists in matrix
-        if user_id not in user_item_matrix.index:
+        user_ratings = ratings_matrix.user_ratings(user_id)
+        
+        recommendations = []
+        for movie_score in self.item_similarity.recommend(user_ratings, n_recommendations):
+            # Convert predicted affinity (0-1) to recommendation score (2-4)
+            rec_score = 2.0 + (movie_score['score'] * 2.0)
+            recommendations.append({
+                'movie_id': movie_score['movie_id'],
+                'score': round(rec_score, 2),
+                'type': 'collaborative'
+            })
+        
+        return recommendations
+    
+    def get_user_based_recommendations(self, user_id: int, n_recommendations: int = 10, available_movie_ids: List[int] = None) -> List[Dict]:
+        """Get user-based collaborative filtering recommendations from the in-memory ratings matrix"""
+        ratings_matrix = self.ratings_matrix
+        
+        if ratings_matrix.nnz < 3:
             return self._get_simple_recommendations(user_id, n_recommendations, available_movie_ids, 'collaborative')
         
-        # Calculate user similarity using cosine similarity
-        user_similarity = cosine_similarity(user_item_matrix)
-        user_similarity_df = pd.DataFrame(
-            user_similarity, 
-            index=user_item_matrix.index, 
-            columns=user_item_matrix.index
-        )
+        # Check if current user exists in matrix
+        if user_id not in ratings_matrix:
+            return self._get_simple_recommendations(user_id, n_recommendations, available_movie_ids, 'collaborative')
         
         # Get similar users (top 5 most similar)
-        similar_users = user_similarity_df[user_id].sort_values(ascending=False)[1:6]
+        similar_users = ratings_matrix.similar_users(user_id, 5, self.user_ann)
         
-        # Get movies rated by similar users but not by current user
-        current_user_ratings = self.get_user_ratings(user_id)
-        rated_movie_ids = set(current_user_ratings.keys())
+        return self._neighbour_recommendations(user_id, similar_users, n_recommendations)
+    
+    def _neighbour_recommendations(self, user_id: int, similar_users: List[Tuple[int, float]], n_recommendations: int) -> List[Dict]:
+        """Score movies rated by similar users but not by the current user"""
+        ratings_matrix = self.ratings_matrix
+        rated_movie_ids = set(ratings_matrix.user_ratings(user_id).keys())
         
-        recommendations = []
-        for similar_user_id, similarity_score in similar_users.items():
+        best_scores = {}
+        for similar_user_id, similarity_score in similar_users:
             if similarity_score < 0.01:  # Low similarity threshold
                 continue
                 
-            similar_user_ratings = self.get_user_ratings(similar_user_id)
+            similar_user_ratings = ratings_matrix.user_ratings(similar_user_id)
             
             for movie_id, rating in similar_user_ratings.items():
                 if movie_id not in rated_movie_ids and rating >= 2:  # Low rating threshold
@@ -351,11 +685,14 @@ class UserSystem:
                     collab_score = similarity_score * rating / 5.0  # Normalize to 0-1
                     rec_score = 2.0 + (collab_score * 2.0)  # Scale to 2-4
                     
-                    recommendations.append({
-                        'movie_id': int(movie_id),
-                        'score': round(rec_score, 2),
-                        'type': 'collaborative'
-                    })
+                    # Keep the best score when several neighbours rated the same movie
+                    if rec_score > best_scores.get(movie_id, 0):
+                        best_scores[movie_id] = rec_score
+        
+        recommendations = [
+            {'movie_id': int(movie_id), 'score': round(score, 2), 'type': 'collaborative'}
+            for movie_id, score in best_scores.items()
+        ]
         
         # Sort by score and return top recommendations
         recommendations.sort(key=lambda x: x['score'], reverse=True)
@@ -430,12 +767,8 @@ class UserSystem:
         recommendations.sort(key=lambda x: x['score'], reverse=True)
         return recommendations[:n_recommendations]
     
-    def get_content_based_recommendations(self, user_id: int, n_recommendations: int = 10, available_movie_ids: List[int] = None, movies_df=None) -> List[Dict]:
+    def get_content_based_recommendations(self, user_id: int, n_recommendations: int = 10, available_movie_ids: List[int] = None, movie_catalog: MovieCatalog = None, content_index: ContentIndex = None, neighbor_table: NeighborTable = None, content_ann: RandomProjectionLSH = None) -> List[Dict]:
         """Get content-based recommendations using TF-IDF and cosine similarity"""
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        from sklearn.metrics.pairwise import cosine_similarity
-        import pandas as pd
-        
         user_ratings = self.get_user_ratings(user_id)
         
         if not user_ratings:
@@ -447,96 +780,47 @@ class UserSystem:
         if not liked_movies:
             return []
         
-        # Use real movie data if available, otherwise fallback
-        if movies_df is not None and not movies_df.empty:
-            # Filter to available movie IDs
-            if available_movie_ids:
-                movies_df_filtered = movies_df[movies_df['movie_id'].isin(available_movie_ids)]
+        # Use the prebuilt index if available, otherwise fit one from the real movie data
+        if content_index is None:
+            if movie_catalog is not None and not movie_catalog.empty:
+                content_index = ContentIndex.build(movie_catalog.df)
             else:
-                movies_df_filtered = movies_df
-            
-            # Check if any of the user's liked movies are in the current db
-            # Use the full movies_df to check, not the filtered version
-            liked_movies_in_db = [mid for mid in liked_movies if mid in movies_df['movie_id'].values]
-            
-            if not liked_movies_in_db:
-                # Use fallback approach - recommend based on user's average rating
-                return self._get_simple_recommendations(user_id, n_recommendations, available_movie_ids, 'content-based')
-            
-            # Create content strings from real movie data
-            # Use the full movies_df to create content data, not the filtered version
-            movie_content_data = []
-            for _, movie in movies_df.iterrows():
-                content_parts = []
-                if pd.notna(movie.get('title')):
-                    content_parts.append(str(movie['title']))
-                if pd.notna(movie.get('overview')):
-                    content_parts.append(str(movie['overview']))
-                if pd.notna(movie.get('genre')):
-                    content_parts.append(str(movie['genre']))
-                
-                content = ' '.join(content_parts) if content_parts else f"movie {movie['movie_id']}"
-                
-                movie_content_data.append({
-                    'movie_id': movie['movie_id'],
-                    'content': content
+                # Fallback to simple content data
+                fallback_ids = list(available_movie_ids or range(1, 1000))
+                fallback_df = pd.DataFrame({
+                    'movie_id': fallback_ids,
+                    'overview': [f"movie {movie_id} action drama thriller" for movie_id in fallback_ids]
                 })
-        else:
-            # Fallback to simple content data
-            movie_content_data = []
-            for movie_id in available_movie_ids or range(1, 1000):
-                movie_content_data.append({
-                    'movie_id': movie_id,
-                    'content': f"movie {movie_id} action drama thriller"
-                })
-        
-        if not movie_content_data:
-            return []
+                content_index = ContentIndex.build(fallback_df)
         
-        # Create TF-IDF vectors from movie content
-        tfidf = TfidfVectorizer(stop_words='english', max_features=1000, min_df=1)
-        content_matrix = tfidf.fit_transform([movie['content'] for movie in movie_content_data])
+        # Check if any of the user's liked movies are in the current db
+        liked_movies_in_db = [mid for mid in liked_movies if mid in content_index]
         
-        # Calculate user profile (average of liked movies that are in the database)
-        user_profile = None
-        movies_used_for_profile = 0
+        if not liked_movies_in_db:
+            # Use fallback approach - recommend based on user's average rating
+            return self._get_simple_recommendations(user_id, n_recommendations, available_movie_ids, 'content-based')
         
-        for liked_movie_id in liked_movies_in_db:
-            movie_idx = next((i for i, m in enumerate(movie_content_data) if m['movie_id'] == liked_movie_id), None)
-            if movie_idx is not None:
-                if user_profile is None:
-                    user_profile = content_matrix[movie_idx]
-                else:
-                    user_profile += content_matrix[movie_idx]
-                movies_used_for_profile += 1
-        
-        if user_profile is None:
-            return []
-        
-        # Normalize user profile
-        user_profile = user_profile / movies_used_for_profile
-        
-        # Calculate similarity with all movies
-        similarities = cosine_similarity(user_profile, content_matrix).flatten()
-        
-        # Get top similar movies (excluding already rated)
-        rated_movie_ids = set(user_ratings.keys())
+        # Candidates from the configured backend: the LSH index over user profiles when one is given,
+        # otherwise the precomputed neighbors of the liked movies - O(liked * K) instead of O(catalog)
         movie_scores = []
-        
-        for i, movie in enumerate(movie_content_data):
-            if movie['movie_id'] not in rated_movie_ids:
-                movie_scores.append({
-                    'movie_id': movie['movie_id'],
-                    'score': similarities[i],
-                    'type': 'content-based'
-                })
-        
-        # Sort by similarity score
-        movie_scores.sort(key=lambda x: x['score'], reverse=True)
+        if content_ann is not None:
+            movie_scores = content_index.approximate_top_n(content_ann, liked_movies_in_db, n_recommendations, exclude_ids=user_ratings.keys())
+        elif neighbor_table is not None:
+            movie_scores = neighbor_table.aggregate(liked_movies_in_db, n_recommendations, exclude_ids=user_ratings.keys())
+        
+        if not movie_scores:
+            # Similarity of the user profile (average of liked movies) with all movies
+            similarities = content_index.score(liked_movies_in_db)
+            
+            if similarities is None:
+                return []
+            
+            # Get top similar movies (excluding already rated)
+            movie_scores = content_index.top_n(similarities, n_recommendations, exclude_ids=user_ratings.keys())
         
         # Convert similarity scores to recommendation scores (0-4 scale)
         recommendations = []
-        for i, movie_score in enumerate(movie_scores[:n_recommendations]):
+        for movie_score in movie_scores:
             # Convert similarity (0-1) to recommendation score (2-4)
             rec_score = 2.0 + (movie_score['score'] * 2.0)
             recommendations.append({
@@ -547,53 +831,136 @@ class UserSystem:
         
         return recommendations
     
-    def collaborative_filtering_recommendations(self, user_id: int, movies_df: pd.DataFrame, n_recommendations: int = 10) -> List[Dict]:
+    def get_content_based_recommendations_batch(self, user_ids: List[int], n_recommendations: int = 10, available_movie_ids: List[int] = None, content_index: ContentIndex = None, neighbor_table: NeighborTable = None, content_ann: RandomProjectionLSH = None) -> Dict[int, List[Dict]]:
+        """Content-based recommendations for a block of users, scored as matrix-matrix products"""
+        ratings_matrix = self.ratings_matrix
+        results = {user_id: [] for user_id in user_ids}
+        
+        active_users, liked_per_user = [], []
+        for user_id in user_ids:
+            user_ratings = ratings_matrix.user_ratings(user_id)
+            liked_movies = [movie_id for movie_id, rating in user_ratings.items() if rating >= 3]
+            if not liked_movies:
+                continue
+            if content_index is None or not any(mid in content_index for mid in liked_movies):
+                # Same fallback as the single-user path
+                results[user_id] = self._get_simple_recommendations(user_id, n_recommendations, available_movie_ids, 'content-based')
+                continue
+            active_users.append(user_id)
+            liked_per_user.append(liked_movies)
+        
+        if not active_users:
+            return results
+        
+        # One index state for the whole block, so every matrix below has the same rows
+        state = content_index.state
+        liked = content_index.liked_matrix(liked_per_user, state)
+        rated = content_index.liked_matrix([ratings_matrix.user_ratings(user_id).keys() for user_id in active_users], state)
+        rated_cells = rated.nonzero()
+        
+        # Candidates from the same backend as the single-user path; LSH lookups are per user
+        top_per_user = [[] for _ in active_users]
+        if content_ann is not None:
+            for i, user_id in enumerate(active_users):
+                top_per_user[i] = [
+                    (state.id_to_row[movie['movie_id']], movie['score'])
+                    for movie in content_index.approximate_top_n(content_ann, liked_per_user[i], n_recommendations, ratings_matrix.user_ratings(user_id).keys(), state)
+                ]
+        elif neighbor_table is not None:
+            scores = neighbor_table.aggregate_batch(liked)
+            scores[rated_cells] = 0.0
+            top_per_user = top_n_per_row(scores, n_recommendations, min_score=0.0)
+        
+        # Full profile scan only for users without any candidates
+        missing = [i for i, top in enumerate(top_per_user) if not top]
+        if missing:
+            scores = content_index.score_batch(liked[missing], state)
+            missing_rated = rated[missing].nonzero()
+            scores[missing_rated] = -np.inf
+            for i, top in zip(missing, top_n_per_row(scores, n_recommendations)):
+                top_per_user[i] = top
+        
+        for user_id, top in zip(active_users, top_per_user):
+            results[user_id] = [
+                {'movie_id': int(state.movie_ids[row]), 'score': round(2.0 + score * 2.0, 2), 'type': 'content-based'}
+                for row, score in top
+            ]
+        return results
+    
+    def get_collaborative_recommendations_batch(self, user_ids: List[int], n_recommendations: int = 10, available_movie_ids: List[int] = None, mode: str = 'user') -> Dict[int, List[Dict]]:
+        """Collaborative recommendations for a block of users, scored as matrix-matrix products"""
+        ratings_matrix = self.ratings_matrix
+        results = {}
+        
+        active_users = []
+        for user_id in user_ids:
+            if ratings_matrix.nnz < 3 or user_id not in ratings_matrix:
+                results[user_id] = self._get_simple_recommendations(user_id, n_recommendations, available_movie_ids, 'collaborative')
+            else:
+                active_users.append(user_id)
+        
+        if not active_users:
+            return results
+        
+        if mode == 'user':
+            similar_users = ratings_matrix.similar_users_batch(active_users, 5)
+            for user_id in active_users:
+                results[user_id] = self._neighbour_recommendations(user_id, similar_users[user_id], n_recommendations)
+            return results
+        
+        rows = [ratings_matrix.user_index[int(user_id)] for user_id in active_users]
+        user_block = ratings_matrix.csr()[rows]
+        
+        if mode == 'item':
+            if not self.item_similarity.is_fitted:
+                self.refresh_item_similarity()
+            scores = self.item_similarity.score_batch(user_block)
+            movie_ids = self.item_similarity.movie_ids
+            top_per_user = top_n_per_row(scores, n_recommendations, min_score=0.0)
+            to_rec_score = lambda score: 2.0 + score * 2.0
+        else:
+            if not self.factor_model.is_fitted:
+                self.refresh_factor_model()
+            scores = self.factor_model.score_batch(user_block)
+            movie_ids = self.factor_model.movie_ids
+            top_per_user = top_n_per_row(scores, n_recommendations)
+            to_rec_score = lambda score: 2.0 + (min(5.0, max(1.0, score)) - 1.0) / 2.0
+        
+        for user_id, top in zip(active_users, top_per_user):
+            results[user_id] = [
+                {'movie_id': int(movie_ids[col]), 'score': round(to_rec_score(score), 2), 'type': 'collaborative'}
+                for col, score in top
+            ]
+        return results
+    
+    def collaborative_filtering_recommendations(self, user_id: int, movie_catalog: MovieCatalog, n_recommendations: int = 10) -> List[Dict]:
         """Get collaborative filtering recommendations"""
-        # Get all user ratings
-        ratings_df = self.get_all_ratings()
+        ratings_matrix = self.ratings_matrix
         
-        if len(ratings_df) < 10:  # Need minimum data for collaborative filtering
+        if ratings_matrix.nnz < 10:  # Need minimum data for collaborative filtering
             return []
         
-        # Create user-item matrix
-        user_item_matrix = ratings_df.pivot_table(
-            index='user_id', 
-            columns='movie_id', 
-            values='rating', 
-            fill_value=0
-        )
-        
-        # Calculate user similarity
-        user_similarity = cosine_similarity(user_item_matrix)
-        user_similarity_df = pd.DataFrame(
-            user_similarity, 
-            index=user_item_matrix.index, 
-            columns=user_item_matrix.index
-        )
-        
         # Get similar users
-        if user_id not in user_similarity_df.index:
+        if user_id not in ratings_matrix:
             return []
         
-        similar_users = user_similarity_df[user_id].sort_values(ascending=False)[1:6]  # Top 5 similar users
+        similar_users = ratings_matrix.similar_users(user_id, 5, self.user_ann)  # Top 5 similar users
         
         # Get movies rated by similar users but not by current user
-        user_ratings = self.get_user_ratings(user_id)
-        rated_movie_ids = set(user_ratings.keys())
+        rated_movie_ids = set(ratings_matrix.user_ratings(user_id).keys())
         
         recommendations = []
-        for similar_user_id, similarity_score in similar_users.items():
+        for similar_user_id, similarity_score in similar_users:
             if similarity_score < 0.1:  # Minimum similarity threshold
                 continue
                 
-            similar_user_ratings = self.get_user_ratings(similar_user_id)
+            similar_user_ratings = ratings_matrix.user_ratings(similar_user_id)
             
             for movie_id, rating in similar_user_ratings.items():
                 if movie_id not in rated_movie_ids and rating >= 4:  # Only highly rated movies
                     # Check if movie exists in our db
-                    movie_data = movies_df[movies_df['movie_id'] == movie_id]
-                    if not movie_data.empty:
-                        movie_dict = movie_data.iloc[0].to_dict()
+                    movie_dict = movie_catalog.get(movie_id)
+                    if movie_dict is not None:
                         movie_dict['collaborative_score'] = similarity_score * rating
                         movie_dict['recommendation_type'] = 'collaborative'
                         recommendations.append(movie_dict)
@@ -602,7 +969,7 @@ class UserSystem:
         recommendations.sort(key=lambda x: x['collaborative_score'], reverse=True)
         return recommendations[:n_recommendations]
     
-    def hybrid_recommendations(self, user_id: int, movies_df: pd.DataFrame, content_based_recs: List[Dict], n_recommendations: int = 10) -> List[Dict]:
+    def hybrid_recommendations(self, user_id: int, movie_catalog: MovieCatalog, content_based_recs: List[Dict], n_recommendations: int = 10) -> List[Dict]:
         """Combine content-based and collaborative filtering for single-user scenarios"""
         # Get collaborative recommendations using the simple method
         collab_recs = self.get_collaborative_recommendations(user_id, n_recommendations)
@@ -651,36 +1018,34 @@ class UserSystem:
     def generate_reset_token(self, username: str, email: str) -> Optional[str]:
         """Generate a password reset token for a user"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Verify username and email match
-            cursor.execute('''
-                SELECT id FROM users 
-                WHERE username = ? AND email = ?
-            ''', (username, email))
-            
-            result = cursor.fetchone()
-            if not result:
-                conn.close()
-                return None
-            
-            user_id = result[0]
-            
-            # Generate a secure random token
-            token = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(32))
-            
-            # Set expiration time (1 hour from now)
-            expires_at = datetime.now() + timedelta(hours=1)
-            
-            # Store the token
-            cursor.execute('''
-                INSERT INTO password_reset_tokens (user_id, token, expires_at)
-                VALUES (?, ?, ?)
-            ''', (user_id, token, expires_at))
-            
-            conn.commit()
-            conn.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Verify username and email match
+                cursor.execute('''
+                    SELECT id FROM users 
+                    WHERE username = ? AND email = ?
+                ''', (username, email))
+                
+                result = cursor.fetchone()
+                if not result:
+                    return None
+                
+                user_id = result[0]
+                
+                # Generate a secure random token
+                token = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(32))
+                
+                # Set expiration time (1 hour from now)
+                expires_at = datetime.now() + timedelta(hours=1)
+                
+                # Store the token
+                cursor.execute('''
+                    INSERT INTO password_reset_tokens (user_id, token, expires_at)
+                    VALUES (?, ?, ?)
+                ''', (user_id, token, expires_at))
+                
+                conn.commit()
             
             return token
             
@@ -690,16 +1055,15 @@ class UserSystem:
     def validate_reset_token(self, token: str) -> Optional[int]:
         """Validate a password reset token and return user_id if valid"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT user_id FROM password_reset_tokens 
-                WHERE token = ? AND expires_at > ? AND used = FALSE
-            ''', (token, datetime.now()))
-            
-            result = cursor.fetchone()
-            conn.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT user_id FROM password_reset_tokens 
+                    WHERE token = ? AND expires_at > ? AND used = FALSE
+                ''', (token, datetime.now()))
+                
+                result = cursor.fetchone()
             
             return result[0] if result else None
             
@@ -709,17 +1073,16 @@ class UserSystem:
     def use_reset_token(self, token: str) -> bool:
         """Mark a reset token as used"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE password_reset_tokens 
-                SET used = TRUE 
-                WHERE token = ?
-            ''', (token,))
-            
-            conn.commit()
-            conn.close()
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    UPDATE password_reset_tokens 
+                    SET used = TRUE 
+                    WHERE token = ?
+                ''', (token,))
+                
+                conn.commit()
             
             return True
             